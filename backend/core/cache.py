@@ -0,0 +1,65 @@
+"""
+Shared, single-flight caching for expensive read-only payloads.
+
+Entries live in the default (database) cache, so every worker serves the
+same copy. When a copy goes stale exactly one caller rebuilds it, guarded by
+a cache.add() lock; everyone else keeps getting the previous copy until the
+new one lands, so a dashboard polled by many screens costs one computation
+per refresh instead of one per request.
+"""
+import time
+from django.core.cache import cache
+from django.utils import timezone
+from .versioning import get_versions
+
+# Stale copies are kept this much longer than they are fresh
+STALE_GRACE = 300
+LOCK_TIMEOUT = 30
+# With no copy at all, callers wait this long for the builder before giving up
+COLD_WAIT = 2
+WAIT_STEP = 0.1
+
+
+class CacheWarming(Exception):
+    """No copy exists yet and another caller is still building it; retry shortly."""
+
+
+def single_flight(key, build, ttl, min_age=0, version_keys=()):
+    """
+    Returns build()'s payload cached under `key` with a `generated_at` field.
+
+    A copy is fresh for `min_age` seconds, and after that for up to `ttl`
+    seconds as long as the change-versions of `version_keys` haven't moved.
+    Raises CacheWarming if there is no copy and another caller's build does
+    not finish within COLD_WAIT seconds.
+    """
+    versions = get_versions(list(version_keys)) if version_keys else []
+    now = time.time()
+
+    entry = cache.get(key)
+    if entry is not None:
+        age = now - entry['built']
+        if age < min_age or (age < ttl and entry['versions'] == versions):
+            return entry['payload']
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            payload = {**build(), 'generated_at': timezone.now()}
+            cache.set(key, {'payload': payload, 'built': now, 'versions': versions}, ttl + STALE_GRACE)
+            return payload
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry['payload']
+
+    # First build ever (or evicted): wait briefly for the builder, then give
+    # up instead of holding the worker or piling onto the rebuild
+    deadline = now + COLD_WAIT
+    while time.time() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['payload']
+    raise CacheWarming(key)
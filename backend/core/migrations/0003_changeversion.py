@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_user_roles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeVersion',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
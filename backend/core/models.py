@@ -24,3 +24,14 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
+
+class ChangeVersion(models.Model):
+    """
+    Per-table change counter, bumped by save/delete signals. Polled endpoints
+    build their ETag from it so unchanged data can be answered with a 304.
+    """
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
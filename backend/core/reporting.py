@@ -0,0 +1,38 @@
+"""
+Shared helpers for the rollup-backed revenue reports (inventory.reporting,
+recreation.reporting): the dashboard timeframes and the one-scan
+conditional-aggregate runner.
+"""
+from datetime import timedelta
+from django.utils import timezone
+
+
+def timeframe_starts(today=None):
+    """First day of each dashboard window: today and the last 7/30/365 days."""
+    today = today or timezone.localdate()
+    return {
+        label: today - timedelta(days=days)
+        for label, days in [('today', 0), ('week', 7), ('month', 30), ('year', 365)]
+    }
+
+
+def aggregate_cells(queryset, cells):
+    """
+    Runs every {path: aggregate} cell in one query and returns the results
+    nested by path, e.g. ('today', 'bar') -> result['today']['bar'].
+    """
+    aliases = {f'cell{i}': path for i, path in enumerate(cells)}
+    row = queryset.aggregate(**{alias: cells[path] for alias, path in aliases.items()})
+    result = {}
+    for alias, path in aliases.items():
+        node = result
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = row[alias] or 0
+    return result
+
+
+def rollup_window(queryset, starts):
+    """Daily rollup rows from the earliest of `starts` up to today."""
+    # Room nights are booked ahead; nothing after today belongs in a window
+    return queryset.filter(date__gte=min(starts.values()), date__lte=timezone.localdate())
@@ -0,0 +1,13 @@
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete
+from .versioning import VERSIONED_MODELS, bump_version
+
+
+def bump_model_version(sender, **kwargs):
+    bump_version(VERSIONED_MODELS[sender._meta.label])
+
+
+for label in VERSIONED_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(bump_model_version, sender=model, dispatch_uid=f'change-version-save-{label}')
+    post_delete.connect(bump_model_version, sender=model, dispatch_uid=f'change-version-delete-{label}')
@@ -1,3 +1,84 @@
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from finance.models import Account
+from .models import User
+from .cache import single_flight, CacheWarming
+from .versioning import bump_version, get_versions
 
-# Create your tests here.
+
+class VersionedEtagTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='accountant', password='x'))
+        self.url = reverse('account-list')
+
+    def test_matching_if_none_match_returns_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'].startswith('W/"account.'))
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], first['ETag'])
+        self.assertFalse(cached.content)
+
+    def test_version_bump_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.create(name='Cash', code='1000', account_type='ASSET')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([account['code'] for account in response.data], ['1000'])
+
+    def test_query_string_is_part_of_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'page': 2})['ETag'], etag)
+
+
+class ChangeVersionTests(TestCase):
+    def test_bump_applies_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            bump_version('order', 'order')
+            self.assertEqual(get_versions(['order']), [0])
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(get_versions(['order', 'stock']), [2, 0])
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {'builds': self.builds}
+
+    def test_fresh_copy_is_reused(self):
+        self.assertEqual(single_flight('report', self.build, ttl=30)['builds'], 1)
+        self.assertEqual(single_flight('report', self.build, ttl=30)['builds'], 1)
+
+    def test_version_bump_triggers_a_rebuild(self):
+        single_flight('report', self.build, ttl=30, version_keys=('order',))
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('order')
+        self.assertEqual(single_flight('report', self.build, ttl=30, version_keys=('order',))['builds'], 2)
+
+    def test_stale_copy_is_served_while_another_caller_rebuilds(self):
+        single_flight('report', self.build, ttl=30, version_keys=('order',))
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('order')
+        cache.add('report:lock', 1)
+        self.assertEqual(single_flight('report', self.build, ttl=30, version_keys=('order',))['builds'], 1)
+        self.assertEqual(self.builds, 1)
+
+    @mock.patch('core.cache.COLD_WAIT', 0.2)
+    def test_cold_key_raises_cache_warming_while_another_caller_builds(self):
+        cache.add('report:lock', 1)
+        with self.assertRaises(CacheWarming):
+            single_flight('report', self.build, ttl=30)
+        self.assertEqual(self.builds, 0)
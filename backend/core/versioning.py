@@ -0,0 +1,92 @@
+import hashlib
+from functools import wraps
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from .models import ChangeVersion
+
+# Model label -> change-version key. Children bump their parent's key because
+# they are nested into the parent's API payload.
+VERSIONED_MODELS = {
+    'inventory.Order': 'order',
+    'inventory.OrderItem': 'order',
+    'inventory.OrderReturn': 'order',
+    'inventory.InventoryStock': 'stock',
+    'inventory.MenuItem': 'menu',
+    'inventory.RecipeIngredient': 'menu',
+    'finance.Invoice': 'invoice',
+    'finance.InvoiceItem': 'invoice',
+    'finance.Payment': 'invoice',
+    'finance.Transaction': 'transaction',
+    'finance.Account': 'account',
+    'pms.Room': 'room',
+    'website.SiteConfig': 'siteconfig',
+}
+
+
+def bump_version(*keys):
+    """
+    Marks the given tables as changed. Runs after commit so a reader can never
+    see the new version together with the old rows, and so the counter row is
+    not locked for the length of the writer's transaction.
+
+    Call this directly after queryset.update()/bulk_create(), which skip signals.
+    """
+    for key in keys:
+        transaction.on_commit(lambda key=key: _increment(key))
+
+
+def _increment(key):
+    if ChangeVersion.objects.filter(key=key).update(version=F('version') + 1):
+        return
+    try:
+        ChangeVersion.objects.create(key=key, version=1)
+    except IntegrityError:
+        # Another worker created the row first
+        ChangeVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+
+def get_versions(keys):
+    """Current version of each key in one query (0 if never bumped)."""
+    versions = dict(ChangeVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    return [versions.get(key, 0) for key in keys]
+
+
+def build_etag(request, keys):
+    versions = get_versions(keys)
+    # The query string changes the representation (filters, cursors, ...)
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()[:12]
+    tag = "-".join(f"{key}.{version}" for key, version in zip(keys, versions))
+    return f'W/"{tag}-{path_hash}"'
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def versioned_etag(*keys):
+    """
+    Decorator for DRF view methods whose output only depends on the given
+    change-version keys. A matching If-None-Match returns 304 before the
+    view builds its queryset or runs the serializer.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = build_etag(request, keys)
+            client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+            if '*' in client_etags or _strip_weak(etag) in {_strip_weak(e) for e in client_etags}:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response['ETag'] = etag
+            # Always revalidate, so browsers send If-None-Match instead of guessing
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,85 @@
+"""
+Process-wide chart-of-accounts resolver for the posting paths.
+
+Maps account codes, posting roles (cash, AR, revenue accounts, ...) and
+payment modes to Account ids from one query, so posting a voucher, invoice
+or payment needs no account lookups. The map is dropped when an Account is
+saved or deleted in this process (finance.signals) and, for changes made by
+other workers, when the 'account' change-version moves; that version is
+checked at most every CHECK_INTERVAL seconds.
+"""
+import threading
+import time
+from core.versioning import get_versions
+from .models import Account
+
+CHECK_INTERVAL = 30
+
+ROLE_CODES = {
+    'cash': '1000',
+    'ar': '1100',
+    'fixed_assets': '1500',
+    'liabilities': '2000',
+    'sales_revenue': '4000',
+    'dining_revenue': '4100',
+    'other_revenue': '4200',
+    'pass_revenue': '4300',
+    'wages': '5000',
+    'purchases': '5100',
+    'utilities': '5200',
+    'marketing': '5300',
+    'misc_expense': '5900',
+}
+
+# Voucher payment modes; unknown modes post to cash
+PAYMENT_MODE_CODES = {
+    'CASH': '1000',
+    'BANK': '1100',
+    'MOMO_LONESTAR': '1110',
+    'MOMO_ORANGE': '1120',
+    'VISA': '1130',
+    'OTHER': '1140',
+}
+
+_lock = threading.Lock()
+_state = {'codes': None, 'version': None, 'checked_at': 0}
+
+
+def invalidate():
+    """Drops the map; the next lookup reloads it (and re-checks the version)."""
+    with _lock:
+        _state['codes'] = None
+        _state['checked_at'] = 0
+
+
+def codes():
+    """{account code: account id}, loaded once per process and change."""
+    with _lock:
+        now = time.monotonic()
+        if _state['codes'] is not None and now - _state['checked_at'] < CHECK_INTERVAL:
+            return _state['codes']
+
+        version = get_versions(['account'])[0]
+        _state['checked_at'] = now
+        if _state['codes'] is None or _state['version'] != version:
+            _state['codes'] = dict(Account.objects.values_list('code', 'id'))
+            _state['version'] = version
+        return _state['codes']
+
+
+def account_id(code):
+    """Id of the account with `code`; raises Account.DoesNotExist if there is none."""
+    if code not in codes():
+        # Possibly created by another worker since the last version check
+        invalidate()
+        if code not in codes():
+            raise Account.DoesNotExist(f"Account {code} does not exist")
+    return codes()[code]
+
+
+def role_id(role):
+    return account_id(ROLE_CODES[role])
+
+
+def payment_mode_account_id(mode):
+    return account_id(PAYMENT_MODE_CODES.get(mode, ROLE_CODES['cash']))
@@ -0,0 +1,215 @@
+"""
+Set-based ledger rebuild.
+
+Account balances are recomputed from the Transaction table in one query
+(debit and credit leg totals per account as subqueries) using the same
+normal-balance rules as Transaction.save, and written back with one bulk
+update. Invoices and payments without their revenue/collection posting get
+them regenerated with bulk_create first. See the rebuild_ledger command.
+"""
+from collections import Counter
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from core.versioning import bump_version
+from .models import Account, Transaction, Voucher, Invoice, InvoiceItem, Payment, LedgerOutbox
+from . import chart
+
+CASH_CODE = chart.ROLE_CODES['cash']
+AR_CODE = chart.ROLE_CODES['ar']
+SALES_REVENUE_CODE = chart.ROLE_CODES['sales_revenue']
+DINING_REVENUE_CODE = chart.ROLE_CODES['dining_revenue']
+PASS_REVENUE_CODE = chart.ROLE_CODES['pass_revenue']
+
+INVOICE_POSTING_PREFIX = 'Revenue Recognition: '
+PAYMENT_POSTING_PREFIX = 'Payment Received: '
+
+
+def signed_amount(account_type, debit, credit):
+    """Balance change of an account of `account_type` from its debit and credit totals."""
+    if account_type in Account.DEBIT_NORMAL_TYPES:
+        return debit - credit
+    return credit - debit
+
+
+def invoice_revenue_code(first_item_description):
+    """Revenue account code for an invoice, judged by its first line as the signals do."""
+    description = first_item_description or ''
+    if 'Order' in description:
+        return DINING_REVENUE_CODE
+    if any(word in description for word in ['Pass', 'Pool', 'Beach']):
+        return PASS_REVENUE_CODE
+    return SALES_REVENUE_CODE
+
+
+def invoice_posting_description(invoice):
+    return f"{INVOICE_POSTING_PREFIX}{invoice.invoice_number} ({invoice.reference_location or 'General'})"
+
+
+def payment_posting_description(invoice_number, mode):
+    return f"{PAYMENT_POSTING_PREFIX}{invoice_number} via {mode}"
+
+
+def _leg_total(field):
+    legs = Transaction.objects.filter(**{field: OuterRef('pk')}).order_by() \
+        .values(field).annotate(total=Sum('amount')).values('total')
+    return Coalesce(Subquery(legs), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def computed_balances(extra=()):
+    """
+    {account_id: (current balance, balance implied by the journal)}, plus
+    any not-yet-saved `extra` transactions (used by the dry run).
+    """
+    accounts = Account.objects.annotate(
+        debits=_leg_total('debit_account'),
+        credits=_leg_total('credit_account'),
+    ).values_list('id', 'account_type', 'balance', 'debits', 'credits')
+
+    pending = Counter()
+    for tx in extra:
+        pending[('debit', tx.debit_account_id)] += tx.amount
+        pending[('credit', tx.credit_account_id)] += tx.amount
+
+    return {
+        account_id: (
+            balance,
+            signed_amount(account_type, debits + pending[('debit', account_id)], credits + pending[('credit', account_id)]),
+        )
+        for account_id, account_type, balance, debits, credits in accounts
+    }
+
+
+def missing_postings():
+    """
+    Unsaved Transactions for invoices without a revenue posting and for
+    payments beyond the number of collection postings of their invoice/mode.
+    Postings are matched by description, the only link the journal keeps.
+    Documents still queued in the ledger outbox are left to its worker.
+    """
+    accounts = chart.codes()
+    missing = []
+    if AR_CODE not in accounts:
+        return missing
+    queued = set(LedgerOutbox.objects.exclude(status='POSTED').values_list('kind', 'source_id'))
+
+    posted = Counter(
+        Transaction.objects.filter(description__startswith=INVOICE_POSTING_PREFIX)
+        .values_list('description', flat=True)
+    )
+    first_item = InvoiceItem.objects.filter(invoice=OuterRef('pk')).order_by('id').values('description')[:1]
+    for invoice in Invoice.objects.annotate(first_item=Subquery(first_item)).order_by('date_issued', 'id'):
+        description = invoice_posting_description(invoice)
+        if ('INVOICE', invoice.id) in queued:
+            continue
+        if posted[description]:
+            posted[description] -= 1
+            continue
+        revenue_id = accounts.get(invoice_revenue_code(invoice.first_item), accounts.get(SALES_REVENUE_CODE))
+        if revenue_id is None:
+            continue
+        missing.append(Transaction(
+            description=description, debit_account_id=accounts[AR_CODE],
+            credit_account_id=revenue_id, amount=invoice.total_ft,
+        ))
+
+    if CASH_CODE in accounts:
+        posted = Counter(
+            Transaction.objects.filter(description__startswith=PAYMENT_POSTING_PREFIX)
+            .values_list('description', flat=True)
+        )
+        for payment_id, invoice_number, mode, amount in Payment.objects.order_by('date_paid', 'id') \
+                .values_list('id', 'invoice__invoice_number', 'mode', 'amount'):
+            description = payment_posting_description(invoice_number, mode)
+            if ('PAYMENT', payment_id) in queued:
+                continue
+            if posted[description]:
+                posted[description] -= 1
+                continue
+            missing.append(Transaction(
+                description=description, debit_account_id=accounts[CASH_CODE],
+                credit_account_id=accounts[AR_CODE], amount=amount,
+            ))
+
+    return missing
+
+
+def rebuild_ledger(dry_run=False):
+    """
+    Regenerates missing invoice/payment postings and resets every account
+    balance to what the journal implies. Accounts stay locked for the
+    duration so no posting lands in between. Returns the postings created
+    (or that would be) and {account: (old balance, new balance)} for every
+    account whose balance changes.
+    """
+    with transaction.atomic():
+        list(Account.objects.select_for_update().order_by('id').values_list('id', flat=True))
+
+        postings = missing_postings()
+        if not dry_run:
+            # bulk_create skips Transaction.save, the balances are set below
+            Transaction.objects.bulk_create(postings, batch_size=1000)
+        balances = computed_balances(extra=postings if dry_run else ())
+
+        changed = {account_id: (old, new) for account_id, (old, new) in balances.items() if old != new}
+        accounts = Account.objects.in_bulk(list(changed))
+        if not dry_run:
+            for account_id, (_, new) in changed.items():
+                accounts[account_id].balance = new
+            Account.objects.bulk_update(accounts.values(), ['balance'], batch_size=1000)
+            # bulk writes skip the post_save version bumps
+            bump_version('account', 'transaction')
+
+    return {
+        'postings': postings,
+        'balances': {accounts[account_id]: change for account_id, change in changed.items()},
+    }
+
+
+def approve_vouchers(voucher_ids):
+    """
+    Approves the given vouchers and posts their ledger transactions in bulk:
+    one UPDATE flips is_approved, one bulk_create writes the transactions
+    and one UPDATE applies the summed balance changes per account. Vouchers
+    that are missing, already approved or lack an account are skipped.
+    Returns {'approved': [ids], 'transactions': count, 'skipped': [...]}.
+    """
+    requested = list(dict.fromkeys(voucher_ids))
+    skipped = []
+    with transaction.atomic():
+        vouchers = Voucher.objects.select_for_update().in_bulk(requested)
+
+        approvable = []
+        postings = []
+        for voucher_id in requested:
+            voucher = vouchers.get(voucher_id)
+            if voucher is None:
+                skipped.append({'id': voucher_id, 'voucher_number': None, 'reason': 'Voucher not found'})
+                continue
+            if voucher.is_approved:
+                skipped.append({'id': voucher_id, 'voucher_number': voucher.voucher_number, 'reason': 'Already approved'})
+                continue
+            try:
+                debit_id, credit_id = voucher.ledger_accounts()
+            except Account.DoesNotExist as e:
+                skipped.append({'id': voucher_id, 'voucher_number': voucher.voucher_number, 'reason': str(e)})
+                continue
+            approvable.append(voucher_id)
+            postings.append(Transaction(
+                description=voucher.ledger_description(),
+                debit_account_id=debit_id,
+                credit_account_id=credit_id,
+                amount=voucher.total_amount,
+            ))
+
+        if approvable:
+            Voucher.objects.filter(pk__in=approvable).update(is_approved=True)
+            # bulk_create skips Transaction.save, so the balances are applied here
+            Transaction.objects.bulk_create(postings)
+            Account.apply_postings(
+                (posting.debit_account_id, posting.credit_account_id, posting.amount) for posting in postings
+            )
+            bump_version('transaction')
+
+    return {'approved': approvable, 'transactions': len(postings), 'skipped': skipped}
@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from finance.outbox import drain_outbox, BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Post pending invoice/payment ledger entries from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep draining until interrupted')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the outbox is empty (with --loop)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            posted, failed = drain_outbox(batch_size)
+            if posted or failed:
+                self.stdout.write(f"Posted {posted}, failed {failed}")
+            # A full batch means more is probably waiting
+            if posted + failed < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS("Ledger outbox drained."))
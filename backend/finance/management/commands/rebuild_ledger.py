@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from finance.ledger import rebuild_ledger
+
+class Command(BaseCommand):
+    help = 'Regenerate missing invoice/payment postings and recompute every account balance from the journal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show the postings and balance changes without writing them')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        result = rebuild_ledger(dry_run=dry_run)
+
+        verb = "Would create" if dry_run else "Created"
+        self.stdout.write(f"{verb} {len(result['postings'])} missing postings")
+        for tx in result['postings']:
+            self.stdout.write(f"  + {tx.description}: {tx.amount}")
+
+        for account, (old, new) in sorted(result['balances'].items(), key=lambda change: change[0].code):
+            self.stdout.write(f"  {account}: {old} -> {new} ({new - old:+})")
+        if not result['balances']:
+            self.stdout.write("All account balances already match the journal.")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Ledger rebuilt."))
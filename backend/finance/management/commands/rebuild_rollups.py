@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from finance.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the daily revenue rollup tables (F&B, passes, payments, rooms) from source data'
+
+    def handle(self, *args, **options):
+        counts = rebuild_rollups()
+        for table, rows in counts.items():
+            self.stdout.write(f"{table}: {rows} daily rows")
+        self.stdout.write(self.style.SUCCESS("Daily revenue rollups rebuilt."))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_voucher_main_account_alter_voucher_voucher_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['reference_location', 'is_paid'], name='invoice_location_paid_idx'),
+        ),
+        migrations.CreateModel(
+            name='OpenTab',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_key', models.CharField(help_text='Normalized reference_location, e.g. TABLE T5', max_length=100, unique=True)),
+                ('opened_at', models.DateTimeField(auto_now_add=True)),
+                ('invoice', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='open_tab', to='finance.invoice')),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2 on 2026-10-18 12:40
+
+from django.db import migrations, models
+from django.db.models import Sum, Count
+
+
+def build_open_tabs(apps, schema_editor):
+    """Open a tab for every unpaid restaurant bill so the summary starts complete."""
+    Invoice = apps.get_model('finance', 'Invoice')
+    OpenTab = apps.get_model('finance', 'OpenTab')
+    Order = apps.get_model('inventory', 'Order')
+
+    latest = {}
+    for invoice in Invoice.objects.filter(is_paid=False, reference_location__isnull=False).order_by('id'):
+        latest[" ".join(invoice.reference_location.split()).upper()] = invoice
+
+    for key, invoice in latest.items():
+        orders = Order.objects.filter(invoice_items__invoice=invoice).exclude(status='RETURNED').distinct()
+        last_order = orders.order_by('-id').first()
+        if last_order is None:
+            continue
+        totals = Order.objects.filter(pk__in=orders.values('pk')).aggregate(total=Sum('total_amount'), count=Count('id'))
+        OpenTab.objects.update_or_create(
+            location_key=key,
+            defaults={
+                'invoice': invoice,
+                'room': (last_order.room or '').upper() or None,
+                'location_type': last_order.location_type,
+                'total_bill': totals['total'] or 0,
+                'order_count': totals['count'],
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_invoice_location_paid_idx_opentab'),
+        ('inventory', '0015_order_open_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opentab',
+            name='location_type',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='opentab',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='opentab',
+            name='room',
+            field=models.CharField(blank=True, help_text='Normalized room/table number', max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='opentab',
+            name='total_bill',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(build_open_tabs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2 on 2026-10-18 15:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_opentab_summary'),
+        ('inventory', '0017_recipeingredient_stock_precision'),
+        ('pms', '0003_remove_room_image_url_room_image'),
+        ('recreation', '0005_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFnbRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('station', models.CharField(max_length=20)),
+                ('location_type', models.CharField(max_length=20)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenue', to='inventory.menuitem')),
+            ],
+            options={
+                'unique_together': {('date', 'station', 'location_type', 'menu_item')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPassRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('passes', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pass_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenue', to='recreation.passtype')),
+            ],
+            options={
+                'unique_together': {('date', 'pass_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('mode', models.CharField(choices=[('CASH', 'Cash'), ('MOMO_LONESTAR', 'Momo Lonestar'), ('MOMO_ORANGE', 'Momo Orange'), ('VISA', 'Visa'), ('BANK_TRANSFER', 'Bank Transfer'), ('OTHER', 'Other')], max_length=20)),
+                ('payments', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('date', 'mode')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRoomRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('nights', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenue', to='pms.room')),
+            ],
+            options={
+                'unique_together': {('date', 'room')},
+            },
+        ),
+    ]
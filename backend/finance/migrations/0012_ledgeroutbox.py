@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 17:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_daily_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('INVOICE', 'Invoice revenue recognition'), ('PAYMENT', 'Payment received')], max_length=10)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('idempotency_key', models.CharField(help_text='e.g. invoice:42', max_length=50, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Amount at the time of the document', max_digits=12)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('POSTED', 'Posted'), ('DEAD', 'Dead letter')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not retried before this time')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('posted_at', models.DateTimeField(blank=True, null=True)),
+                ('posting', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_entries', to='finance.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx')],
+            },
+        ),
+    ]
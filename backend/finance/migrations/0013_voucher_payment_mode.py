@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0012_ledgeroutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voucher',
+            name='payment_mode',
+            field=models.CharField(choices=[('CASH', 'Cash'), ('BANK', 'Bank Transfer'), ('MOMO_LONESTAR', 'Momo Lonestar'), ('MOMO_ORANGE', 'Momo Orange'), ('VISA', 'Visa'), ('OTHER', 'Other')], default='CASH', max_length=20),
+        ),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+from collections import defaultdict
+from django.db import models, transaction
+from django.db.models import F, Case, When, Value
 from pms.models import Booking
 from django.apps import apps
+from django.utils import timezone
+from core.versioning import bump_version
+from decimal import Decimal
 
 class Account(models.Model):
     ACCOUNT_TYPES = [
@@ -15,9 +20,43 @@ class Account(models.Model):
     account_type = models.CharField(max_length=20, choices=ACCOUNT_TYPES)
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    # Normal balance is Debit (+) for these; Rev/Liab/Eq grow with Credits
+    DEBIT_NORMAL_TYPES = ('ASSET', 'EXPENSE')
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    @classmethod
+    def apply_postings(cls, postings):
+        """
+        Applies (debit_account_id, credit_account_id, amount) postings to the
+        account balances in a single UPDATE. Legs are summed per account and
+        the sign follows each row's account_type in the database, so nothing
+        is read first and concurrent postings to the same account (cash, AR)
+        only wait for each other's row lock, never lose an increment.
+        """
+        debits = defaultdict(Decimal)
+        credits = defaultdict(Decimal)
+        for debit_id, credit_id, amount in postings:
+            debits[debit_id] += amount
+            credits[credit_id] += amount
+        accounts = sorted(set(debits) | set(credits))
+        if not accounts:
+            return 0
+
+        amount_field = models.DecimalField(max_digits=14, decimal_places=2)
+        def leg(totals):
+            return Case(
+                *[When(pk=account_id, then=Value(total)) for account_id, total in totals.items()],
+                default=Value(Decimal('0')), output_field=amount_field,
+            )
+        debit, credit = leg(debits), leg(credits)
+        return cls.objects.filter(pk__in=accounts).update(balance=F('balance') + Case(
+            When(account_type__in=cls.DEBIT_NORMAL_TYPES, then=debit - credit),
+            default=credit - debit,
+            output_field=amount_field,
+        ))
+
 class Transaction(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     description = models.CharField(max_length=255)
@@ -26,24 +65,15 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            # Standard Type-Aware Normal Balance logic
-            
-            # Asset / Expense normal balance is Debit (+)
-            if self.debit_account.account_type in ['ASSET', 'EXPENSE']:
-                self.debit_account.balance += self.amount
-            else: # Rev/Liab/Eq normal balance is Credit (+), so a Debit DECREASES it
-                self.debit_account.balance -= self.amount
-            self.debit_account.save()
-            
-            # Asset / Expense Credit DECREASES (-)
-            if self.credit_account.account_type in ['ASSET', 'EXPENSE']:
-                self.credit_account.balance -= self.amount
-            else: # Rev/Liab/Eq Credit INCREASES (+)
-                self.credit_account.balance += self.amount
-            self.credit_account.save()
-            
-        super().save(*args, **kwargs)
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # Insert first so the account rows are only locked for the rest of the transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Type-aware normal balance logic, applied to both legs in one UPDATE
+            Account.apply_postings([(self.debit_account_id, self.credit_account_id, self.amount)])
 
     def __str__(self):
         return f"TX: {self.description} (${self.amount})"
@@ -142,14 +172,24 @@ class Voucher(models.Model):
     def __str__(self):
         return f"Voucher {self.voucher_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted approval so save() needn't re-fetch the row
+        if 'is_approved' in field_names:
+            instance._loaded_is_approved = values[field_names.index('is_approved')]
+        return instance
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         old_status = False
         if not is_new:
-            old_instance = Voucher.objects.get(pk=self.pk)
-            old_status = old_instance.is_approved
+            old_status = getattr(self, '_loaded_is_approved', None)
+            if old_status is None:
+                old_status = Voucher.objects.filter(pk=self.pk).values_list('is_approved', flat=True).first() or False
 
         super().save(*args, **kwargs)
+        self._loaded_is_approved = self.is_approved
 
         # Trigger transaction creation on approval
         if self.is_approved and not old_status:
@@ -160,63 +200,59 @@ class Voucher(models.Model):
         Creates a Transaction record based on voucher type and accounting rules.
         """
         try:
-            # Payment Mode to Account Code Mapping
-            pm_account_mapping = {
-                'CASH': '1000',
-                'BANK': '1100',
-                'MOMO_LONESTAR': '1110',
-                'MOMO_ORANGE': '1120',
-                'VISA': '1130',
-                'OTHER': '1140'
-            }
-            pm_code = pm_account_mapping.get(self.payment_mode, '1000') # Fallback to cash
-            pm_account = Account.objects.get(code=pm_code)
-            
-            debit_acc = None
-            credit_acc = None
-            
-            if self.main_account == 'OTHER_REVENUE':
-                # Income Revenue: DEBIT Cash/Bank (+), CREDIT Revenue (+)
-                debit_acc = pm_account
-                credit_acc = Account.objects.get(code='4200') 
-            
-            elif self.main_account == 'PURCHASES':
-                # Purchases: DEBIT Inventory/Purchase (+), CREDIT Cash/Bank (-)
-                debit_acc = Account.objects.get(code='5100')
-                credit_acc = pm_account
-            
-            elif self.main_account == 'EXPENSE':
-                # Expenses: DEBIT Expense (+), CREDIT Cash/Bank (-)
-                debit_acc = Account.objects.get(code='5900') # Default Misc
-                if 'UTILITIES' in self.voucher_type: debit_acc = Account.objects.get(code='5200')
-                elif 'MARKETING' in self.voucher_type: debit_acc = Account.objects.get(code='5300')
-                elif 'WAGES' in self.voucher_type: debit_acc = Account.objects.get(code='5000')
-                credit_acc = pm_account
-            
-            elif self.main_account == 'ASSETS':
-                # Assets: DEBIT Asset Account (+), CREDIT Cash/Bank (-)
-                try:
-                    debit_acc = Account.objects.get(code='1500')
-                except Account.DoesNotExist:
-                    debit_acc = Account.objects.get(code='1000') # Fallback
-                credit_acc = pm_account
-            
-            elif self.main_account == 'LIABILITY':
-                # Liability Payment: DEBIT Liability Account (-), CREDIT Cash/Bank (-)
-                debit_acc = Account.objects.get(code='2000')
-                credit_acc = pm_account
-
-            if debit_acc and credit_acc:
-                Transaction.objects.create(
-                    description=f"Voucher {self.voucher_number} - {self.payee} ({self.get_payment_mode_display()})",
-                    debit_account=debit_acc,
-                    credit_account=credit_acc,
-                    amount=self.total_amount
-                )
+            debit_id, credit_id = self.ledger_accounts()
+            Transaction.objects.create(
+                description=self.ledger_description(),
+                debit_account_id=debit_id,
+                credit_account_id=credit_id,
+                amount=self.total_amount
+            )
         except Account.DoesNotExist as e:
             import logging
             logging.error(f"Missing account during Voucher {self.voucher_number} sync: {e}")
 
+    def ledger_description(self):
+        return f"Voucher {self.voucher_number} - {self.payee} ({self.get_payment_mode_display()})"
+
+    def ledger_accounts(self):
+        """
+        (debit account id, credit account id) of the voucher's posting, from
+        the cached chart of accounts. Raises Account.DoesNotExist if one is missing.
+        """
+        from .chart import role_id, payment_mode_account_id
+
+        # Payment mode account (Cash/Bank/Momo...), cash if unknown
+        pm_account = payment_mode_account_id(self.payment_mode)
+
+        if self.main_account == 'OTHER_REVENUE':
+            # Income Revenue: DEBIT Cash/Bank (+), CREDIT Revenue (+)
+            return pm_account, role_id('other_revenue')
+
+        if self.main_account == 'PURCHASES':
+            # Purchases: DEBIT Inventory/Purchase (+), CREDIT Cash/Bank (-)
+            return role_id('purchases'), pm_account
+
+        if self.main_account == 'EXPENSE':
+            # Expenses: DEBIT Expense (+), CREDIT Cash/Bank (-)
+            role = 'misc_expense' # Default Misc
+            if 'UTILITIES' in self.voucher_type: role = 'utilities'
+            elif 'MARKETING' in self.voucher_type: role = 'marketing'
+            elif 'WAGES' in self.voucher_type: role = 'wages'
+            return role_id(role), pm_account
+
+        if self.main_account == 'ASSETS':
+            # Assets: DEBIT Asset Account (+), CREDIT Cash/Bank (-)
+            try:
+                return role_id('fixed_assets'), pm_account
+            except Account.DoesNotExist:
+                return role_id('cash'), pm_account # Fallback
+
+        if self.main_account == 'LIABILITY':
+            # Liability Payment: DEBIT Liability Account (-), CREDIT Cash/Bank (-)
+            return role_id('liabilities'), pm_account
+
+        raise Account.DoesNotExist(f"No ledger accounts for main account {self.main_account}")
+
 class Invoice(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='invoices')
     reference_location = models.CharField(max_length=100, blank=True, null=True, help_text="Direct room/table reference if no booking (e.g. Table T5)")
@@ -239,6 +275,12 @@ class Invoice(models.Model):
 
     is_paid = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Open-bill lookups by room/table
+            models.Index(fields=['reference_location', 'is_paid'], name='invoice_location_paid_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # Calculate HT from items total if not set, or just ensure HT/FT consistency
         # For simplicity, if discount is applied, update total_ft
@@ -257,6 +299,27 @@ class Invoice(models.Model):
         
         super().save(*args, **kwargs)
 
+    @classmethod
+    def add_to_totals(cls, invoice_id, amount):
+        """
+        Adds `amount` to an invoice's totals in a single UPDATE, applying the
+        same discount rules as save(), so concurrent additions are never lost.
+        """
+        # Every right-hand side reads the row's pre-update values
+        total_ht = F('total_ht') + amount
+        total_ft = Case(
+            When(discount_amount__gt=0, discount_type='PERCENT',
+                 then=total_ht - (total_ht * F('discount_amount')) / Decimal('100')),
+            When(discount_amount__gt=0, discount_type='FIXED',
+                 then=total_ht - F('discount_amount')),
+            default=total_ht,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+        updated = cls.objects.filter(pk=invoice_id).update(total_ht=total_ht, total_ft=total_ft, balance_ptd=total_ft)
+        # update() skips the post_save version bump
+        bump_version('invoice')
+        return updated
+
     @property
     def is_service_ready(self):
         """
@@ -271,6 +334,28 @@ class Invoice(models.Model):
     def __str__(self):
         return f"Invoice {self.invoice_number}"
 
+class OpenTab(models.Model):
+    """
+    The one open (unpaid) bill of a room/table. Order placement locks this
+    row, so waiters ordering for the same table at once share one invoice.
+    Closed (deleted) when its invoice is paid.
+
+    Also carries the running bill summary shown on the waiter page, kept up
+    to date as orders are placed and returned.
+    """
+    location_key = models.CharField(max_length=100, unique=True, help_text="Normalized reference_location, e.g. TABLE T5")
+    invoice = models.OneToOneField(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='open_tab')
+    opened_at = models.DateTimeField(auto_now_add=True)
+
+    # Running open-bill summary
+    room = models.CharField(max_length=50, blank=True, null=True, help_text="Normalized room/table number")
+    location_type = models.CharField(max_length=20, blank=True)
+    total_bill = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Open tab {self.location_key}"
+
 class InvoiceItem(models.Model):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='items')
     related_order = models.ForeignKey('inventory.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='invoice_items')
@@ -302,6 +387,96 @@ class Payment(models.Model):
     def __str__(self):
         return f"Payment {self.amount} ({self.mode}) for {self.invoice.invoice_number}"
 
+class LedgerOutbox(models.Model):
+    """
+    Pending ledger posting for an invoice or payment, written in the same
+    transaction as the document and posted later by finance.outbox (see the
+    drain_ledger_outbox command). One row per source document.
+    """
+    KIND_CHOICES = [
+        ('INVOICE', 'Invoice revenue recognition'),
+        ('PAYMENT', 'Payment received'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('POSTED', 'Posted'),
+        ('DEAD', 'Dead letter'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    idempotency_key = models.CharField(max_length=50, unique=True, help_text="e.g. invoice:42")
+    amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="Amount at the time of the document")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not retried before this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_at = models.DateTimeField(blank=True, null=True)
+    posting = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_entries')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+        ]
+
+    @classmethod
+    def enqueue(cls, kind, source_id, amount):
+        """Queues the posting of a document; a second enqueue of the same document is a no-op."""
+        cls.objects.bulk_create(
+            [cls(kind=kind, source_id=source_id, idempotency_key=f"{kind.lower()}:{source_id}", amount=amount)],
+            ignore_conflicts=True,
+        )
+
+    def __str__(self):
+        return f"{self.idempotency_key} ({self.status})"
+
+# Daily revenue rollups, kept up to date by finance.rollups as orders are
+# served/returned, passes sold, payments taken and rooms booked. Week/month/
+# year reports sum these instead of scanning the transactional tables.
+
+class DailyFnbRevenue(models.Model):
+    """Served food & drink per day, station, order location and menu item (by order date)."""
+    date = models.DateField()
+    station = models.CharField(max_length=20)
+    location_type = models.CharField(max_length=20)
+    menu_item = models.ForeignKey('inventory.MenuItem', on_delete=models.CASCADE, related_name='daily_revenue')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'station', 'location_type', 'menu_item')
+
+class DailyPassRevenue(models.Model):
+    """Access passes sold per day and pass type (location comes from the pass type)."""
+    date = models.DateField()
+    pass_type = models.ForeignKey('recreation.PassType', on_delete=models.CASCADE, related_name='daily_revenue')
+    passes = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'pass_type')
+
+class DailyPaymentTotal(models.Model):
+    """Payments received per day and mode."""
+    date = models.DateField()
+    mode = models.CharField(max_length=20, choices=Payment.MODE_CHOICES)
+    payments = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'mode')
+
+class DailyRoomRevenue(models.Model):
+    """Room nights on the books per stay night and room, at the booking's nightly rate."""
+    date = models.DateField()
+    room = models.ForeignKey('pms.Room', on_delete=models.CASCADE, related_name='daily_revenue')
+    nights = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'room')
+
 from django.conf import settings
 
 class EmployeeSalary(models.Model):
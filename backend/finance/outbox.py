@@ -0,0 +1,114 @@
+"""
+Ledger outbox worker.
+
+Invoice and payment saves only queue a LedgerOutbox row (finance.signals);
+drain_outbox turns pending rows into Transactions in batches. Rows are
+claimed with SKIP LOCKED so several workers can drain side by side, and
+each row is posted in its own savepoint together with its status change,
+so a posting is written exactly once per idempotency key. Failures are
+retried with exponential backoff and parked as DEAD after MAX_ATTEMPTS.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from .models import Transaction, Invoice, InvoiceItem, Payment, LedgerOutbox
+from . import chart
+from .ledger import (
+    AR_CODE, CASH_CODE, SALES_REVENUE_CODE, invoice_revenue_code,
+    invoice_posting_description, payment_posting_description,
+)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRY_BASE = timedelta(seconds=30)
+
+
+class PostingError(Exception):
+    pass
+
+
+def _account(accounts, code):
+    if code not in accounts:
+        raise PostingError(f"Account {code} does not exist")
+    return accounts[code]
+
+
+def _invoice_posting(entry, invoice, accounts):
+    if invoice is None:
+        raise PostingError(f"Invoice {entry.source_id} no longer exists")
+    revenue_code = invoice_revenue_code(invoice.first_item)
+    if revenue_code not in accounts:
+        revenue_code = SALES_REVENUE_CODE
+    return Transaction.objects.create(
+        description=invoice_posting_description(invoice),
+        debit_account_id=_account(accounts, AR_CODE),
+        credit_account_id=_account(accounts, revenue_code),
+        amount=entry.amount,
+    )
+
+
+def _payment_posting(entry, payment, accounts):
+    if payment is None:
+        raise PostingError(f"Payment {entry.source_id} no longer exists")
+    return Transaction.objects.create(
+        description=payment_posting_description(payment.invoice.invoice_number, payment.mode),
+        debit_account_id=_account(accounts, CASH_CODE),
+        credit_account_id=_account(accounts, AR_CODE),
+        amount=entry.amount,
+    )
+
+
+def _failed(entry, error, now):
+    entry.last_error = str(error)
+    entry.posting = entry.posted_at = None
+    if entry.attempts >= MAX_ATTEMPTS:
+        entry.status = 'DEAD'
+    else:
+        entry.status = 'PENDING'
+        entry.available_at = now + RETRY_BASE * 2 ** (entry.attempts - 1)
+    entry.save(update_fields=['attempts', 'last_error', 'status', 'available_at', 'posting', 'posted_at'])
+
+
+def drain_outbox(batch_size=BATCH_SIZE):
+    """Posts up to `batch_size` due entries. Returns (posted, failed)."""
+    posted = failed = 0
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            LedgerOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now).order_by('id')[:batch_size]
+        )
+        if not entries:
+            return posted, failed
+
+        accounts = chart.codes()
+        first_item = InvoiceItem.objects.filter(invoice=OuterRef('pk')).order_by('id').values('description')[:1]
+        invoices = Invoice.objects.annotate(first_item=Subquery(first_item)) \
+            .in_bulk([entry.source_id for entry in entries if entry.kind == 'INVOICE'])
+        payments = Payment.objects.select_related('invoice') \
+            .in_bulk([entry.source_id for entry in entries if entry.kind == 'PAYMENT'])
+
+        for entry in entries:
+            entry.attempts += 1
+            try:
+                with transaction.atomic():
+                    if entry.kind == 'INVOICE':
+                        posting = _invoice_posting(entry, invoices.get(entry.source_id), accounts)
+                    else:
+                        posting = _payment_posting(entry, payments.get(entry.source_id), accounts)
+                    entry.status = 'POSTED'
+                    entry.posting = posting
+                    entry.posted_at = timezone.now()
+                    entry.last_error = ''
+                    entry.save(update_fields=['status', 'posting', 'posted_at', 'attempts', 'last_error'])
+                posted += 1
+            except Exception as e:
+                _failed(entry, e, now)
+                failed += 1
+    return posted, failed
+
+
+def retry_entries(queryset):
+    """Sends dead (or failing) entries back to the queue for immediate retry."""
+    return queryset.exclude(status='POSTED').update(status='PENDING', attempts=0, available_at=timezone.now())
@@ -0,0 +1,187 @@
+"""
+Incremental maintenance of the daily revenue rollup tables.
+
+Every change is applied as a delta to the (date, dimensions) row with a
+database-side F() increment inside the writer's transaction, so a rolled
+back sale never reaches the rollups. `rebuild_rollups` recomputes all four
+tables from the source data (see the rebuild_rollups command).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum, Count, DecimalField, ExpressionWrapper
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Payment, DailyFnbRevenue, DailyPassRevenue, DailyPaymentTotal, DailyRoomRevenue
+
+CENTS = Decimal('0.01')
+
+
+def _add(model, key, **deltas):
+    """Adds `deltas` to the rollup row identified by `key`, creating it if needed."""
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**key).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**key).update(**increments)
+
+
+def _local_date(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+# --- Food & beverage ---
+
+def record_order_lines(order, lines, sign=1):
+    """
+    Adds (sign=1) or removes (sign=-1) served order lines, given as
+    (menu_item, quantity, price) tuples, on the order's date.
+    """
+    day = _local_date(order.created_at)
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for menu_item, quantity, price in lines:
+        key = (menu_item.preparation_station, menu_item.id)
+        totals[key][0] += quantity
+        totals[key][1] += quantity * (price or Decimal('0'))
+
+    for (station, menu_item_id), (quantity, revenue) in totals.items():
+        _add(
+            DailyFnbRevenue,
+            {'date': day, 'station': station, 'location_type': order.location_type, 'menu_item_id': menu_item_id},
+            quantity=sign * quantity, revenue=sign * revenue,
+        )
+
+
+def record_order_served(order, sign=1):
+    """An order entering (sign=1) or leaving (sign=-1) SERVED counts all its current lines."""
+    record_order_lines(
+        order,
+        [(item.menu_item, item.quantity, item.price_at_time) for item in order.items.all()],
+        sign,
+    )
+
+
+# --- Passes, payments, rooms ---
+
+# Signals snapshot these states when a row is loaded or saved, so an edit
+# can be applied as "remove the old state, add the new one".
+
+def pass_state(access_pass):
+    return (access_pass.created_at, access_pass.pass_type_id, access_pass.amount_paid)
+
+
+def record_pass_sale(state, sign=1):
+    if state is None:
+        return
+    created_at, pass_type_id, amount_paid = state
+    _add(
+        DailyPassRevenue,
+        {'date': _local_date(created_at), 'pass_type_id': pass_type_id},
+        passes=sign, revenue=sign * Decimal(str(amount_paid)),
+    )
+
+
+def payment_state(payment):
+    return (payment.date_paid, payment.mode, payment.amount)
+
+
+def record_payment(state, sign=1):
+    if state is None:
+        return
+    date_paid, mode, amount = state
+    _add(
+        DailyPaymentTotal,
+        {'date': _local_date(date_paid), 'mode': mode},
+        payments=sign, amount=sign * Decimal(str(amount)),
+    )
+
+
+def booking_nights(room_id, check_in, check_out, total_price, status):
+    """{night: revenue} a booking puts on the books; cancelled bookings put nothing."""
+    if status == 'CANCELLED' or not room_id or not check_in or not check_out:
+        return {}
+    nights = max((check_out - check_in).days, 1)
+    total = Decimal(str(total_price or 0))
+    rate = (total / nights).quantize(CENTS, rounding=ROUND_HALF_UP)
+    revenue = {check_in + timedelta(days=n): rate for n in range(nights)}
+    # Rounding remainder goes on the first night so the nights sum to the total
+    revenue[check_in] += total - rate * nights
+    return revenue
+
+
+def booking_state(booking):
+    return (booking.room_id, booking.check_in, booking.check_out, booking.total_price, booking.status)
+
+
+def record_booking(state, sign=1):
+    if state is None:
+        return
+    room_id = state[0]
+    for night, revenue in booking_nights(*state).items():
+        _add(DailyRoomRevenue, {'date': night, 'room_id': room_id}, nights=sign, revenue=sign * revenue)
+
+
+# --- Full rebuild ---
+
+@transaction.atomic
+def rebuild_rollups():
+    """
+    Recomputes every rollup table from the source tables. Rows are deleted
+    first, so writers racing the rebuild wait on them and land afterwards.
+    Returns {table: rows written}.
+    """
+    from inventory.models import OrderItem
+    from recreation.models import AccessPass
+    from pms.models import Booking
+
+    for model in (DailyFnbRevenue, DailyPassRevenue, DailyPaymentTotal, DailyRoomRevenue):
+        model.objects.all().delete()
+
+    line_total = ExpressionWrapper(F('price_at_time') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    fnb = DailyFnbRevenue.objects.bulk_create([
+        DailyFnbRevenue(
+            date=row['day'], station=row['menu_item__preparation_station'], location_type=row['order__location_type'],
+            menu_item_id=row['menu_item_id'], quantity=row['quantity'], revenue=row['revenue'] or 0,
+        )
+        for row in OrderItem.objects.filter(order__status='SERVED')
+            .annotate(day=TruncDate('order__created_at'))
+            .values('day', 'menu_item__preparation_station', 'order__location_type', 'menu_item_id')
+            # revenue first: once `quantity` is an annotation, line_total's F('quantity') would mean it
+            .annotate(revenue=Sum(line_total), quantity=Sum('quantity'))
+    ])
+
+    passes = DailyPassRevenue.objects.bulk_create([
+        DailyPassRevenue(date=row['day'], pass_type_id=row['pass_type_id'], passes=row['passes'], revenue=row['revenue'] or 0)
+        for row in AccessPass.objects.annotate(day=TruncDate('created_at'))
+            .values('day', 'pass_type_id')
+            .annotate(passes=Count('id'), revenue=Sum('amount_paid'))
+    ])
+
+    payments = DailyPaymentTotal.objects.bulk_create([
+        DailyPaymentTotal(date=row['day'], mode=row['mode'], payments=row['payments'], amount=row['amount'] or 0)
+        for row in Payment.objects.annotate(day=TruncDate('date_paid'))
+            .values('day', 'mode')
+            .annotate(payments=Count('id'), amount=Sum('amount'))
+    ])
+
+    room_nights = defaultdict(lambda: [0, Decimal('0')])
+    for state in Booking.objects.exclude(status='CANCELLED').values_list('room_id', 'check_in', 'check_out', 'total_price', 'status'):
+        for night, revenue in booking_nights(*state).items():
+            room_nights[(night, state[0])][0] += 1
+            room_nights[(night, state[0])][1] += revenue
+    rooms = DailyRoomRevenue.objects.bulk_create([
+        DailyRoomRevenue(date=night, room_id=room_id, nights=nights, revenue=revenue)
+        for (night, room_id), (nights, revenue) in room_nights.items()
+    ])
+
+    return {
+        'fnb': len(fnb),
+        'passes': len(passes),
+        'payments': len(payments),
+        'rooms': len(rooms),
+    }
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Invoice, InvoiceItem, Payment, Account, Transaction, Voucher, EmployeeSalary
+from .models import Invoice, InvoiceItem, Payment, Account, Transaction, Voucher, EmployeeSalary, LedgerOutbox
 
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,6 +13,11 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = '__all__'
 
+class LedgerOutboxSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LedgerOutbox
+        fields = '__all__'
+
 class VoucherSerializer(serializers.ModelSerializer):
     class Meta:
         model = Voucher
@@ -1,58 +1,68 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import Invoice, Payment, Account, Transaction
-from decimal import Decimal
+from pms.models import Booking
+from recreation.models import AccessPass
+from .models import Invoice, Payment, Account, LedgerOutbox
+from . import chart
+from .tabs import close_tab
+from .rollups import payment_state, record_payment, pass_state, record_pass_sale, booking_state, record_booking
+
+# Ledger postings go through the outbox: the document's transaction only
+# queues them, finance.outbox posts them (drain_ledger_outbox).
 
 @receiver(post_save, sender=Invoice)
-def create_invoice_ledger_entry(sender, instance, created, **kwargs):
+def queue_invoice_ledger_entry(sender, instance, created, **kwargs):
     if created:
-        try:
-            # Determine Revenue Account based on description or location
-            # Default to Sales Revenue (4000)
-            revenue_account = Account.objects.get(code='4000')
-            ar_account = Account.objects.get(code='1100')
-            
-            # Check if it's Dining or Bar revenue based on first item description
-            first_item = instance.items.first()
-            if first_item:
-                if 'Order' in first_item.description:
-                    # Could refine this if we had station info on InvoiceItem
-                    # For now, let's use a general Dining Revenue (4100) if it exists
-                    try:
-                        revenue_account = Account.objects.get(code='4100')
-                    except Account.DoesNotExist:
-                        pass
-                elif 'Pass' in first_item.description or 'Pool' in first_item.description or 'Beach' in first_item.description:
-                    try:
-                        revenue_account = Account.objects.get(code='4300')
-                    except Account.DoesNotExist:
-                        pass
-
-            Transaction.objects.create(
-                description=f"Revenue Recognition: {instance.invoice_number} ({instance.reference_location or 'General'})",
-                debit_account=ar_account,
-                credit_account=revenue_account,
-                amount=instance.total_ft
-            )
-        except Account.DoesNotExist as e:
-            print(f"Error creating ledger entry: {e}")
-        except Exception as e:
-            print(f"Unexpected error in invoice signal: {e}")
+        LedgerOutbox.enqueue('INVOICE', instance.id, instance.total_ft)
 
 @receiver(post_save, sender=Payment)
-def create_payment_ledger_entry(sender, instance, created, **kwargs):
+def queue_payment_ledger_entry(sender, instance, created, **kwargs):
     if created:
-        try:
-            cash_account = Account.objects.get(code='1000')
-            ar_account = Account.objects.get(code='1100')
-            
-            Transaction.objects.create(
-                description=f"Payment Received: {instance.invoice.invoice_number} via {instance.mode}",
-                debit_account=cash_account,
-                credit_account=ar_account,
-                amount=instance.amount
-            )
-        except Account.DoesNotExist as e:
-            print(f"Error creating payment ledger entry: {e}")
-        except Exception as e:
-            print(f"Unexpected error in payment signal: {e}")
+        LedgerOutbox.enqueue('PAYMENT', instance.id, instance.amount)
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def invalidate_chart_of_accounts(sender, **kwargs):
+    # Other workers notice through the 'account' change-version
+    chart.invalidate()
+
+@receiver(post_save, sender=Invoice)
+def close_paid_invoice_tab(sender, instance, created, **kwargs):
+    if instance.is_paid and not created:
+        close_tab(instance)
+
+@receiver(pre_delete, sender=Invoice)
+def close_deleted_invoice_tab(sender, instance, **kwargs):
+    # Before the delete nulls OpenTab.invoice, so the tab can still be found
+    close_tab(instance)
+
+# Daily revenue rollups: each source row remembers the state it was loaded
+# or saved with, and every save/delete moves the rollups from old to new.
+
+ROLLUP_SOURCES = [
+    (Payment, payment_state, record_payment),
+    (AccessPass, pass_state, record_pass_sale),
+    (Booking, booking_state, record_booking),
+]
+
+def _connect_rollup(model, state_of, record):
+    def loaded(sender, instance, **kwargs):
+        instance._rollup_state = state_of(instance) if instance.pk else None
+
+    def saved(sender, instance, **kwargs):
+        new_state = state_of(instance)
+        if new_state != instance._rollup_state:
+            record(instance._rollup_state, sign=-1)
+            record(new_state)
+            instance._rollup_state = new_state
+
+    def deleted(sender, instance, **kwargs):
+        record(instance._rollup_state, sign=-1)
+
+    label = model._meta.label
+    post_init.connect(loaded, sender=model, weak=False, dispatch_uid=f'rollup-init-{label}')
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=f'rollup-save-{label}')
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f'rollup-delete-{label}')
+
+for model, state_of, record in ROLLUP_SOURCES:
+    _connect_rollup(model, state_of, record)
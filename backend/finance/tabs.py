@@ -0,0 +1,77 @@
+import uuid
+from django.db.models import F, Sum, Count
+from pms.models import Booking
+from inventory.models import Order
+from .models import Invoice, OpenTab
+
+
+def normalize_location(location_label):
+    """'Table  t5' and 'TABLE T5' are the same tab."""
+    return " ".join((location_label or "").split()).upper()
+
+
+def add_to_open_tab(location_label, amount, room_number=None, location_type=''):
+    """
+    Adds an order of `amount` to the open bill of a room/table and returns
+    its invoice, opening a tab (and invoice) if the location has none. Must
+    run inside transaction.atomic: the tab row stays locked until commit.
+    """
+    key = normalize_location(location_label)
+    room = (room_number or '').upper() or None
+
+    # A concurrent first order for the same location blocks on the unique
+    # key here and then reuses the tab the other waiter created.
+    tab, _ = OpenTab.objects.get_or_create(location_key=key)
+    tab = OpenTab.objects.select_for_update().select_related('invoice').get(pk=tab.pk)
+
+    invoice = tab.invoice
+    if invoice is not None and not invoice.is_paid:
+        Invoice.add_to_totals(invoice.id, amount)
+        OpenTab.objects.filter(pk=tab.pk).update(
+            total_bill=F('total_bill') + amount,
+            order_count=F('order_count') + 1,
+        )
+        return invoice
+
+    total_bill, order_count = amount, 1
+
+    # Adopt an unpaid bill opened before tabs existed
+    invoice = Invoice.objects.filter(reference_location=location_label, is_paid=False).order_by('id').last()
+    if invoice:
+        Invoice.add_to_totals(invoice.id, amount)
+        # The new order's invoice lines are not written yet, so it isn't counted twice
+        earlier = Order.objects.filter(invoice_items__invoice=invoice).exclude(status='RETURNED').values('pk')
+        totals = Order.objects.filter(pk__in=earlier).aggregate(total=Sum('total_amount'), count=Count('id'))
+        total_bill += totals['total'] or 0
+        order_count += totals['count']
+    else:
+        invoice = Invoice.objects.create(
+            booking=Booking.objects.filter(room__room_number=room_number, is_checked_in=True).last() if room_number else None,
+            reference_location=location_label,
+            invoice_number=f"INV-{uuid.uuid4().hex[:8].upper()}",
+            total_ht=amount,
+            total_ft=amount,
+            balance_ptd=amount,
+            is_paid=False
+        )
+
+    tab.invoice = invoice
+    tab.room = room
+    tab.location_type = location_type
+    tab.total_bill = total_bill
+    tab.order_count = order_count
+    tab.save(update_fields=['invoice', 'room', 'location_type', 'total_bill', 'order_count'])
+    return invoice
+
+
+def adjust_open_tab(invoice, amount_delta, order_delta=0):
+    """Applies a return to the running summary of the invoice's tab, if still open."""
+    OpenTab.objects.filter(invoice=invoice).update(
+        total_bill=F('total_bill') + amount_delta,
+        order_count=F('order_count') + order_delta,
+    )
+
+
+def close_tab(invoice):
+    """Called once an invoice is settled so the next order opens a new bill."""
+    OpenTab.objects.filter(invoice=invoice).delete()
@@ -1,3 +1,330 @@
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from core.versioning import bump_version
+from rest_framework.test import APIClient
+from core.models import User
+from inventory.models import MenuCategory, MenuItem, Order, OrderReturn, OrderReturnItem
+from inventory.prep_estimates import prep_estimator
+from . import chart
+from .models import (
+    Account, Transaction, Voucher, Invoice, Payment, LedgerOutbox, OpenTab, DailyFnbRevenue, DailyPaymentTotal,
+)
+from .outbox import drain_outbox, MAX_ATTEMPTS
+from .tabs import add_to_open_tab
+from .rollups import rebuild_rollups
 
-# Create your tests here.
+
+class OpenTabTests(TestCase):
+    def test_orders_at_one_location_share_a_tab_and_invoice(self):
+        first = add_to_open_tab('Table T5', Decimal('20.00'), room_number='t5', location_type='TABLE')
+        second = add_to_open_tab('table  t5', Decimal('15.50'), room_number='T5', location_type='TABLE')
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Invoice.objects.count(), 1)
+        second.refresh_from_db()
+        self.assertEqual((second.total_ht, second.total_ft, second.balance_ptd), (Decimal('35.50'),) * 3)
+        tab = OpenTab.objects.get()
+        self.assertEqual((tab.location_key, tab.room), ('TABLE T5', 'T5'))
+        self.assertEqual((tab.total_bill, tab.order_count), (Decimal('35.50'), 2))
+
+    def test_other_locations_get_their_own_tab(self):
+        first = add_to_open_tab('Table T5', Decimal('20.00'))
+        other = add_to_open_tab('Table T6', Decimal('20.00'))
+        self.assertNotEqual(first.pk, other.pk)
+        self.assertEqual(OpenTab.objects.count(), 2)
+
+    def test_paying_the_invoice_starts_a_new_bill(self):
+        invoice = add_to_open_tab('Room 101', Decimal('30.00'), room_number='101', location_type='ROOM')
+        invoice.is_paid = True
+        invoice.save()
+        self.assertFalse(OpenTab.objects.exists())
+
+        again = add_to_open_tab('Room 101', Decimal('8.00'), room_number='101', location_type='ROOM')
+        self.assertNotEqual(again.pk, invoice.pk)
+        self.assertEqual(again.total_ft, Decimal('8.00'))
+        self.assertEqual(OpenTab.objects.get().order_count, 1)
+
+    def test_discount_is_applied_to_added_orders(self):
+        invoice = add_to_open_tab('Table T9', Decimal('100.00'))
+        Invoice.objects.filter(pk=invoice.pk).update(discount_type='PERCENT', discount_amount=Decimal('10'))
+        add_to_open_tab('Table T9', Decimal('100.00'))
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.total_ht, Decimal('200.00'))
+        self.assertEqual(invoice.total_ft, Decimal('180.00'))
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        prep_estimator.loaded_at = time.monotonic()
+        category = MenuCategory.objects.create(name='Menu', slug='menu')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('12.50'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('4.00'), preparation_station='BAR')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='manager', password='x', role='ADMIN'))
+
+    def place(self, lines):
+        response = self.client.post(reverse('order-list'), {
+            'room': 'T5', 'location_type': 'TABLE',
+            'items': [{'menu_item': menu_item.id, 'quantity': quantity} for menu_item, quantity in lines],
+        }, format='json')
+        return Order.objects.get(pk=response.data['id'])
+
+    def rollups(self):
+        fnb = {
+            (row.date, row.station, row.location_type, row.menu_item_id): (row.quantity, row.revenue)
+            for row in DailyFnbRevenue.objects.exclude(quantity=0, revenue=0)
+        }
+        payments = {
+            (row.date, row.mode): (row.payments, row.amount)
+            for row in DailyPaymentTotal.objects.exclude(payments=0)
+        }
+        return fnb, payments
+
+    def test_rollups_match_the_source_tables_after_serving_and_returning(self):
+        order = self.place([(self.rice, 2), (self.beer, 3)])
+        # Never served: not revenue
+        self.place([(self.rice, 1)])
+        self.client.post(reverse('order-update-status', args=[order.pk]), {'status': 'SERVED'}, format='json')
+
+        ret = OrderReturn.objects.create(order=order, reason='Warm', status='APPROVED_STATION')
+        OrderReturnItem.objects.create(order_return=ret, order_item=order.items.get(menu_item=self.beer), quantity=1)
+        self.client.post(reverse('order-return-approve-admin', args=[ret.pk]))
+        Payment.objects.create(invoice=Invoice.objects.get(), amount=Decimal('33.00'), mode='CASH')
+
+        fnb, payments = self.rollups()
+        day = timezone.localdate(order.created_at)
+        self.assertEqual(fnb, {
+            (day, 'KITCHEN', 'TABLE', self.rice.id): (2, Decimal('25.00')),
+            (day, 'BAR', 'TABLE', self.beer.id): (2, Decimal('8.00')),
+        })
+        self.assertEqual(payments, {(timezone.localdate(), 'CASH'): (1, Decimal('33.00'))})
+
+        # The incremental rows are exactly what a rebuild from scratch writes
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), (fnb, payments))
+
+    def test_returning_a_whole_served_order_empties_its_rollup(self):
+        order = self.place([(self.beer, 2)])
+        self.client.post(reverse('order-update-status', args=[order.pk]), {'status': 'SERVED'}, format='json')
+        ret = OrderReturn.objects.create(order=order, reason='Wrong order', status='APPROVED_STATION')
+        OrderReturnItem.objects.create(order_return=ret, order_item=order.items.get(), quantity=2)
+        self.client.post(reverse('order-return-approve-admin', args=[ret.pk]))
+
+        self.assertEqual(self.rollups(), ({}, {}))
+
+
+class ApplyPostingsTests(TestCase):
+    def setUp(self):
+        self.cash = Account.objects.create(name='Cash', code='1000', account_type='ASSET', balance=Decimal('100.00'))
+        self.revenue = Account.objects.create(name='Sales', code='4000', account_type='REVENUE')
+        self.expense = Account.objects.create(name='Misc', code='5900', account_type='EXPENSE')
+
+    def test_legs_on_the_same_account_are_netted(self):
+        Account.apply_postings([
+            (self.cash.id, self.revenue.id, Decimal('50.00')),
+            (self.expense.id, self.cash.id, Decimal('20.00')),
+        ])
+        self.cash.refresh_from_db()
+        self.revenue.refresh_from_db()
+        self.expense.refresh_from_db()
+        # Cash is debited 50 and credited 20 in the same UPDATE
+        self.assertEqual(self.cash.balance, Decimal('130.00'))
+        self.assertEqual(self.revenue.balance, Decimal('50.00'))
+        self.assertEqual(self.expense.balance, Decimal('20.00'))
+
+    def test_no_postings_touch_nothing(self):
+        self.assertEqual(Account.apply_postings([]), 0)
+
+
+class LedgerOutboxTests(TestCase):
+    def setUp(self):
+        chart.invalidate()
+        # Queued by the post_save signal; no AR account exists yet
+        self.invoice = Invoice.objects.create(
+            invoice_number='INV-TEST', total_ht=Decimal('40.00'), total_ft=Decimal('40.00'), balance_ptd=Decimal('40.00'),
+        )
+        self.entry = LedgerOutbox.objects.get(kind='INVOICE', source_id=self.invoice.id)
+
+    def tearDown(self):
+        chart.invalidate()
+
+    def _make_due(self):
+        LedgerOutbox.objects.filter(pk=self.entry.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_failed_entry_is_retried_later(self):
+        self.assertEqual(drain_outbox(), (0, 1))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, 'PENDING')
+        self.assertEqual(self.entry.attempts, 1)
+        self.assertGreater(self.entry.available_at, timezone.now())
+        # Backing off: not picked up again straight away
+        self.assertEqual(drain_outbox(), (0, 0))
+
+        Account.objects.create(name='Receivables', code='1100', account_type='ASSET')
+        Account.objects.create(name='Sales', code='4000', account_type='REVENUE')
+        self._make_due()
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, 'POSTED')
+        self.assertEqual(self.entry.attempts, 2)
+        self.assertEqual(self.entry.posting.amount, Decimal('40.00'))
+
+    def test_entry_is_dead_lettered_after_max_attempts(self):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self._make_due()
+            self.assertEqual(drain_outbox(), (0, 1))
+            self.entry.refresh_from_db()
+            self.assertEqual(self.entry.attempts, attempt)
+        self.assertEqual(self.entry.status, 'DEAD')
+        self.assertIn('1100', self.entry.last_error)
+
+        self._make_due()
+        self.assertEqual(drain_outbox(), (0, 0))
+        self.assertFalse(Transaction.objects.exists())
+
+
+class BulkApproveTests(TestCase):
+    def setUp(self):
+        chart.invalidate()
+        self.cash = Account.objects.create(name='Cash', code='1000', account_type='ASSET', balance=Decimal('500.00'))
+        self.expense = Account.objects.create(name='Misc', code='5900', account_type='EXPENSE')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='accountant', password='x', role='ADMIN'))
+
+    def tearDown(self):
+        chart.invalidate()
+
+    def _voucher(self, number, amount, **fields):
+        return Voucher.objects.create(
+            voucher_number=number, voucher_type='EXPENSE_MISC', payee='Supplier',
+            description='Supplies', total_amount=Decimal(amount), **fields,
+        )
+
+    def test_skips_approved_and_missing_vouchers(self):
+        first = self._voucher('V-1', '30.00')
+        second = self._voucher('V-2', '20.00')
+        approved = self._voucher('V-3', '99.00', is_approved=True)
+        self.cash.refresh_from_db()
+        balance = self.cash.balance
+        transactions = Transaction.objects.count()
+
+        response = self.client.post(
+            reverse('voucher-bulk-approve'), {'ids': [first.id, approved.id, 999999, second.id, first.id]}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['approved'], [first.id, second.id])
+        self.assertEqual(response.data['transactions'], 2)
+        self.assertEqual(
+            [(skip['id'], skip['reason']) for skip in response.data['skipped']],
+            [(approved.id, 'Already approved'), (999999, 'Voucher not found')],
+        )
+        self.assertEqual(Transaction.objects.count(), transactions + 2)
+        self.assertEqual(Voucher.objects.filter(is_approved=True).count(), 3)
+        self.cash.refresh_from_db()
+        self.expense.refresh_from_db()
+        self.assertEqual(self.cash.balance, balance - Decimal('50.00'))
+        self.assertEqual(self.expense.balance, Decimal('149.00'))
+
+    def test_rejects_non_list_ids(self):
+        response = self.client.post(reverse('voucher-bulk-approve'), {'ids': 'all'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RebuildLedgerTests(TestCase):
+    def setUp(self):
+        chart.invalidate()
+        self.cash = Account.objects.create(name='Cash', code='1000', account_type='ASSET')
+        self.receivables = Account.objects.create(name='Receivables', code='1100', account_type='ASSET')
+        self.sales = Account.objects.create(name='Sales', code='4000', account_type='REVENUE')
+        invoice = Invoice.objects.create(
+            invoice_number='INV-100', total_ht=Decimal('40.00'), total_ft=Decimal('40.00'), balance_ptd=Decimal('40.00'),
+        )
+        Payment.objects.create(invoice=invoice, amount=Decimal('15.00'), mode='CASH')
+        # Marked posted but the postings never made it into the journal, and Cash drifted
+        LedgerOutbox.objects.update(status='POSTED')
+        Account.objects.filter(pk=self.cash.pk).update(balance=Decimal('999.00'))
+
+    def tearDown(self):
+        chart.invalidate()
+
+    def balances(self):
+        return dict(Account.objects.values_list('code', 'balance'))
+
+    def rebuild(self, *args):
+        out = io.StringIO()
+        call_command('rebuild_ledger', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_the_diff_without_writing(self):
+        output = self.rebuild('--dry-run')
+
+        self.assertIn('Would create 2 missing postings', output)
+        self.assertIn('Revenue Recognition: INV-100 (General): 40.00', output)
+        self.assertIn('Payment Received: INV-100 via CASH: 15.00', output)
+        self.assertIn('1000 - Cash: 999.00 -> 15.00 (-984.00)', output)
+        self.assertIn('Dry run', output)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(self.balances(), {'1000': Decimal('999.00'), '1100': Decimal('0.00'), '4000': Decimal('0.00')})
+
+    def test_rebuild_writes_missing_postings_and_balances(self):
+        self.rebuild()
+
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(self.balances(), {'1000': Decimal('15.00'), '1100': Decimal('25.00'), '4000': Decimal('40.00')})
+        # Nothing left to do the second time
+        self.assertIn('All account balances already match the journal.', self.rebuild('--dry-run'))
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_documents_still_in_the_outbox_are_left_to_it(self):
+        LedgerOutbox.objects.update(status='PENDING')
+        self.assertIn('Would create 0 missing postings', self.rebuild('--dry-run'))
+
+
+class ChartOfAccountsTests(TestCase):
+    def setUp(self):
+        chart.invalidate()
+        self.cash = Account.objects.create(name='Cash', code='1000', account_type='ASSET')
+        self.visa = Account.objects.create(name='Visa Clearing', code='1130', account_type='ASSET')
+
+    def tearDown(self):
+        chart.invalidate()
+
+    def test_codes_are_loaded_once(self):
+        self.assertEqual(chart.codes(), {'1000': self.cash.id, '1130': self.visa.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(chart.account_id('1130'), self.visa.id)
+
+    def test_saving_an_account_drops_the_map(self):
+        chart.codes()
+        sales = Account.objects.create(name='Sales', code='4000', account_type='REVENUE')
+        self.assertEqual(chart.role_id('sales_revenue'), sales.id)
+
+    def test_other_workers_changes_are_seen_through_the_version(self):
+        chart.codes()
+        # No post_save here, as for an account created by another process
+        Account.objects.bulk_create([Account(name='Bank', code='1100', account_type='ASSET')])
+        Account.objects.filter(pk=self.visa.pk).update(code='1131')
+        self.assertEqual(chart.codes()['1130'], self.visa.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('account')
+        with mock.patch('finance.chart.CHECK_INTERVAL', 0):
+            self.assertNotIn('1130', chart.codes())
+        self.assertIn('1100', chart.codes())
+
+    def test_missing_account_raises_does_not_exist(self):
+        with self.assertRaises(Account.DoesNotExist):
+            chart.role_id('ar')
+
+    def test_payment_modes_map_to_their_accounts_or_cash(self):
+        self.assertEqual(chart.payment_mode_account_id('VISA'), self.visa.id)
+        self.assertEqual(chart.payment_mode_account_id('CASH'), self.cash.id)
+        self.assertEqual(chart.payment_mode_account_id('CHEQUE'), self.cash.id)
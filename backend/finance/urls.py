@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     InvoiceViewSet, PaymentViewSet, AccountViewSet, 
-    TransactionViewSet, VoucherViewSet, EmployeeSalaryViewSet
+    TransactionViewSet, VoucherViewSet, EmployeeSalaryViewSet, LedgerOutboxViewSet
 )
 
 router = DefaultRouter()
@@ -12,6 +12,7 @@ router.register(r'vouchers', VoucherViewSet)
 router.register(r'salaries', EmployeeSalaryViewSet)
 router.register(r'invoices', InvoiceViewSet)
 router.register(r'payments', PaymentViewSet)
+router.register(r'ledger-outbox', LedgerOutboxViewSet, basename='ledger-outbox')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,24 +1,73 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Invoice, Payment, Account, Transaction, Voucher, EmployeeSalary
+from .models import Invoice, Payment, Account, Transaction, Voucher, EmployeeSalary, LedgerOutbox
+from .outbox import retry_entries
+from .ledger import approve_vouchers
+from core.versioning import versioned_etag
 from .serializers import (
     InvoiceSerializer, PaymentSerializer, AccountSerializer, 
-    TransactionSerializer, VoucherSerializer, EmployeeSalarySerializer
+    TransactionSerializer, VoucherSerializer, EmployeeSalarySerializer, LedgerOutboxSerializer
 )
 
 class AccountViewSet(viewsets.ModelViewSet):
     queryset = Account.objects.all().order_by('code')
     serializer_class = AccountSerializer
 
+    @versioned_etag('account', 'transaction')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 class TransactionViewSet(viewsets.ModelViewSet):
     queryset = Transaction.objects.all().order_by('-date')
     serializer_class = TransactionSerializer
 
+    @versioned_etag('transaction', 'account')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+class LedgerOutboxViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Ledger outbox entries, dead letters by default (?status=PENDING|POSTED|DEAD).
+    Dead entries can be sent back to the worker with retry.
+    """
+    serializer_class = LedgerOutboxSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = LedgerOutbox.objects.all().order_by('-id')
+        if self.action == 'list':
+            queryset = queryset.filter(status=self.request.query_params.get('status', 'DEAD').upper())
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        entry = self.get_object()
+        if entry.status == 'POSTED':
+            return Response({'error': 'Entry is already posted'}, status=status.HTTP_400_BAD_REQUEST)
+        retry_entries(LedgerOutbox.objects.filter(pk=entry.pk))
+        return Response({'status': 'Queued for retry'})
+
+    @action(detail=False, methods=['post'], url_path='retry-all')
+    def retry_all(self, request):
+        return Response({'status': 'Queued for retry', 'count': retry_entries(LedgerOutbox.objects.filter(status='DEAD'))})
+
 class VoucherViewSet(viewsets.ModelViewSet):
     queryset = Voucher.objects.all().order_by('-date')
     serializer_class = VoucherSerializer
 
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """Approves {"ids": [...]} at once with one batched ledger posting; lists what was skipped."""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response({'error': 'ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(voucher_id) for voucher_id in ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(approve_vouchers(ids))
+
 class EmployeeSalaryViewSet(viewsets.ModelViewSet):
     queryset = EmployeeSalary.objects.all().order_by('-year', '-month')
     serializer_class = EmployeeSalarySerializer
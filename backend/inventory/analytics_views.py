@@ -0,0 +1,60 @@
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .sales_cube import sales_cube, DIMENSIONS
+
+MEASURES = ['quantity', 'revenue']
+
+
+def _cube_filters(params):
+    """
+    ?day=FRI,SAT&hour=18-23&station=BAR&location=BEACH&item=4,7
+    Hours take single values and inclusive ranges.
+    """
+    filters = {}
+    for dimension in ['day', 'station', 'location']:
+        if params.get(dimension):
+            filters[dimension] = [value.strip().upper() for value in params[dimension].split(',')]
+    if params.get('hour'):
+        hours = []
+        for part in params['hour'].split(','):
+            first, _, last = part.partition('-')
+            hours.extend(range(int(first), int(last or first) + 1))
+        filters['hour'] = hours
+    if params.get('item'):
+        filters['item'] = [int(value) for value in params['item'].split(',')]
+    return filters
+
+
+class SalesCubeViewSet(viewsets.ViewSet):
+    """Slice/dice/top-N over served sales, answered from the in-process cube."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _parse(self, request):
+        measure = request.query_params.get('measure', 'revenue')
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure: {measure}")
+        return _cube_filters(request.query_params), measure
+
+    @action(detail=False, methods=['get'])
+    def slice(self, request):
+        # ?group_by=day,hour keeps those dimensions (max 2), summing the rest
+        try:
+            filters, measure = self._parse(request)
+            group_by = [d for d in request.query_params.get('group_by', '').split(',') if d]
+            if len(group_by) > 2 or any(d not in DIMENSIONS for d in group_by):
+                raise ValueError("group_by takes up to two of: " + ", ".join(DIMENSIONS))
+            if len(set(group_by)) != len(group_by):
+                raise ValueError("group_by dimensions must be distinct")
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sales_cube.slice(filters, group_by, measure))
+
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        try:
+            filters, measure = self._parse(request)
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sales_cube.top_items(filters, measure, limit))
@@ -0,0 +1,58 @@
+"""
+Stock-aware menu availability.
+
+A menu item can be served when every ingredient of one portion (its recipe,
+or one unit of its inventory_item) is in stock in the department that
+serves the guest's location. Items that track no stock are always
+available. The map is built with three queries and kept per process until
+the 'stock' or 'menu' change-version moves, so menu requests cost one
+version lookup instead of a stock query per item.
+"""
+from decimal import Decimal
+from core.versioning import get_versions
+from .models import MenuItem, InventoryStock, Order
+from .recipes import load_recipes, portion_ingredients
+from .stock import stock_department
+
+AVAILABILITY_KEYS = ['stock', 'menu']
+
+# location_type -> (versions, {menu_item_id: bool})
+_maps = {}
+
+
+def availability_map(location_type=''):
+    """{menu_item_id: can be made now} for orders placed from `location_type`."""
+    if location_type not in dict(Order.LOCATION_TYPE_CHOICES):
+        location_type = ''
+
+    versions = tuple(get_versions(AVAILABILITY_KEYS))
+    cached = _maps.get(location_type)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    # Versions are read first, so a change committed mid-build only costs
+    # one extra rebuild on the next request.
+    result = _build_map(location_type)
+    _maps[location_type] = (versions, result)
+    return result
+
+
+def _build_map(location_type):
+    menu_items = list(MenuItem.objects.values_list('id', 'preparation_station', 'inventory_item_id'))
+    recipes = load_recipes()
+
+    portions = {
+        menu_item_id: portion_ingredients(recipes, menu_item_id, inventory_item_id, stock_department(station, location_type))
+        for menu_item_id, station, inventory_item_id in menu_items
+    }
+    departments = {department for lines in portions.values() for _, _, department in lines}
+    stock = {
+        (item_id, department): quantity
+        for item_id, department, quantity in InventoryStock.objects.filter(department__in=departments)
+            .values_list('item_id', 'department', 'quantity')
+    }
+
+    return {
+        menu_item_id: all(stock.get((item_id, department), Decimal('0')) >= quantity for item_id, quantity, department in lines)
+        for menu_item_id, lines in portions.items()
+    }
@@ -0,0 +1,87 @@
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import OrderEvent
+from .querysets import order_queryset
+
+
+def order_stations(order):
+    """Sorted, comma separated preparation stations used by an order's items."""
+    stations = {item.menu_item.preparation_station for item in order.items.all()}
+    return ",".join(sorted(stations))
+
+
+def station_match(station, field='stations'):
+    """Q matching rows whose comma separated `field` lists `station` as a whole element."""
+    return (
+        Q(**{field: station})
+        | Q(**{f'{field}__startswith': f'{station},'})
+        | Q(**{f'{field}__endswith': f',{station}'})
+        | Q(**{f'{field}__contains': f',{station},'})
+    )
+
+
+# Advisory lock key serializing OrderEvent inserts (any constant unique to this use)
+ORDER_EVENT_LOCK = 7_310_001
+
+
+def _insert_event(**fields):
+    """
+    Inserts an OrderEvent holding a transaction-level advisory lock, so ids
+    are assigned and committed strictly in order. Without it a slower insert
+    could commit id 11 after id 12 was already handed out as a cursor, and
+    readers resuming from 12 (orders/active?since=, the SSE feed) would never
+    see it.
+    """
+    with transaction.atomic():
+        # Other backends (SQLite in tests) already serialize all writes
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ORDER_EVENT_LOCK])
+        return OrderEvent.objects.create(**fields)
+
+
+def publish_order_event(order_id, event_type):
+    """
+    Records a feed event for the order once the current transaction commits,
+    so listeners never see an order whose items are not saved yet.
+    """
+    transaction.on_commit(lambda: _write_order_event(order_id, event_type))
+
+
+def _write_order_event(order_id, event_type):
+    from .serializers import OrderSerializer
+
+    order = order_queryset().filter(pk=order_id).first()
+    if order is None:
+        return None
+
+    return _insert_event(
+        order_id=order.id,
+        event_type=event_type,
+        status=order.status,
+        room=(order.room or '').upper(),
+        stations=order_stations(order),
+        payload=OrderSerializer(order).data,
+    )
+
+
+def publish_order_deleted(order):
+    """
+    Deleted orders cannot be re-read after commit, so capture what we need
+    while the order and its items still exist (called from pre_delete).
+    """
+    order_id = order.id
+    room = (order.room or '').upper()
+    stations = order_stations(order)
+    transaction.on_commit(lambda: _insert_event(
+        order_id=order_id,
+        event_type='DELETED',
+        status=order.status,
+        room=room,
+        stations=stations,
+        payload={'id': order_id},
+    ))
+
+
+def latest_event_id():
+    return OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
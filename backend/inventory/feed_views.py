@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import StreamingHttpResponse, HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .models import MenuItem, OrderEvent
+from .events import station_match
+
+# How often a connected screen checks the event log for new rows
+FEED_POLL_INTERVAL = 1.0
+# Comment line sent on idle connections so proxies don't drop them
+FEED_HEARTBEAT_INTERVAL = 15
+# Connections are recycled; EventSource reconnects with Last-Event-ID
+FEED_MAX_LIFETIME = 300
+FEED_BATCH_SIZE = 100
+# Feed tickets stand in for the access token in the URL (EventSource cannot
+# set headers), so one that leaks into an access log is soon worthless
+FEED_TICKET_SALT = 'inventory.order-feed'
+FEED_TICKET_MAX_AGE = 60
+
+
+def _format_event(event):
+    data = {
+        'seq': event.id,
+        'type': event.event_type,
+        'order_id': event.order_id,
+        'status': event.status,
+        'room': event.room,
+        'stations': event.stations.split(',') if event.stations else [],
+        'order': event.payload,
+    }
+    return f"id: {event.id}\nevent: {event.event_type.lower()}\ndata: {json.dumps(data)}\n\n"
+
+
+def issue_feed_ticket(user, expires_at):
+    """Signed ticket for opening the feed as `user`, valid until the access token's `expires_at`."""
+    return signing.dumps({'user': user.pk, 'exp': expires_at}, salt=FEED_TICKET_SALT)
+
+
+def _authenticate(request):
+    """
+    (user, expiry timestamp) of the request's credentials: a ?ticket= from
+    orders/feed-ticket/, or a JWT access token in the Authorization header.
+    Raises InvalidToken when there are no valid credentials, AuthenticationFailed
+    for unknown or inactive users.
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            claims = signing.loads(ticket, salt=FEED_TICKET_SALT, max_age=FEED_TICKET_MAX_AGE)
+        except signing.BadSignature:
+            raise InvalidToken('Feed ticket is invalid or expired.')
+        if claims['exp'] <= time.time():
+            raise InvalidToken('The access token behind this ticket has expired.')
+        user = get_user_model().objects.filter(pk=claims['user']).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User not found or inactive.')
+        return user, claims['exp']
+
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise InvalidToken('Authentication credentials were not provided.')
+    token = authenticator.get_validated_token(raw_token)
+    return authenticator.get_user(token), token['exp']
+
+
+async def _still_authorized(user, expires_at):
+    """Whether a connection opened as `user` may keep streaming."""
+    return time.time() < expires_at and await get_user_model().objects.filter(pk=user.pk, is_active=True).aexists()
+
+
+async def order_feed(request):
+    """
+    Server-Sent Events stream of order changes (create, status change,
+    return, delete). Served by the ASGI application.
+
+    Query params:
+        station: KITCHEN or BAR, only events for orders with items at that station
+        room: only events for that room/table number
+        since: event sequence to resume from (the Last-Event-ID header wins)
+        ticket: from POST orders/feed-ticket/, for clients that cannot send an
+            Authorization header (EventSource)
+
+    The credentials are checked again every heartbeat interval; the stream
+    ends once the access token expires or the user is deactivated.
+    """
+    # require_GET is not async-aware on Django 4.2
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    # Plain Django view: DRF's authentication and permissions don't apply here
+    try:
+        user, expires_at = await sync_to_async(_authenticate)(request)
+    except InvalidToken:
+        return JsonResponse({'detail': 'A valid access token is required.'}, status=401)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=403)
+
+    station = request.GET.get('station', '').upper()
+    if station and station not in dict(MenuItem.STATION_CHOICES):
+        return JsonResponse({'error': 'station must be KITCHEN or BAR'}, status=400)
+    room = request.GET.get('room', '').upper()
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('since')
+
+    events = OrderEvent.objects.all()
+    if station:
+        events = events.filter(station_match(station))
+    if room:
+        events = events.filter(room=room)
+
+    if cursor and str(cursor).isdigit():
+        last_id = int(cursor)
+    else:
+        # Fresh subscribers load the board from orders/active and only need new events
+        last_id = await OrderEvent.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+    async def stream():
+        nonlocal last_id
+        started = last_sent = last_checked = time.monotonic()
+        yield f"retry: 3000\nid: {last_id}\n\n"
+
+        while time.monotonic() - started < FEED_MAX_LIFETIME:
+            if time.monotonic() - last_checked >= FEED_HEARTBEAT_INTERVAL:
+                last_checked = time.monotonic()
+                if not await _still_authorized(user, expires_at):
+                    return
+
+            batch = [e async for e in events.filter(id__gt=last_id).order_by('id')[:FEED_BATCH_SIZE]]
+            for event in batch:
+                last_id = event.id
+                yield _format_event(event)
+
+            if batch:
+                last_sent = time.monotonic()
+                if len(batch) == FEED_BATCH_SIZE:
+                    continue
+            elif time.monotonic() - last_sent >= FEED_HEARTBEAT_INTERVAL:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+
+            await asyncio.sleep(FEED_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from inventory.prep_estimates import prep_estimator
+
+class Command(BaseCommand):
+    help = 'Refit the order ready-time estimates from the status log and share them through the cache'
+
+    def handle(self, *args, **options):
+        prep_estimator.refit()
+        for station, (base, per_order) in prep_estimator.models.items():
+            self.stdout.write(f"{station}: {base / 60:.1f} min + {per_order / 60:.1f} min per queued order")
+        self.stdout.write(self.style.SUCCESS("Prep time estimates refitted."))
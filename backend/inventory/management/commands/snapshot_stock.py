@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from inventory.stock_reports import take_snapshot
+
+class Command(BaseCommand):
+    help = 'Snapshot per-department stock levels from the stock movement journal (run nightly from cron)'
+
+    def handle(self, *args, **options):
+        count = take_snapshot()
+        if count:
+            self.stdout.write(self.style.SUCCESS(f"Snapshot written for {count} item/department rows."))
+        else:
+            self.stdout.write("No new stock movements since the last snapshot.")
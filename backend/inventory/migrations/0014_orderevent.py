@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 09:12
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_orderreturn_approver_department_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('CREATED', 'Created'), ('STATUS', 'Status Changed'), ('RETURN', 'Return Updated'), ('DELETED', 'Deleted')], max_length=20)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('room', models.CharField(blank=True, help_text='Normalized (uppercase) room/table number', max_length=50)),
+                ('stations', models.CharField(blank=True, help_text='Comma separated preparation stations, e.g. BAR,KITCHEN', max_length=50)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='inventory.order')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
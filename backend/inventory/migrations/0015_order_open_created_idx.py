@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_orderevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'PREPARING', 'READY'])), fields=['created_at'], name='order_open_created_idx'),
+        ),
+    ]
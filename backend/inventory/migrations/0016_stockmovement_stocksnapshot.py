@@ -0,0 +1,65 @@
+# Generated by Django 4.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def journal_opening_balances(apps, schema_editor):
+    """Existing quantities become opening adjustments so the journal sums to the stock table."""
+    InventoryStock = apps.get_model('inventory', 'InventoryStock')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            item_id=stock.item_id,
+            department=stock.department,
+            movement_type='ADJUSTMENT',
+            quantity=stock.quantity,
+            unit_cost=stock.item.cost_price,
+            reason='Opening balance',
+        )
+        for stock in InventoryStock.objects.select_related('item').exclude(quantity=0)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_order_open_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(choices=[('MAIN', 'Main Stock'), ('POOL', 'Pool'), ('BAR', 'Bar'), ('BEACH_BAR', 'Beach Bar'), ('KITCHEN', 'Kitchen'), ('LAUNDRY', 'Laundry'), ('OFFICE', 'Office')], max_length=20)),
+                ('movement_type', models.CharField(choices=[('RECEIPT', 'Receipt'), ('TRANSFER', 'Transfer'), ('SALE', 'Sale'), ('RETURN', 'Return'), ('STOCK_OUT', 'Stock-out'), ('ADJUSTMENT', 'Adjustment')], max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('unit_cost', models.DecimalField(decimal_places=2, default=0, help_text='Item cost price when the movement happened', max_digits=10)),
+                ('reference', models.CharField(blank=True, help_text='e.g. Order #12, Transfer #3', max_length=100)),
+                ('reason', models.TextField(blank=True)),
+                ('performed_by', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.inventoryitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department', 'created_at'], name='stockmove_dept_created_idx'), models.Index(fields=['item', 'department', 'created_at'], name='stockmove_item_dept_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(choices=[('MAIN', 'Main Stock'), ('POOL', 'Pool'), ('BAR', 'Bar'), ('BEACH_BAR', 'Beach Bar'), ('KITCHEN', 'Kitchen'), ('LAUNDRY', 'Laundry'), ('OFFICE', 'Office')], max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('taken_at', models.DateTimeField()),
+                ('last_movement_id', models.BigIntegerField(default=0, help_text='Newest StockMovement included in this snapshot')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.inventoryitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department', 'taken_at'], name='stocksnap_dept_taken_idx')],
+                'unique_together': {('item', 'department', 'taken_at')},
+            },
+        ),
+        migrations.RunPython(journal_opening_balances, migrations.RunPython.noop),
+    ]
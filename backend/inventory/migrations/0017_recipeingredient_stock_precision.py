@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_stockmovement_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorystock',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='stocksnapshot',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=3, help_text='Units used per portion, e.g. 0.05 bottle', max_digits=10)),
+                ('department', models.CharField(blank=True, choices=[('MAIN', 'Main Stock'), ('POOL', 'Pool'), ('BAR', 'Bar'), ('BEACH_BAR', 'Beach Bar'), ('KITCHEN', 'Kitchen'), ('LAUNDRY', 'Laundry'), ('OFFICE', 'Office')], help_text="Leave blank to take it from the menu item's station", max_length=20)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_usages', to='inventory.inventoryitem')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_items', to='inventory.menuitem')),
+            ],
+            options={
+                'unique_together': {('menu_item', 'inventory_item')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2 on 2026-10-18 16:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_from_events(apps, schema_editor):
+    """Rebuilds transitions of existing orders from the order feed's STATUS events."""
+    Order = apps.get_model('inventory', 'Order')
+    OrderEvent = apps.get_model('inventory', 'OrderEvent')
+    OrderStatusChange = apps.get_model('inventory', 'OrderStatusChange')
+
+    created = dict(Order.objects.values_list('id', 'created_at'))
+    changes = []
+    state = {}  # order_id -> (status, changed_at, reached statuses)
+    for event in OrderEvent.objects.filter(event_type__in=['CREATED', 'STATUS'], order_id__in=list(created)).order_by('id'):
+        order_created = created[event.order_id]
+        if event.event_type == 'CREATED':
+            state[event.order_id] = (event.status, order_created, {event.status})
+            continue
+        status, since, reached = state.get(event.order_id, ('PENDING', order_created, {'PENDING'}))
+        if event.status == status:
+            continue
+        changes.append(OrderStatusChange(
+            order_id=event.order_id,
+            from_status=status,
+            to_status=event.status,
+            stations=event.stations,
+            changed_at=event.created_at,
+            seconds_in_previous=(event.created_at - since).total_seconds(),
+            seconds_since_created=(event.created_at - order_created).total_seconds(),
+            first_reach=event.status not in reached,
+        ))
+        state[event.order_id] = (event.status, event.created_at, reached | {event.status})
+    OrderStatusChange.objects.bulk_create(changes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_recipeingredient_stock_precision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('stations', models.CharField(blank=True, help_text='Comma separated preparation stations, e.g. BAR,KITCHEN', max_length=50)),
+                ('changed_by', models.CharField(blank=True, max_length=100)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('seconds_in_previous', models.FloatField(help_text='Time spent in from_status')),
+                ('seconds_since_created', models.FloatField()),
+                ('first_reach', models.BooleanField(default=True, help_text='First time this order reached to_status')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='inventory.order')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['to_status', 'changed_at'], name='statuschange_to_changed_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_from_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_orderstatuschange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='estimated_ready_at',
+            field=models.DateTimeField(blank=True, help_text='Predicted ready time when the order was placed', null=True),
+        ),
+    ]
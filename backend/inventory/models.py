@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 
 class MenuCategory(models.Model):
     name = models.CharField(max_length=100)
@@ -61,7 +63,7 @@ class Department(models.TextChoices):
 class InventoryStock(models.Model):
     item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='stocks')
     department = models.CharField(max_length=20, choices=Department.choices, default=Department.MAIN)
-    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3, default=0)
 
     class Meta:
         unique_together = ('item', 'department')
@@ -80,6 +82,78 @@ class StockTransfer(models.Model):
     def __str__(self):
         return f"Transfer {self.quantity} {self.item.name} from {self.from_dept} to {self.to_dept}"
 
+class StockMovement(models.Model):
+    """
+    Append-only journal of every InventoryStock change, written by
+    inventory.stock.apply_stock_changes. Rows are never updated or deleted;
+    the quantity is signed (negative = stock leaving the department).
+    """
+    MOVEMENT_TYPES = [
+        ('RECEIPT', 'Receipt'),
+        ('TRANSFER', 'Transfer'),
+        ('SALE', 'Sale'),
+        ('RETURN', 'Return'),
+        ('STOCK_OUT', 'Stock-out'),
+        ('ADJUSTMENT', 'Adjustment'),
+    ]
+
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='movements')
+    department = models.CharField(max_length=20, choices=Department.choices)
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Item cost price when the movement happened")
+    reference = models.CharField(max_length=100, blank=True, help_text="e.g. Order #12, Transfer #3")
+    reason = models.TextField(blank=True)
+    performed_by = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'created_at'], name='stockmove_dept_created_idx'),
+            models.Index(fields=['item', 'department', 'created_at'], name='stockmove_item_dept_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.movement_type} {self.quantity} {self.item.name} @ {self.department}"
+
+class StockSnapshot(models.Model):
+    """
+    Per-department stock level at a point in time. Stock at any date is the
+    newest snapshot before it plus the movements journaled after
+    `last_movement_id`, so reports never replay the whole journal.
+    """
+    item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='snapshots')
+    department = models.CharField(max_length=20, choices=Department.choices)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3)
+    taken_at = models.DateTimeField()
+    last_movement_id = models.BigIntegerField(default=0, help_text="Newest StockMovement included in this snapshot")
+
+    class Meta:
+        unique_together = ('item', 'department', 'taken_at')
+        indexes = [
+            models.Index(fields=['department', 'taken_at'], name='stocksnap_dept_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item.name} - {self.department}: {self.quantity} at {self.taken_at}"
+
+class RecipeIngredient(models.Model):
+    """
+    One line of a menu item's bill of materials: serving one portion uses
+    `quantity` units of `inventory_item`. A menu item without recipe lines
+    falls back to one unit of its `inventory_item`.
+    """
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='recipe_items')
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name='recipe_usages')
+    quantity = models.DecimalField(max_digits=10, decimal_places=3, help_text="Units used per portion, e.g. 0.05 bottle")
+    department = models.CharField(max_length=20, choices=Department.choices, blank=True, help_text="Leave blank to take it from the menu item's station")
+
+    class Meta:
+        unique_together = ('menu_item', 'inventory_item')
+
+    def __str__(self):
+        return f"{self.quantity} {self.inventory_item.unit} {self.inventory_item.name} in {self.menu_item.name}"
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -96,14 +170,36 @@ class Order(models.Model):
         ('POOL', 'Pool Side'),
         ('WALK_IN', 'Walk-in'),
     ]
+
+    # Orders still on the kitchen/bar/waiter boards
+    OPEN_STATUSES = ['PENDING', 'PREPARING', 'READY']
     
     room = models.CharField(max_length=50, blank=True, null=True, help_text="Number/ID (Room #, Table #, etc.)")
     location_type = models.CharField(max_length=20, choices=LOCATION_TYPE_CHOICES, default='ROOM')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    estimated_ready_at = models.DateTimeField(blank=True, null=True, help_text="Predicted ready time when the order was placed")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Partial index: the boards only ever scan the handful of open orders
+            models.Index(
+                fields=['created_at'],
+                name='order_open_created_idx',
+                condition=models.Q(status__in=['PENDING', 'PREPARING', 'READY']),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted status so signals can tell when it changes
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
+
     def __str__(self):
         return f"Order #{self.id} - {self.room} ({self.status})"
 
@@ -148,3 +244,72 @@ class OrderReturnItem(models.Model):
 
     def __str__(self):
         return f"{self.quantity}x {self.order_item.menu_item.name} in Return #{self.order_return.id}"
+
+class OrderEvent(models.Model):
+    """
+    Append-only log of order changes streamed to the kitchen, bar, waiter
+    and guest screens. The auto-increment id is the feed sequence number.
+    """
+    EVENT_CHOICES = [
+        ('CREATED', 'Created'),
+        ('STATUS', 'Status Changed'),
+        ('RETURN', 'Return Updated'),
+        ('DELETED', 'Deleted'),
+    ]
+
+    # No FK constraint so the event survives the order being deleted
+    order = models.ForeignKey(Order, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events')
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    status = models.CharField(max_length=20, blank=True)
+    room = models.CharField(max_length=50, blank=True, help_text="Normalized (uppercase) room/table number")
+    stations = models.CharField(max_length=50, blank=True, help_text="Comma separated preparation stations, e.g. BAR,KITCHEN")
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Event #{self.id} {self.event_type} for Order #{self.order_id}"
+
+class OrderStatusChange(models.Model):
+    """
+    Append-only status transition log written by OrderViewSet.update_status,
+    with the stage durations precomputed so latency percentiles don't depend
+    on `updated_at`, which any later edit moves.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20)
+    to_status = models.CharField(max_length=20)
+    stations = models.CharField(max_length=50, blank=True, help_text="Comma separated preparation stations, e.g. BAR,KITCHEN")
+    changed_by = models.CharField(max_length=100, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+    seconds_in_previous = models.FloatField(help_text="Time spent in from_status")
+    seconds_since_created = models.FloatField()
+    first_reach = models.BooleanField(default=True, help_text="First time this order reached to_status")
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['to_status', 'changed_at'], name='statuschange_to_changed_idx'),
+        ]
+
+    @classmethod
+    def record(cls, order, from_status, stations='', changed_by=''):
+        """Logs the order's move from `from_status` to its current status."""
+        now = timezone.now()
+        previous = cls.objects.filter(order=order).order_by('-id').values_list('changed_at', flat=True).first()
+        return cls.objects.create(
+            order=order,
+            from_status=from_status,
+            to_status=order.status,
+            stations=stations,
+            changed_by=changed_by,
+            changed_at=now,
+            seconds_in_previous=(now - (previous or order.created_at)).total_seconds(),
+            seconds_since_created=(now - order.created_at).total_seconds(),
+            first_reach=not cls.objects.filter(order=order, to_status=order.status).exists(),
+        )
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status} -> {self.to_status}"
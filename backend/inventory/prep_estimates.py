@@ -0,0 +1,157 @@
+"""
+Ready-time estimates for new orders.
+
+Per preparation station, time to first READY is modelled as
+
+    seconds = base + per_order * (orders already queued at that station)
+
+fitted by least squares over recent OrderStatusChange history. The queue
+each historical order met is reconstructed with NumPy from the creation and
+ready times of its neighbours (orders created before it and not yet ready),
+so the whole refresh is one values_list fetch plus array arithmetic.
+
+Fitting never runs on the request path. The coefficients are shared through
+the default cache. Each process holds a copy and, once it is older than
+REFRESH_INTERVAL, picks up a newer one in a background thread; only when
+the cached fit is itself stale does that thread refit (the refit_prep_estimates
+command does the same on demand). Placing an order only reads the in-memory
+coefficients and counts the current queue.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from .models import MenuItem, OrderItem, OrderStatusChange
+
+STATIONS = [key for key, _ in MenuItem.STATION_CHOICES]
+
+REFRESH_INTERVAL = 300
+HISTORY = timedelta(days=14)
+MAX_SAMPLES = 5000
+# Fewer ready orders than this and the station keeps its default estimate
+MIN_SAMPLES = 10
+DEFAULT_SECONDS = {'KITCHEN': 15 * 60, 'BAR': 5 * 60}
+MIN_SECONDS = 60
+CACHE_KEY = 'inventory:prep-estimates'
+REFIT_LOCK_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+
+class PrepTimeEstimator:
+    def __init__(self):
+        # Guards `refreshing` only; requests never wait on a refit
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.loaded_at = None
+        self.models = {station: (float(DEFAULT_SECONDS.get(station, 600)), 0.0) for station in STATIONS}
+
+    def _fit_station(self, created, seconds):
+        """(base, per_order) for one station's (created timestamp, seconds to ready) samples."""
+        ready = created + seconds
+        # Orders created before each one, minus those that were already ready by then
+        queue = np.searchsorted(np.sort(created), created, side='left') \
+            - np.searchsorted(np.sort(ready), created, side='right')
+        design = np.column_stack([np.ones_like(created), queue.astype(np.float64)])
+        (base, per_order), *_ = np.linalg.lstsq(design, seconds, rcond=None)
+        if per_order < 0:
+            # More queue, less time is noise; fall back to the median alone
+            return float(np.median(seconds)), 0.0
+        return max(float(base), MIN_SECONDS), float(per_order)
+
+    def refit(self):
+        """Fits every station from the status log and publishes the result to the cache."""
+        since = timezone.now() - HISTORY
+        rows = list(
+            OrderStatusChange.objects.filter(first_reach=True, to_status='READY', order__created_at__gte=since)
+            .order_by('-id').values_list('stations', 'order__created_at', 'seconds_since_created')[:MAX_SAMPLES]
+        )
+        models = dict(self.models)
+        if rows:
+            stations, created_at, seconds = zip(*rows)
+            created = np.array([moment.timestamp() for moment in created_at], dtype=np.float64)
+            seconds = np.array(seconds, dtype=np.float64)
+            for station in STATIONS:
+                mask = np.array([station in value.split(',') for value in stations], dtype=bool)
+                if mask.sum() >= MIN_SAMPLES:
+                    models[station] = self._fit_station(created[mask], seconds[mask])
+        self.models = models
+        self.loaded_at = time.monotonic()
+        cache.set(CACHE_KEY, {'models': models, 'fitted_at': time.time()}, None)
+
+    def load(self):
+        """
+        Adopts the cached fit. If it is missing or older than REFRESH_INTERVAL
+        one process refits (guarded by a cache.add lock); the others keep the
+        stale copy until the next interval.
+        """
+        entry = cache.get(CACHE_KEY)
+        if entry is None or time.time() - entry['fitted_at'] > REFRESH_INTERVAL:
+            if cache.add(f'{CACHE_KEY}:lock', 1, REFIT_LOCK_TIMEOUT):
+                try:
+                    self.refit()
+                finally:
+                    cache.delete(f'{CACHE_KEY}:lock')
+                return
+            if entry is None:
+                self.loaded_at = time.monotonic()
+                return
+        self.models = entry['models']
+        self.loaded_at = time.monotonic()
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception("Prep time estimate refresh failed")
+            # Keep serving the old coefficients; try again after the interval
+            self.loaded_at = time.monotonic()
+        finally:
+            # Threads get their own connection; don't leave it open
+            connection.close()
+            with self.lock:
+                self.refreshing = False
+
+    def refresh(self):
+        """Starts a background reload when the in-memory copy is stale; never blocks."""
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at <= REFRESH_INTERVAL:
+            return
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+
+    def estimate_seconds(self, stations, queue_depths):
+        """Seconds until an order using `stations` is ready, given {station: orders queued}."""
+        self.refresh()
+        models = self.models
+        estimates = [
+            models[station][0] + models[station][1] * queue_depths.get(station, 0)
+            for station in stations if station in models
+        ]
+        return max(estimates) if estimates else None
+
+
+def queue_depths():
+    """{station: open PENDING/PREPARING orders with items from that station}."""
+    return dict(
+        OrderItem.objects.filter(order__status__in=['PENDING', 'PREPARING'])
+        .values_list('menu_item__preparation_station').annotate(orders=Count('order_id', distinct=True))
+    )
+
+
+def estimate_ready_at(stations, created_at=None):
+    """Predicted READY time for a new order using `stations`, or None if it has none."""
+    seconds = prep_estimator.estimate_seconds(set(stations), queue_depths())
+    if seconds is None:
+        return None
+    return (created_at or timezone.now()) + timedelta(seconds=round(seconds))
+
+
+prep_estimator = PrepTimeEstimator()
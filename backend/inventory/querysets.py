@@ -0,0 +1,40 @@
+"""
+Prefetch-aware querysets for the order serializers.
+
+OrderSerializer nests items (menu item name/station) and returns (return
+items -> order item -> menu item, falling back to the order's items). Every
+endpoint that serializes orders or returns should start from these builders
+so its query count stays constant however many rows it returns.
+"""
+from django.db.models import Prefetch
+from .models import Order, OrderItem, OrderReturn, OrderReturnItem
+
+
+def order_items_prefetch(lookup='items'):
+    return Prefetch(lookup, queryset=OrderItem.objects.select_related('menu_item'))
+
+
+def return_items_prefetch(lookup='return_items'):
+    return Prefetch(lookup, queryset=OrderReturnItem.objects.select_related('order_item__menu_item'))
+
+
+def order_queryset(queryset=None):
+    """Orders ready for OrderSerializer: 3 queries + 1 for returns' items."""
+    if queryset is None:
+        queryset = Order.objects.all()
+    # Prefetched returns get `.order` set to the parent, so their fallback
+    # summary reuses the items prefetched here.
+    return queryset.prefetch_related(
+        order_items_prefetch(),
+        Prefetch('returns', queryset=OrderReturn.objects.prefetch_related(return_items_prefetch())),
+    )
+
+
+def order_return_queryset(queryset=None):
+    """Returns ready for OrderReturnSerializer."""
+    if queryset is None:
+        queryset = OrderReturn.objects.all()
+    return queryset.select_related('order').prefetch_related(
+        return_items_prefetch(),
+        order_items_prefetch('order__items'),
+    )
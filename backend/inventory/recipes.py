@@ -0,0 +1,73 @@
+"""
+Expands served order lines into ingredient deductions.
+
+A menu item's RecipeIngredient rows say how much of each inventory item one
+portion uses; items without a recipe fall back to one unit of their
+`inventory_item`. All recipes of an order are read in one query and the
+result goes to apply_stock_changes as a single batched update.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from .models import RecipeIngredient
+from .stock import apply_stock_changes, stock_department
+
+
+def load_recipes(menu_item_ids=None):
+    """{menu_item_id: [(inventory_item_id, quantity, department), ...]} in one query."""
+    lines = RecipeIngredient.objects.all()
+    if menu_item_ids is not None:
+        lines = lines.filter(menu_item_id__in=menu_item_ids)
+    recipes = defaultdict(list)
+    for line in lines.values_list('menu_item_id', 'inventory_item_id', 'quantity', 'department'):
+        recipes[line[0]].append(line[1:])
+    return recipes
+
+
+def portion_ingredients(recipes, menu_item_id, inventory_item_id, station_dept):
+    """[(inventory_item_id, quantity, department)] one portion of a menu item uses."""
+    lines = recipes.get(menu_item_id)
+    if lines is None:
+        return [(inventory_item_id, Decimal('1'), station_dept)] if inventory_item_id else []
+    return [(item_id, quantity, department or station_dept) for item_id, quantity, department in lines]
+
+
+def ingredient_deductions(lines, location_type):
+    """
+    {(inventory_item_id, department): -quantity} for (menu_item, portions)
+    lines, summed across lines sharing an ingredient.
+    """
+    lines = list(lines)
+    recipes = load_recipes({menu_item.id for menu_item, _ in lines})
+
+    deductions = defaultdict(Decimal)
+    for menu_item, portions in lines:
+        station_dept = stock_department(menu_item.preparation_station, location_type)
+        for inventory_item_id, per_portion, department in portion_ingredients(
+            recipes, menu_item.id, menu_item.inventory_item_id, station_dept
+        ):
+            deductions[(inventory_item_id, department)] -= per_portion * portions
+    return deductions
+
+
+def deduct_order_ingredients(order):
+    """Takes everything a served order used out of stock, journaled as one SALE."""
+    return apply_stock_changes(
+        ingredient_deductions(
+            ((item.menu_item, item.quantity) for item in order.items.select_related('menu_item')),
+            order.location_type,
+        ),
+        'SALE', reference=f"Order #{order.id}"
+    )
+
+
+def restock_returned_items(order_return, order):
+    """Puts back what the returned portions of a served order used, journaled as one RETURN."""
+    lines = [
+        (return_item.order_item.menu_item, return_item.quantity)
+        for return_item in order_return.return_items.select_related('order_item__menu_item')
+    ]
+    deductions = ingredient_deductions(lines, order.location_type)
+    return apply_stock_changes(
+        {key: -quantity for key, quantity in deductions.items()},
+        'RETURN', reference=f"Return #{order_return.id} (Order #{order.id})"
+    )
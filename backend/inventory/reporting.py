@@ -0,0 +1,225 @@
+"""
+Single-pass revenue aggregates for the reporting endpoints.
+
+Figures come from the daily rollup tables (finance.rollups), so a year of
+history is at most 365 small rows per dimension. Each table is read once
+from the earliest timeframe start, and every timeframe x breakdown cell is
+a conditional aggregate (Sum with filter=Q) of that one scan.
+
+Time series (revenue_series) need hourly resolution and order counts, so
+they group the transactional tables with date_trunc in the database.
+
+Order timings (order_timings) are percentiles over the OrderStatusChange
+log, computed with PostgreSQL's percentile_cont.
+"""
+from datetime import datetime, timedelta
+from django.db.models import Aggregate, Sum, Count, Q, F, DecimalField, FloatField, ExpressionWrapper
+from django.db.models.functions import Trunc, ExtractHour
+from django.utils import timezone
+from .models import Order, OrderItem, OrderStatusChange
+from .events import station_match
+from core.reporting import timeframe_starts, aggregate_cells, rollup_window
+from finance.models import Payment, DailyFnbRevenue, DailyPaymentTotal, DailyRoomRevenue
+from recreation.reporting import pass_revenue
+
+STATIONS = ['KITCHEN', 'BAR']
+
+
+def fnb_revenue(starts):
+    """Served food & drink revenue per timeframe, in total and by station and location type."""
+    cells = {}
+    for label, start in starts.items():
+        window = Q(date__gte=start)
+        cells[(label, 'total')] = Sum('revenue', filter=window)
+        cells[(label, 'items_sold')] = Sum('quantity', filter=window)
+        for station in STATIONS:
+            cells[(label, 'by_station', station)] = Sum('revenue', filter=window & Q(station=station))
+        for location, _ in Order.LOCATION_TYPE_CHOICES:
+            cells[(label, 'by_location', location)] = Sum('revenue', filter=window & Q(location_type=location))
+    return aggregate_cells(rollup_window(DailyFnbRevenue.objects.all(), starts), cells)
+
+
+def payment_collections(starts):
+    """Payments received per timeframe, in total and by payment mode."""
+    cells = {}
+    for label, start in starts.items():
+        window = Q(date__gte=start)
+        cells[(label, 'total')] = Sum('amount', filter=window)
+        for mode, _ in Payment.MODE_CHOICES:
+            cells[(label, 'by_mode', mode)] = Sum('amount', filter=window & Q(mode=mode))
+    return aggregate_cells(rollup_window(DailyPaymentTotal.objects.all(), starts), cells)
+
+
+def room_revenue(starts):
+    """Room nights and their revenue per timeframe, up to today."""
+    cells = {}
+    for label, start in starts.items():
+        window = Q(date__gte=start)
+        cells[(label, 'revenue')] = Sum('revenue', filter=window)
+        cells[(label, 'nights')] = Sum('nights', filter=window)
+    return aggregate_cells(rollup_window(DailyRoomRevenue.objects.all(), starts), cells)
+
+
+def revenue_report(today=None):
+    """Every timeframe and breakdown of the v2 stats endpoint, one query per rollup table."""
+    starts = timeframe_starts(today)
+    fnb = fnb_revenue(starts)
+    payments = payment_collections(starts)
+    passes = pass_revenue(starts)
+    rooms = room_revenue(starts)
+    return {
+        label: {
+            **fnb[label],
+            'payments': payments[label],
+            'passes': passes[label],
+            'rooms': rooms[label],
+        }
+        for label in starts
+    }
+
+
+# --- Time series ---
+
+SERIES_BUCKETS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': None,
+}
+SERIES_DIMENSIONS = ['total', 'station', 'location', 'payment_mode']
+
+_series_line_total = ExpressionWrapper(F('price_at_time') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _truncate(moment, bucket):
+    """Same bucket start as the database's date_trunc, in the current timezone."""
+    moment = timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+    if bucket == 'hour':
+        return moment
+    moment = moment.replace(hour=0)
+    if bucket == 'week':
+        return moment - timedelta(days=moment.weekday())
+    if bucket == 'month':
+        return moment.replace(day=1)
+    return moment
+
+
+def bucket_starts(bucket, start, end):
+    """Every bucket start from the one holding `start` up to `end` (exclusive)."""
+    current = _truncate(start, bucket)
+    starts = []
+    while current < end:
+        starts.append(current)
+        if bucket == 'month':
+            year, month = divmod(current.month, 12)
+            current = timezone.make_aware(datetime(current.year + year, month + 1, 1))
+        else:
+            current = timezone.make_aware(datetime.combine(current.date(), current.time()) + SERIES_BUCKETS[bucket])
+    return starts
+
+
+def _series_rows(bucket, start, end, dimension):
+    """(bucket_start, key, revenue, count) grouped in the database."""
+    if dimension == 'payment_mode':
+        return Payment.objects.filter(date_paid__gte=start, date_paid__lt=end) \
+            .annotate(t=Trunc('date_paid', bucket)).values_list('t', 'mode') \
+            .annotate(revenue=Sum('amount'), count=Count('id'))
+    if dimension == 'station':
+        return OrderItem.objects.filter(order__status='SERVED', order__created_at__gte=start, order__created_at__lt=end) \
+            .annotate(t=Trunc('order__created_at', bucket)).values_list('t', 'menu_item__preparation_station') \
+            .annotate(revenue=Sum(_series_line_total), count=Count('order_id', distinct=True))
+    orders = Order.objects.filter(status='SERVED', created_at__gte=start, created_at__lt=end) \
+        .annotate(t=Trunc('created_at', bucket))
+    if dimension == 'total':
+        return [(t, 'TOTAL', revenue, count) for t, revenue, count in
+                orders.values_list('t').annotate(revenue=Sum('total_amount'), count=Count('id'))]
+    return orders.values_list('t', 'location_type').annotate(revenue=Sum('total_amount'), count=Count('id'))
+
+
+def revenue_series(bucket, start, end, dimension='total'):
+    """
+    Revenue and counts (served orders, or payments for payment_mode) per
+    bucket in columnar form: one shared `t` array and, per dimension value,
+    `revenue` and `count` arrays aligned with it. Empty buckets are zeros.
+    """
+    starts = bucket_starts(bucket, start, end)
+    index = {moment: i for i, moment in enumerate(starts)}
+    series = {}
+    for moment, key, revenue, count in _series_rows(bucket, start, end, dimension):
+        position = index.get(moment)
+        if position is None:
+            continue
+        columns = series.setdefault(key, {'revenue': [0.0] * len(starts), 'count': [0] * len(starts)})
+        columns['revenue'][position] = float(revenue or 0)
+        columns['count'][position] = count
+    return {
+        'bucket': bucket,
+        'dimension': dimension,
+        't': [moment.isoformat() for moment in starts],
+        'series': series,
+    }
+
+
+# --- Order timings ---
+
+# Stage -> status whose first arrival ends it; durations are measured from order creation
+TIMING_STAGES = {'ready': 'READY', 'served': 'SERVED'}
+TIMING_PERCENTILES = {'p50': 0.5, 'p90': 0.9}
+
+
+class Percentile(Aggregate):
+    """Continuous percentile (PostgreSQL percentile_cont), e.g. Percentile('x', 0.9)."""
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def _timing_cells(prefix=(), condition=Q()):
+    cells = {}
+    for stage, to_status in TIMING_STAGES.items():
+        reached = condition & Q(to_status=to_status)
+        cells[prefix + (stage, 'orders')] = Count('order_id', filter=reached)
+        for label, fraction in TIMING_PERCENTILES.items():
+            cells[prefix + (stage, label)] = Percentile('seconds_since_created', fraction, filter=reached)
+    return cells
+
+
+def median_seconds(to_status, start, station=None):
+    """Median seconds from creation to first reaching `to_status` for orders created since `start`."""
+    changes = OrderStatusChange.objects.filter(first_reach=True, to_status=to_status, order__created_at__gte=start)
+    if station:
+        changes = changes.filter(station_match(station))
+    return changes.aggregate(median=Percentile('seconds_since_created', 0.5))['median']
+
+
+def order_timings(start, end):
+    """
+    p50/p90 seconds from order creation to first READY and first SERVED for
+    orders created in [start, end): overall, per preparation station and
+    per hour of day the order was placed. Orders using both stations count
+    towards each.
+    """
+    changes = OrderStatusChange.objects.filter(
+        first_reach=True, to_status__in=TIMING_STAGES.values(),
+        order__created_at__gte=start, order__created_at__lt=end,
+    )
+    cells = _timing_cells()
+    for station in STATIONS:
+        cells.update(_timing_cells(('by_station', station), station_match(station)))
+    report = aggregate_cells(changes, cells)
+
+    by_hour = {}
+    hourly = _timing_cells()
+    aliases = {f'cell{i}': path for i, path in enumerate(hourly)}
+    rows = changes.annotate(hour=ExtractHour('order__created_at')).values('hour') \
+        .annotate(**{alias: hourly[path] for alias, path in aliases.items()}).order_by('hour')
+    for row in rows:
+        hour = by_hour.setdefault(row['hour'], {})
+        for alias, (stage, label) in aliases.items():
+            hour.setdefault(stage, {})[label] = row[alias] or 0
+    report['by_hour'] = by_hour
+    return report
@@ -1,58 +1,145 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Count, F, ExpressionWrapper, DurationField, Avg
+from django.db.models import Sum, Count, F
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from django.utils.dateparse import parse_date
 from .models import Order, OrderItem, MenuItem
 from pms.models import Room, Booking
 from finance.models import Invoice, Payment
+from core.cache import single_flight, CacheWarming, COLD_WAIT
+from .reporting import (
+    timeframe_starts, fnb_revenue, revenue_report, revenue_series, order_timings, median_seconds,
+    SERIES_BUCKETS, SERIES_DIMENSIONS,
+)
+from finance.models import DailyFnbRevenue, DailyPassRevenue, DailyRoomRevenue
+
+# Dashboards poll every few seconds; order/payment changes refresh sooner
+STATS_CACHE_KEY = 'inventory:reports:stats'
+STATS_MIN_AGE = 5
+STATS_TTL = 30
+STATS_V2_CACHE_KEY = 'inventory:reports:v2'
+
+SERIES_DEFAULT_SPAN = {
+    'hour': timedelta(days=1),
+    'day': timedelta(days=29),
+    'week': timedelta(weeks=25),
+    'month': timedelta(days=364),
+}
+SERIES_MAX_HOURLY_DAYS = 31
+TIMINGS_DEFAULT_SPAN = timedelta(days=6)
 
 class ReportingViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
     
+    def cached_response(self, key, build, version_keys):
+        try:
+            return Response(single_flight(key, build, STATS_TTL, min_age=STATS_MIN_AGE, version_keys=version_keys))
+        except CacheWarming:
+            # Another worker is computing the first copy; dashboards poll again anyway
+            response = Response({'error': 'Report is being prepared, retry shortly'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = COLD_WAIT
+            return response
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
+        return self.cached_response(STATS_CACHE_KEY, self.build_stats, ('order', 'invoice', 'room'))
+
+    @action(detail=False, methods=['get'])
+    def stats_v2(self, request):
+        """All timeframes x station/location/payment mode/pass location from the daily rollups."""
+        return self.cached_response(STATS_V2_CACHE_KEY, lambda: {'timeframes': revenue_report()}, ('order', 'invoice'))
+
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        """Dashboard charts: revenue per day for the last week and the 30-day revenue mix."""
+        today = timezone.localdate()
+        week_start = today - timedelta(days=6)
+        month_start = today - timedelta(days=29)
+
+        per_day = {week_start + timedelta(days=n): 0 for n in range(7)}
+        for model in (DailyFnbRevenue, DailyPassRevenue, DailyRoomRevenue):
+            for row in model.objects.filter(date__gte=week_start, date__lte=today).values('date').annotate(total=Sum('revenue')):
+                per_day[row['date']] += float(row['total'] or 0)
+
+        stations = dict(
+            DailyFnbRevenue.objects.filter(date__gte=month_start, date__lte=today)
+            .values_list('station').annotate(total=Sum('revenue'))
+        )
+        passes = dict(
+            DailyPassRevenue.objects.filter(date__gte=month_start, date__lte=today)
+            .values_list('pass_type__location').annotate(total=Sum('revenue'))
+        )
+
+        return Response({
+            'week': [{'date': day, 'name': day.strftime('%a'), 'revenue': total} for day, total in per_day.items()],
+            'mix': [
+                {'name': 'Kitchen', 'value': float(stations.get('KITCHEN') or 0)},
+                {'name': 'Bar', 'value': float(stations.get('BAR') or 0)},
+                {'name': 'Pool', 'value': float(passes.get('POOL') or 0)},
+                {'name': 'Beach', 'value': float(passes.get('BEACH') or 0)},
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        ?bucket=hour|day|week|month&dimension=total|station|location|payment_mode
+        &start=YYYY-MM-DD&end=YYYY-MM-DD (end inclusive, defaults to today).
+        """
+        bucket = request.query_params.get('bucket', 'day')
+        dimension = request.query_params.get('dimension', 'total')
+        if bucket not in SERIES_BUCKETS or dimension not in SERIES_DIMENSIONS:
+            return Response({'error': 'Invalid bucket or dimension'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end_day = parse_date(request.query_params.get('end') or '') or timezone.localdate()
+            start_day = parse_date(request.query_params.get('start') or '') or end_day - SERIES_DEFAULT_SPAN[bucket]
+        except ValueError:
+            return Response({'error': 'Invalid date'}, status=status.HTTP_400_BAD_REQUEST)
+        if start_day > end_day or (bucket == 'hour' and (end_day - start_day).days > SERIES_MAX_HOURLY_DAYS):
+            return Response({'error': 'Invalid date range'}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = timezone.make_aware(datetime.combine(start_day, time.min))
+        end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+        return Response(revenue_series(bucket, start, end, dimension))
+
+    @action(detail=False, methods=['get'])
+    def timings(self, request):
+        """
+        p50/p90 seconds to READY and to SERVED, overall, by station and by hour,
+        for orders placed between ?start=YYYY-MM-DD and ?end=YYYY-MM-DD (inclusive,
+        default the last 7 days).
+        """
+        try:
+            end_day = parse_date(request.query_params.get('end') or '') or timezone.localdate()
+            start_day = parse_date(request.query_params.get('start') or '') or end_day - TIMINGS_DEFAULT_SPAN
+        except ValueError:
+            return Response({'error': 'Invalid date'}, status=status.HTTP_400_BAD_REQUEST)
+        if start_day > end_day:
+            return Response({'error': 'Invalid date range'}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = timezone.make_aware(datetime.combine(start_day, time.min))
+        end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+        return Response({'start': start_day, 'end': end_day, **order_timings(start, end)})
+
+    def build_stats(self):
         now = timezone.now()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Helper for time ranges
-        timeframes = {
-            'today': today_start,
-            'week': now - timedelta(days=7),
-            'month': now - timedelta(days=30),
-            'year': now - timedelta(days=365)
-        }
-        
-        # Revenue Stats
-        revenue_data = {}
-        for label, start_date in timeframes.items():
-            # Total Revenue
-            total = Order.objects.filter(created_at__gte=start_date, status='SERVED') \
-                .aggregate(sum=Sum('total_amount'))['sum'] or 0.00
-                
-            # Kitchen Revenue (Food Items)
-            kitchen_sales = OrderItem.objects.filter(
-                order__created_at__gte=start_date, 
-                order__status='SERVED',
-                menu_item__preparation_station='KITCHEN'
-            ).annotate(item_total=F('price_at_time') * F('quantity')).aggregate(sum=Sum('item_total'))['sum'] or 0.00
-            
-            # Bar Revenue (Drink Items)
-            bar_sales = OrderItem.objects.filter(
-                order__created_at__gte=start_date, 
-                order__status='SERVED',
-                menu_item__preparation_station='BAR'
-            ).annotate(item_total=F('price_at_time') * F('quantity')).aggregate(sum=Sum('item_total'))['sum'] or 0.00
-
-            # Waiter Revenue
-            waiter_sales = total 
+        timeframes = timeframe_starts(timezone.localdate(now))
 
+        # Revenue Stats: one query over the daily F&B rollup for all timeframes
+        fnb = fnb_revenue(timeframes)
+        revenue_data = {}
+        for label in timeframes:
+            total = fnb[label]['total']
             revenue_data[label] = {
                 'total': float(total),
-                'kitchen': float(kitchen_sales),
-                'bar': float(bar_sales),
-                'waiter': float(waiter_sales)
+                'kitchen': float(fnb[label]['by_station']['KITCHEN']),
+                'bar': float(fnb[label]['by_station']['BAR']),
+                'waiter': float(total)
             }
 
         # Kitchen Specific Stats (Today)
@@ -64,30 +151,17 @@ class ReportingViewSet(viewsets.ViewSet):
         kitchen_processed = kitchen_today_orders.count()
         kitchen_served = kitchen_today_orders.filter(status='SERVED').count()
         
-        # Avg Prep Time (Created to Ready)
-        kitchen_avg_prep = Order.objects.filter(
-            created_at__gte=today_start,
-            status__in=['READY', 'SERVED'],
-            items__menu_item__preparation_station='KITCHEN'
-        ).distinct().annotate(
-            duration=ExpressionWrapper(F('updated_at') - F('created_at'), output_field=DurationField())
-        ).aggregate(avg_prep=Avg('duration'))['avg_prep']
-        
-        kitchen_avg_mins = int(kitchen_avg_prep.total_seconds() / 60) if kitchen_avg_prep else 0
+        # Median Prep Time (Created to first Ready), from the status log
+        kitchen_prep_secs = median_seconds('READY', today_start, station='KITCHEN')
+        kitchen_avg_mins = int(kitchen_prep_secs / 60) if kitchen_prep_secs else 0
 
         # Waiter Specific Stats (Today)
         waiter_processed = Order.objects.filter(created_at__gte=today_start).count()
         waiter_served = Order.objects.filter(created_at__gte=today_start, status='SERVED').count()
         
-        # Avg Service Time (Created to Served)
-        waiter_avg_service = Order.objects.filter(
-            created_at__gte=today_start,
-            status='SERVED'
-        ).annotate(
-            duration=ExpressionWrapper(F('updated_at') - F('created_at'), output_field=DurationField())
-        ).aggregate(avg_svc=Avg('duration'))['avg_svc']
-        
-        waiter_avg_mins = int(waiter_avg_service.total_seconds() / 60) if waiter_avg_service else 0
+        # Median Service Time (Created to Served), from the status log
+        waiter_service_secs = median_seconds('SERVED', today_start)
+        waiter_avg_mins = int(waiter_service_secs / 60) if waiter_service_secs else 0
 
         # Finance Stats (Today)
         today_payments = Payment.objects.filter(date_paid__gte=today_start)
@@ -138,7 +212,7 @@ class ReportingViewSet(viewsets.ViewSet):
             check_out__gte=now.date()
         ).count()
         
-        return Response({
+        return {
             'revenue': revenue_data,
             'kitchen_stats': {
                 'revenue_today': float(revenue_data['today']['kitchen']),
@@ -149,7 +223,7 @@ class ReportingViewSet(viewsets.ViewSet):
                 'top_item_sold': top_kitchen_item['count'] if top_kitchen_item else 0
             },
             'waiter_stats': {
-                'revenue_today': float(total_today := Order.objects.filter(created_at__gte=today_start, status='SERVED').aggregate(sum=Sum('total_amount'))['sum'] or 0.00),
+                'revenue_today': revenue_data['today']['total'],
                 'processed': waiter_processed,
                 'served': waiter_served,
                 'avg_time': waiter_avg_mins
@@ -159,8 +233,8 @@ class ReportingViewSet(viewsets.ViewSet):
                 'collection_breakdown': collection_breakdown,
                 'pending_invoices': float(pending_invoices)
             },
-            'top_items': top_items,
+            'top_items': list(top_items),
             'recent_log': recent_log,
             'rooms': room_stats,
             'active_guests': active_guests
-        })
+        }
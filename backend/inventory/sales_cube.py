@@ -0,0 +1,203 @@
+"""
+In-process OLAP cube over served order lines for /staff/analytics.
+
+Quantity and revenue are held as two dense NumPy arrays shaped
+(day of week, hour, station, location type, menu item), built from one
+values_list fetch. Slicing, dicing and top-N are array reductions, so a
+drill-down costs no SQL.
+
+The cube also keeps the flat fact rows (order, cell, quantity, revenue) so
+it can refresh incrementally: orders named by OrderEvents newer than the
+last refresh have their old rows subtracted and their current served lines
+added back. New menu items trigger a full rebuild.
+"""
+import threading
+import time
+import numpy as np
+from django.db.models import F, DecimalField, ExpressionWrapper
+from django.db.models.functions import ExtractIsoWeekDay, ExtractHour
+from .models import MenuItem, Order, OrderItem, OrderEvent
+
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+HOURS = list(range(24))
+STATIONS = [key for key, _ in MenuItem.STATION_CHOICES]
+# Orders with a location_type outside the choices are counted under OTHER
+OTHER_LOCATION = 'OTHER'
+LOCATIONS = [key for key, _ in Order.LOCATION_TYPE_CHOICES] + [OTHER_LOCATION]
+DIMENSIONS = ['day', 'hour', 'station', 'location', 'item']
+
+# Clicks within this window reuse the cube without touching the database
+REFRESH_INTERVAL = 30
+# Full rebuilds pick up anything the event replay could miss (e.g. late events)
+REBUILD_INTERVAL = 3600
+
+_line_total = ExpressionWrapper(F('price_at_time') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+class SalesCube:
+    def __init__(self):
+        # Re-entrant: queries hold it across their own refresh
+        self.lock = threading.RLock()
+        self.built_at = 0
+        self.rebuilt_at = 0
+        self.last_event_id = None
+
+    # --- Building ---
+
+    def _fetch_lines(self, order_ids=None):
+        """Served lines as NumPy columns: order, day, hour, station, location, item, quantity, revenue."""
+        lines = OrderItem.objects.filter(order__status='SERVED')
+        if order_ids is not None:
+            lines = lines.filter(order_id__in=order_ids)
+        rows = list(
+            lines.annotate(
+                dow=ExtractIsoWeekDay('order__created_at'),
+                hour=ExtractHour('order__created_at'),
+                line_total=_line_total,
+            ).values_list('order_id', 'dow', 'hour', 'menu_item__preparation_station',
+                          'order__location_type', 'menu_item_id', 'quantity', 'line_total')
+        )
+        if not rows:
+            return None
+        order_id, dow, hour, station, location, item_id, quantity, revenue = zip(*rows)
+        return {
+            'order': np.array(order_id, dtype=np.int64),
+            'cell': self._cells(dow, hour, station, location, item_id),
+            'quantity': np.array(quantity, dtype=np.float64),
+            'revenue': np.array([float(r or 0) for r in revenue], dtype=np.float64),
+        }
+
+    def _cells(self, dow, hour, station, location, item_id):
+        """Flat indices into the cube arrays; raises KeyError for menu items built after the cube."""
+        index = (
+            np.array(dow, dtype=np.int64) - 1,
+            np.array(hour, dtype=np.int64),
+            np.array([self.station_index[s] for s in station], dtype=np.int64),
+            np.array([self.location_index.get(l, self.location_index[OTHER_LOCATION]) for l in location], dtype=np.int64),
+            np.array([self.item_index[i] for i in item_id], dtype=np.int64),
+        )
+        return np.ravel_multi_index(index, self.shape)
+
+    def _apply(self, facts, sign):
+        np.add.at(self.quantity.reshape(-1), facts['cell'], sign * facts['quantity'])
+        np.add.at(self.revenue.reshape(-1), facts['cell'], sign * facts['revenue'])
+
+    def rebuild(self):
+        # Events first: anything after this id is replayed by the next refresh
+        self.last_event_id = OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        items = list(MenuItem.objects.order_by('id').values_list('id', 'name'))
+        self.item_ids = [item_id for item_id, _ in items]
+        self.item_names = [name for _, name in items]
+        self.item_index = {item_id: i for i, item_id in enumerate(self.item_ids)}
+        self.station_index = {station: i for i, station in enumerate(STATIONS)}
+        self.location_index = {location: i for i, location in enumerate(LOCATIONS)}
+
+        self.shape = (len(DAYS), len(HOURS), len(STATIONS), len(LOCATIONS), len(items))
+        self.quantity = np.zeros(self.shape)
+        self.revenue = np.zeros(self.shape)
+        self.facts = self._fetch_lines()
+        if self.facts is not None:
+            self._apply(self.facts, 1)
+        self.built_at = self.rebuilt_at = time.monotonic()
+
+    def refresh(self):
+        """Rebuilds on first use, then replays changed orders at most every REFRESH_INTERVAL."""
+        with self.lock:
+            if self.last_event_id is None or time.monotonic() - self.rebuilt_at > REBUILD_INTERVAL:
+                self.rebuild()
+                return
+            if time.monotonic() - self.built_at < REFRESH_INTERVAL:
+                return
+
+            events = list(OrderEvent.objects.filter(id__gt=self.last_event_id).values_list('id', 'order_id'))
+            self.built_at = time.monotonic()
+            if not events:
+                return
+            self.last_event_id = events[-1][0]
+            changed = np.array(sorted({order_id for _, order_id in events}), dtype=np.int64)
+
+            try:
+                current = self._fetch_lines(changed.tolist())
+            except KeyError:
+                self.rebuild()
+                return
+
+            if self.facts is not None:
+                stale = np.isin(self.facts['order'], changed)
+                if stale.any():
+                    self._apply({key: column[stale] for key, column in self.facts.items()}, -1)
+                    self.facts = {key: column[~stale] for key, column in self.facts.items()}
+            if current is not None:
+                self._apply(current, 1)
+                self.facts = current if self.facts is None else {
+                    key: np.concatenate([self.facts[key], current[key]]) for key in current
+                }
+
+    # --- Querying ---
+
+    def _labels(self, dimension):
+        return {
+            'day': DAYS,
+            'hour': HOURS,
+            'station': STATIONS,
+            'location': LOCATIONS,
+            'item': self.item_ids,
+        }[dimension]
+
+    def _selection(self, filters):
+        """Index arrays per axis for {dimension: [labels]}; missing dimensions select everything."""
+        selection = []
+        for dimension in DIMENSIONS:
+            labels = self._labels(dimension)
+            wanted = filters.get(dimension)
+            if wanted:
+                wanted = set(wanted)
+                selection.append(np.array([i for i, label in enumerate(labels) if label in wanted], dtype=np.int64))
+            else:
+                selection.append(np.arange(len(labels)))
+        return selection
+
+    def slice(self, filters, group_by, measure):
+        """Sums `measure` over the filtered cells, keeping the `group_by` dimensions."""
+        with self.lock:
+            self.refresh()
+            return self._slice(filters, group_by, measure)
+
+    def _slice(self, filters, group_by, measure):
+        selection = self._selection(filters)
+        data = getattr(self, measure)[np.ix_(*selection)]
+        summed_axes = tuple(axis for axis, dimension in enumerate(DIMENSIONS) if dimension not in group_by)
+        result = data.sum(axis=summed_axes)
+        # Put the remaining axes in the order they were asked for
+        kept = [dimension for dimension in DIMENSIONS if dimension in group_by]
+        result = np.transpose(result, [kept.index(dimension) for dimension in group_by]) if kept else result
+        keys = {
+            dimension: [self._labels(dimension)[i] for i in selection[DIMENSIONS.index(dimension)]]
+            for dimension in group_by
+        }
+        if 'item' in keys:
+            keys['item_name'] = [self.item_names[self.item_index[item_id]] for item_id in keys['item']]
+        return {'measure': measure, 'group_by': list(group_by), 'keys': keys, 'values': np.round(result, 2).tolist()}
+
+    def top_items(self, filters, measure, limit):
+        """The `limit` menu items with the highest `measure` under the filters."""
+        with self.lock:
+            self.refresh()
+            return self._top_items(filters, measure, limit)
+
+    def _top_items(self, filters, measure, limit):
+        selection = self._selection(filters)
+        totals = getattr(self, measure)[np.ix_(*selection)].sum(axis=(0, 1, 2, 3))
+        order = np.argsort(totals)[::-1][:limit]
+        order = order[totals[order] > 0]
+        items = selection[4][order]
+        return {
+            'measure': measure,
+            'item': [self.item_ids[i] for i in items],
+            'item_name': [self.item_names[i] for i in items],
+            'values': np.round(totals[order], 2).tolist(),
+        }
+
+
+sales_cube = SalesCube()
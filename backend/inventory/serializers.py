@@ -1,10 +1,17 @@
 from rest_framework import serializers
-from .models import MenuCategory, MenuItem, Order, OrderItem, InventoryItem, InventoryStock, StockTransfer, OrderReturn, OrderReturnItem, RestaurantTable
-from finance.models import Invoice, InvoiceItem
-from pms.models import Booking
-import uuid
+from .models import MenuCategory, MenuItem, Order, OrderItem, InventoryItem, InventoryStock, StockTransfer, StockMovement, RecipeIngredient, OrderReturn, OrderReturnItem, RestaurantTable
+from finance.models import InvoiceItem
+from finance.tabs import add_to_open_tab
+from .events import publish_order_event
+from .prep_estimates import estimate_ready_at
+from .querysets import order_queryset
+from core.versioning import bump_version
+from django.db import transaction
+import logging
 from decimal import Decimal
 
+logger = logging.getLogger(__name__)
+
 
 class InventoryStockSerializer(serializers.ModelSerializer):
     department_display = serializers.CharField(source='get_department_display', read_only=True)
@@ -35,6 +42,14 @@ class StockTransferSerializer(serializers.ModelSerializer):
         model = StockTransfer
         fields = ['id', 'item', 'item_name', 'from_dept', 'from_dept_display', 'to_dept', 'to_dept_display', 'quantity', 'timestamp', 'performed_by']
 
+class StockMovementSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    department_display = serializers.CharField(source='get_department_display', read_only=True)
+
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'item', 'item_name', 'department', 'department_display', 'movement_type', 'quantity', 'unit_cost', 'reference', 'reason', 'performed_by', 'created_at']
+
 class MenuCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuCategory
@@ -48,16 +63,37 @@ class RestaurantTableSerializer(serializers.ModelSerializer):
 class MenuItemSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     inventory_item_name = serializers.CharField(source='inventory_item.name', read_only=True)
+    # Manual flag and stock combined; the view passes the cached availability map
+    available_now = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItem
         fields = [
             'id', 'category', 'category_name', 'name', 'description', 
-            'price', 'image', 'is_available', 'preparation_station',
+            'price', 'image', 'is_available', 'available_now', 'preparation_station',
             'inventory_item', 'inventory_item_name'
         ]
 
+    def get_available_now(self, obj):
+        return obj.is_available and self.context.get('availability', {}).get(obj.id, True)
+
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
+    inventory_item_name = serializers.CharField(source='inventory_item.name', read_only=True)
+    unit = serializers.CharField(source='inventory_item.unit', read_only=True)
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ['id', 'menu_item', 'menu_item_name', 'inventory_item', 'inventory_item_name', 'unit', 'quantity', 'department']
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Quantity per portion must be positive.")
+        return value
+
 class OrderItemSerializer(serializers.ModelSerializer):
+    # Plain id on write; OrderSerializer.validate_items resolves them in one query
+    menu_item = serializers.IntegerField(source='menu_item_id')
     menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
     preparation_station = serializers.CharField(source='menu_item.preparation_station', read_only=True)
     
@@ -84,8 +120,10 @@ class OrderReturnSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_items_summary(self, obj):
-        if obj.return_items.exists():
-            return ", ".join([f"{i.quantity}x {i.order_item.menu_item.name}" for i in obj.return_items.all()])
+        # Evaluate .all() rather than .exists() so prefetched rows are reused
+        return_items = obj.return_items.all()
+        if return_items:
+            return ", ".join([f"{i.quantity}x {i.order_item.menu_item.name}" for i in return_items])
         return ", ".join([f"{i.quantity}x {i.menu_item.name}" for i in obj.order.items.all()])
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -94,84 +132,83 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'room', 'location_type', 'status', 'total_amount', 'created_at', 'items', 'returns']
-        read_only_fields = ['status', 'total_amount', 'created_at']
+        fields = ['id', 'room', 'location_type', 'status', 'total_amount', 'estimated_ready_at', 'created_at', 'items', 'returns']
+        read_only_fields = ['status', 'total_amount', 'estimated_ready_at', 'created_at']
+
+    def validate_items(self, items):
+        # One in_bulk query for every menu item on the order
+        menu_items = MenuItem.objects.in_bulk({item['menu_item_id'] for item in items})
+        missing = sorted({item['menu_item_id'] for item in items} - set(menu_items))
+        if missing:
+            raise serializers.ValidationError(f"Invalid menu item(s): {', '.join(map(str, missing))}")
+        for item in items:
+            item['menu_item'] = menu_items[item.pop('menu_item_id')]
+        return items
 
     def create(self, validated_data):
         try:
-            items_data = validated_data.pop('items')
-            
-            # Normalize room/table to uppercase to avoid duplicates like T5 vs t5
-            if 'room' in validated_data and validated_data['room']:
-                validated_data['room'] = validated_data['room'].upper()
-                
-            order = Order.objects.create(**validated_data)
-            print(f"DEBUG: Created Order #{order.id} for room {order.room}")
-            
-            total = Decimal('0.00')
-            for item_data in items_data:
-                menu_item = item_data['menu_item']
-                quantity = int(item_data['quantity'])
-                price = Decimal(str(menu_item.price))
-                
-                OrderItem.objects.create(
-                    order=order, 
-                    menu_item=menu_item, 
-                    quantity=quantity, 
-                    price_at_time=price
-                )
-                total += price * quantity
-                print(f"DEBUG: Added {quantity}x {menu_item.name} to Order #{order.id}")
-            
-            order.total_amount = total
-            order.save()
-            print(f"DEBUG: Order #{order.id} total updated to {total}")
-
-            # Create or Update Invoice in Finance App
-            try:
-                active_booking = Booking.objects.filter(room__room_number=order.room, is_checked_in=True).last()
-                location_label = f"{order.get_location_type_display()} {order.room}" if order.room and order.room != 'Walk-in' else "Walk-in"
-                
-                # Try to find an existing UNPAID invoice for this specific table/location
-                # This allows "Add More" functionality to consolidate under one bill
-                invoice = Invoice.objects.filter(
-                    reference_location=location_label,
-                    is_paid=False
-                ).last()
-                
-                if invoice:
-                    print(f"DEBUG: Found existing unpaid invoice {invoice.invoice_number} for {location_label}. Appending items.")
-                    invoice.total_ht += total
-                    invoice.total_ft += total
-                    invoice.balance_ptd += total
-                    invoice.save()
-                else:
-                    print(f"DEBUG: No existing unpaid invoice for {location_label}. Creating new one.")
-                    invoice = Invoice.objects.create(
-                        booking=active_booking,
-                        reference_location=location_label,
-                        invoice_number=f"INV-{uuid.uuid4().hex[:8].upper()}",
-                        total_ht=total,
-                        total_ft=total,
-                        balance_ptd=total,
-                        is_paid=False
-                    )
-                
-                for item in order.items.all():
-                    InvoiceItem.objects.create(
-                        invoice=invoice,
-                        related_order=order,
-                        description=f"{item.menu_item.name} (Order #{order.id})",
-                        quantity=item.quantity,
-                        unit_price=item.price_at_time,
-                        total_line=item.quantity * item.price_at_time
-                    )
-                print(f"DEBUG: Invoice {invoice.invoice_number} updated/created for Order #{order.id}")
-            except Exception as inv_e:
-                print(f"DEBUG: Non-critical invoice update failed for Order #{order.id}: {inv_e}")
-
-            return order
-
+            with transaction.atomic():
+                order = self.place_order(validated_data)
         except Exception as e:
-            print(f"DEBUG: Critical failure in OrderSerializer.create: {e}")
+            logger.exception("Order placement failed")
             raise serializers.ValidationError(f"Internal Order Error: {e}")
+
+        # Reload through the prefetch builder so rendering the response is a fixed 4 queries
+        return order_queryset().get(pk=order.pk)
+
+    def place_order(self, validated_data):
+        """
+        Writes the order, its items, the open invoice update and the invoice
+        lines with bulk statements. Must run inside transaction.atomic.
+        Billing is non-critical: if it fails the order is still placed.
+        """
+        items_data = validated_data.pop('items')
+
+        # Normalize room/table to uppercase to avoid duplicates like T5 vs t5
+        if 'room' in validated_data and validated_data['room']:
+            validated_data['room'] = validated_data['room'].upper()
+
+        lines = [
+            (item_data['menu_item'], int(item_data['quantity']), Decimal(str(item_data['menu_item'].price)))
+            for item_data in items_data
+        ]
+        total = sum((price * quantity for _, quantity, price in lines), Decimal('0.00'))
+
+        # Queue depth is read before the order exists so it doesn't count itself
+        estimated_ready_at = estimate_ready_at({menu_item.preparation_station for menu_item, _, _ in lines})
+        order = Order.objects.create(total_amount=total, estimated_ready_at=estimated_ready_at, **validated_data)
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=menu_item, quantity=quantity, price_at_time=price)
+            for menu_item, quantity, price in lines
+        ])
+
+        # Savepoint: a billing failure rolls back the invoice work only
+        try:
+            with transaction.atomic():
+                self.bill_order(order, order_items, total)
+        except Exception:
+            logger.exception("Non-critical invoice update failed for Order #%s", order.id)
+
+        publish_order_event(order.id, 'CREATED')
+        return order
+
+    def bill_order(self, order, order_items, total):
+        """Adds the order to its location's open invoice and writes its invoice lines."""
+        location_label = f"{order.get_location_type_display()} {order.room}" if order.room and order.room != 'Walk-in' else "Walk-in"
+
+        # "Add More" orders are consolidated under the location's open tab
+        invoice = add_to_open_tab(location_label, total, room_number=order.room, location_type=order.location_type)
+
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(
+                invoice=invoice,
+                related_order=order,
+                description=f"{item.menu_item.name} (Order #{order.id})",
+                quantity=item.quantity,
+                unit_price=item.price_at_time,
+                total_line=item.quantity * item.price_at_time
+            )
+            for item in order_items
+        ])
+        # bulk_create skips the post_save version bump
+        bump_version('invoice')
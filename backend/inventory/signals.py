@@ -0,0 +1,54 @@
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Order, OrderItem, OrderReturn
+from .events import publish_order_event, publish_order_deleted
+from finance.rollups import record_order_served, record_order_lines
+
+@receiver(post_save, sender=Order)
+def order_status_changed(sender, instance, created, **kwargs):
+    # New orders are published by OrderSerializer.create once their items exist
+    if created:
+        instance._loaded_status = instance.status
+        return
+
+    old_status = getattr(instance, '_loaded_status', None)
+    if instance.status != old_status:
+        instance._loaded_status = instance.status
+        publish_order_event(instance.id, 'STATUS')
+
+        # Daily revenue counts served orders only
+        if instance.status == 'SERVED':
+            record_order_served(instance)
+        elif old_status == 'SERVED':
+            record_order_served(instance, sign=-1)
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    publish_order_deleted(instance)
+
+@receiver(post_save, sender=OrderReturn)
+def order_return_changed(sender, instance, **kwargs):
+    publish_order_event(instance.order_id, 'RETURN')
+
+# Lines of a served order changing (returns) adjust its daily revenue
+
+@receiver(post_init, sender=OrderItem)
+def order_item_loaded(sender, instance, **kwargs):
+    instance._loaded_line = (instance.quantity, instance.price_at_time) if instance.pk else None
+
+@receiver(post_save, sender=OrderItem)
+def order_item_changed(sender, instance, created, **kwargs):
+    old_line = None if created else instance._loaded_line
+    instance._loaded_line = (instance.quantity, instance.price_at_time)
+    if old_line == instance._loaded_line or instance.order.status != 'SERVED':
+        return
+    lines = [(instance.menu_item, instance.quantity, instance.price_at_time)]
+    if old_line:
+        lines.append((instance.menu_item, -old_line[0], old_line[1]))
+    record_order_lines(instance.order, lines)
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, **kwargs):
+    # Also runs for each line when a served order is deleted
+    if instance._loaded_line and instance.order.status == 'SERVED':
+        record_order_lines(instance.order, [(instance.menu_item, instance._loaded_line[0], instance._loaded_line[1])], sign=-1)
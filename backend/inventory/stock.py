@@ -0,0 +1,94 @@
+"""
+Single write path for InventoryStock quantities.
+
+Every stock change (receipts, stock-outs, transfers, sales, adjustments)
+goes through apply_stock_changes, which applies all deltas of one operation
+with a single database-side UPDATE on rows locked in a fixed order, so
+concurrent bar sales and transfers can neither lose updates nor deadlock
+each other, and journals each delta as a StockMovement.
+"""
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.db import models, transaction
+from django.db.models import F, Q, Case, When, Value
+from core.versioning import bump_version
+from .models import InventoryStock, StockMovement
+
+
+class InsufficientStock(Exception):
+    def __init__(self, item_id, department, available):
+        self.item_id = item_id
+        self.department = department
+        self.available = available
+        super().__init__(f"Insufficient stock in {department}. Available: {available}")
+
+
+def stock_department(preparation_station, location_type):
+    """Inventory department a menu item is served from, by station and order location."""
+    if preparation_station == 'KITCHEN':
+        return 'KITCHEN'
+    if preparation_station == 'BAR':
+        if location_type == 'POOL':
+            return 'POOL'
+        if location_type == 'BEACH':
+            return 'BEACH_BAR'
+        return 'BAR'
+    return 'MAIN'
+
+
+def apply_stock_changes(changes, movement_type, enforce_available=(), reference='', reason='', performed_by=''):
+    """
+    Applies {(item_id, department): delta} in one UPDATE, journals one
+    StockMovement per delta and returns the new quantities keyed the same
+    way. Missing stock rows are created at 0.
+
+    Keys listed in `enforce_available` may not go below zero; if one would,
+    InsufficientStock is raised and nothing is changed.
+    """
+    changes = {key: Decimal(str(delta)) for key, delta in changes.items() if delta}
+    if not changes:
+        return {}
+
+    with transaction.atomic():
+        InventoryStock.objects.bulk_create(
+            [InventoryStock(item_id=item_id, department=department) for item_id, department in changes],
+            ignore_conflicts=True,
+        )
+
+        # Lock in (item, department) order so overlapping operations queue instead of deadlocking
+        match = reduce(or_, (Q(item_id=item_id, department=department) for item_id, department in changes))
+        stocks = {
+            (stock.item_id, stock.department): stock
+            for stock in InventoryStock.objects.select_for_update(of=('self',)).select_related('item')
+                .filter(match).order_by('item_id', 'department')
+        }
+
+        for key in enforce_available:
+            stock = stocks[key]
+            if stock.quantity + changes[key] < 0:
+                raise InsufficientStock(key[0], key[1], stock.quantity)
+
+        InventoryStock.objects.filter(pk__in=[stock.pk for stock in stocks.values()]).update(
+            quantity=F('quantity') + Case(
+                *[When(pk=stocks[key].pk, then=Value(delta)) for key, delta in changes.items()],
+                output_field=models.DecimalField(max_digits=14, decimal_places=3),
+            )
+        )
+
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                item_id=item_id,
+                department=department,
+                movement_type=movement_type,
+                quantity=delta,
+                unit_cost=stocks[(item_id, department)].item.cost_price,
+                reference=reference,
+                reason=reason,
+                performed_by=performed_by,
+            )
+            for (item_id, department), delta in changes.items()
+        ])
+        bump_version('stock')
+
+    return {key: stocks[key].quantity + delta for key, delta in changes.items()}
@@ -0,0 +1,137 @@
+"""
+Stock history reports built on the StockMovement journal.
+
+Snapshots are taken per batch (every department at once, one `taken_at`),
+each recording the newest movement it includes. Stock at a date is then the
+newest snapshot batch before that date plus the movements journaled after
+it, so valuation and history queries read one batch and a short tail of the
+journal instead of replaying it from the beginning.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Max, F, Q, DecimalField, ExpressionWrapper
+from django.utils import timezone
+from .models import InventoryItem, StockMovement, StockSnapshot
+
+# Movements newer than this may belong to transactions that haven't
+# committed yet (ids are handed out at insert), so snapshots stop short.
+SNAPSHOT_SETTLE_TIME = timedelta(minutes=1)
+
+SHRINKAGE_FILTER = Q(movement_type='STOCK_OUT') | Q(movement_type='ADJUSTMENT', quantity__lt=0)
+
+_movement_value = ExpressionWrapper(F('quantity') * F('unit_cost'), output_field=DecimalField(max_digits=24, decimal_places=5))
+
+
+def _latest_batch(as_of=None):
+    """(taken_at, last_movement_id) of the newest snapshot batch at or before as_of."""
+    snapshots = StockSnapshot.objects.all()
+    if as_of is not None:
+        snapshots = snapshots.filter(taken_at__lte=as_of)
+    return snapshots.values_list('taken_at', 'last_movement_id').order_by('-taken_at').first() or (None, 0)
+
+
+def stock_levels(as_of=None, department=None, up_to_movement=None):
+    """
+    {(item_id, department): quantity} at `as_of` (now if None), optionally
+    for one department and/or only counting movements up to `up_to_movement`.
+    """
+    taken_at, last_movement_id = _latest_batch(as_of)
+    levels = {}
+
+    if taken_at is not None:
+        snapshots = StockSnapshot.objects.filter(taken_at=taken_at)
+        if department:
+            snapshots = snapshots.filter(department=department)
+        for item_id, dept, quantity in snapshots.values_list('item_id', 'department', 'quantity'):
+            levels[(item_id, dept)] = quantity
+
+    movements = StockMovement.objects.filter(id__gt=last_movement_id)
+    if as_of is not None:
+        movements = movements.filter(created_at__lte=as_of)
+    if department:
+        movements = movements.filter(department=department)
+    if up_to_movement is not None:
+        movements = movements.filter(id__lte=up_to_movement)
+    for row in movements.values('item_id', 'department').annotate(delta=Sum('quantity')):
+        key = (row['item_id'], row['department'])
+        levels[key] = levels.get(key, Decimal('0')) + row['delta']
+
+    return levels
+
+
+def take_snapshot():
+    """
+    Writes a new snapshot batch from the previous batch plus the settled
+    movements since. Returns the number of rows written (0 if nothing moved).
+    """
+    now = timezone.now()
+    boundary = StockMovement.objects.filter(created_at__lt=now - SNAPSHOT_SETTLE_TIME).aggregate(last=Max('id'))['last']
+    if boundary is None or boundary <= _latest_batch()[1]:
+        return 0
+
+    levels = stock_levels(up_to_movement=boundary)
+    with transaction.atomic():
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(item_id=item_id, department=dept, quantity=quantity, taken_at=now, last_movement_id=boundary)
+            for (item_id, dept), quantity in levels.items()
+        ])
+    return len(levels)
+
+
+def movement_summary(start, end, department=None):
+    """Quantity and cost value moved per department and movement type in [start, end)."""
+    movements = StockMovement.objects.filter(created_at__gte=start, created_at__lt=end)
+    if department:
+        movements = movements.filter(department=department)
+    return list(
+        movements.values('department', 'movement_type')
+        # value first: once `quantity` is an annotation, _movement_value's F('quantity') would mean it
+        .annotate(value=Sum(_movement_value), quantity=Sum('quantity'))
+        .order_by('department', 'movement_type')
+    )
+
+
+def stock_valuation(as_of=None, department=None):
+    """Stock on hand at `as_of` valued at each item's cost price."""
+    levels = stock_levels(as_of, department)
+    items = InventoryItem.objects.in_bulk({item_id for item_id, _ in levels})
+
+    rows = []
+    totals = {}
+    for (item_id, dept), quantity in sorted(levels.items()):
+        item = items.get(item_id)
+        if item is None or not quantity:
+            continue
+        value = quantity * item.cost_price
+        totals[dept] = totals.get(dept, Decimal('0')) + value
+        rows.append({
+            'item': item_id,
+            'item_name': item.name,
+            'department': dept,
+            'quantity': quantity,
+            'unit_cost': item.cost_price,
+            'value': value,
+        })
+    return {
+        'rows': rows,
+        'by_department': totals,
+        'total': sum(totals.values(), Decimal('0')),
+    }
+
+
+def shrinkage_report(start, end, department=None):
+    """Stock lost to stock-outs and downward adjustments in [start, end), valued at the time."""
+    movements = StockMovement.objects.filter(SHRINKAGE_FILTER, created_at__gte=start, created_at__lt=end)
+    if department:
+        movements = movements.filter(department=department)
+    rows = list(
+        movements.values('item_id', 'item__name', 'department')
+        # value first: once `quantity` is an annotation, _movement_value's F('quantity') would mean it
+        .annotate(value=Sum(_movement_value), quantity=Sum('quantity'))
+        .order_by('value')
+    )
+    return {
+        'rows': rows,
+        'total': sum((row['value'] for row in rows), Decimal('0')),
+    }
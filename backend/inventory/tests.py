@@ -1,3 +1,807 @@
-from django.test import TestCase
+import io
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+import numpy as np
+from decimal import Decimal
+from django.db import connection
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import User
+from finance.models import (
+    Invoice, InvoiceItem, OpenTab, DailyFnbRevenue, DailyPassRevenue, DailyPaymentTotal, DailyRoomRevenue,
+)
+from pms.models import Room
+from recreation.models import PassType
+from .models import (
+    InventoryItem, InventoryStock, StockMovement, MenuCategory, MenuItem,
+    Order, OrderItem, OrderReturn, OrderReturnItem, OrderStatusChange, RecipeIngredient,
+)
+from .stock import apply_stock_changes, InsufficientStock
+from .stock_reports import movement_summary, shrinkage_report, stock_levels, take_snapshot
+from .feed_views import issue_feed_ticket, _still_authorized
+from . import availability
+from .prep_estimates import prep_estimator, PrepTimeEstimator, CACHE_KEY, DEFAULT_SECONDS
+from .sales_cube import sales_cube
+from .events import publish_order_event
+from .querysets import order_queryset, order_return_queryset
+from .serializers import OrderSerializer, OrderReturnSerializer
+from .reporting import revenue_report
 
-# Create your tests here.
+
+class ApplyStockChangesTests(TestCase):
+    def setUp(self):
+        self.gin = InventoryItem.objects.create(name='Gin', sku='GIN-1', unit='bottle', cost_price=Decimal('12.00'))
+        self.tonic = InventoryItem.objects.create(name='Tonic', sku='TON-1', unit='can', cost_price=Decimal('1.00'))
+        InventoryStock.objects.create(item=self.gin, department='BAR', quantity=Decimal('2'))
+        InventoryStock.objects.create(item=self.tonic, department='BAR', quantity=Decimal('10'))
+
+    def quantity(self, item, department='BAR'):
+        return InventoryStock.objects.get(item=item, department=department).quantity
+
+    def test_enforced_stock_never_goes_below_zero(self):
+        changes = {(self.gin.id, 'BAR'): -3, (self.tonic.id, 'BAR'): -3}
+        with self.assertRaises(InsufficientStock) as raised:
+            apply_stock_changes(changes, 'SALE', enforce_available=list(changes))
+
+        self.assertEqual(raised.exception.item_id, self.gin.id)
+        self.assertEqual(raised.exception.available, Decimal('2'))
+        # Nothing of the operation is applied, not even the lines that fit
+        self.assertEqual(self.quantity(self.gin), Decimal('2'))
+        self.assertEqual(self.quantity(self.tonic), Decimal('10'))
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_enforced_stock_may_reach_zero(self):
+        result = apply_stock_changes({(self.gin.id, 'BAR'): -2}, 'SALE', enforce_available=[(self.gin.id, 'BAR')])
+        self.assertEqual(result, {(self.gin.id, 'BAR'): Decimal('0')})
+        self.assertEqual(self.quantity(self.gin), Decimal('0'))
+        self.assertEqual(StockMovement.objects.get().quantity, Decimal('-2'))
+
+    def test_unenforced_changes_create_missing_rows(self):
+        apply_stock_changes({(self.gin.id, 'POOL'): 4, (self.gin.id, 'BAR'): -4}, 'TRANSFER')
+        self.assertEqual(self.quantity(self.gin, 'POOL'), Decimal('4'))
+        self.assertEqual(self.quantity(self.gin), Decimal('-2'))
+
+
+class StockReportTests(TestCase):
+    def setUp(self):
+        self.gin = InventoryItem.objects.create(name='Gin', sku='GIN-1', unit='bottle', cost_price=Decimal('12.00'))
+        self.start = timezone.now() - timedelta(hours=1)
+        apply_stock_changes({(self.gin.id, 'BAR'): 10}, 'RECEIPT')
+        apply_stock_changes({(self.gin.id, 'BAR'): -3}, 'SALE')
+        apply_stock_changes({(self.gin.id, 'BAR'): -1}, 'STOCK_OUT')
+        apply_stock_changes({(self.gin.id, 'BAR'): 2}, 'ADJUSTMENT')
+        self.end = timezone.now() + timedelta(hours=1)
+
+    def test_movement_summary_values_each_type(self):
+        summary = {
+            row['movement_type']: (row['quantity'], row['value'])
+            for row in movement_summary(self.start, self.end, 'BAR')
+        }
+        self.assertEqual(summary, {
+            'ADJUSTMENT': (Decimal('2'), Decimal('24')),
+            'RECEIPT': (Decimal('10'), Decimal('120')),
+            'SALE': (Decimal('-3'), Decimal('-36')),
+            'STOCK_OUT': (Decimal('-1'), Decimal('-12')),
+        })
+
+    def test_shrinkage_counts_stock_outs_and_downward_adjustments(self):
+        apply_stock_changes({(self.gin.id, 'BAR'): -2}, 'ADJUSTMENT')
+        report = shrinkage_report(self.start, self.end)
+        self.assertEqual(
+            [(row['item_id'], row['quantity'], row['value']) for row in report['rows']],
+            [(self.gin.id, Decimal('-3'), Decimal('-36'))],
+        )
+        self.assertEqual(report['total'], Decimal('-36'))
+
+    def test_levels_from_a_snapshot_plus_later_movements_match_stock(self):
+        # Only settled movements are snapshotted
+        self.assertEqual(take_snapshot(), 0)
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(take_snapshot(), 1)
+        apply_stock_changes({(self.gin.id, 'BAR'): -4}, 'SALE')
+
+        self.assertEqual(stock_levels(), {(self.gin.id, 'BAR'): Decimal('4')})
+        self.assertEqual(InventoryStock.objects.get(item=self.gin, department='BAR').quantity, Decimal('4'))
+
+    def test_summary_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='storekeeper', password='x', role='ADMIN'))
+        response = client.get(reverse('stock-movement-summary'), {'department': 'BAR'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['movements']), 4)
+
+
+class ReturnOpenTabTests(TestCase):
+    def setUp(self):
+        category = MenuCategory.objects.create(name='Drinks', slug='drinks')
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('10.00'), preparation_station='BAR')
+        self.soda = MenuItem.objects.create(category=category, name='Coke', price=Decimal('5.00'), preparation_station='BAR')
+
+        self.invoice = Invoice.objects.create(
+            reference_location='Table T5', invoice_number='INV-TAB',
+            total_ht=Decimal('35.00'), total_ft=Decimal('35.00'), balance_ptd=Decimal('35.00'),
+        )
+        self.order = self._order([(self.beer, 2), (self.soda, 1)])
+        self._order([(self.beer, 1)])
+        self.tab = OpenTab.objects.create(
+            location_key='TABLE T5', invoice=self.invoice, location_type='TABLE',
+            total_bill=Decimal('35.00'), order_count=2,
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='manager', password='x', role='ADMIN'))
+
+    def _order(self, lines):
+        order = Order.objects.create(
+            room='T5', location_type='TABLE', status='SERVED',
+            total_amount=sum(item.price * quantity for item, quantity in lines),
+        )
+        for item, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=item, quantity=quantity, price_at_time=item.price)
+            InvoiceItem.objects.create(
+                invoice=self.invoice, related_order=order, description=f"Order #{order.id}: {item.name}",
+                quantity=quantity, unit_price=item.price, total_line=item.price * quantity,
+            )
+        return order
+
+    def _approve_return(self, lines):
+        ret = OrderReturn.objects.create(order=self.order, reason='Wrong drink', status='APPROVED_STATION')
+        for item, quantity in lines:
+            OrderReturnItem.objects.create(
+                order_return=ret, order_item=self.order.items.get(menu_item=item), quantity=quantity,
+            )
+        response = self.client.post(reverse('order-return-approve-admin', args=[ret.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.tab.refresh_from_db()
+        self.invoice.refresh_from_db()
+
+    def test_partial_return_reduces_the_tab(self):
+        self._approve_return([(self.beer, 1)])
+        self.assertEqual(self.tab.total_bill, Decimal('25.00'))
+        self.assertEqual(self.tab.order_count, 2)
+        self.assertEqual(self.invoice.total_ft, Decimal('25.00'))
+
+    def test_full_return_drops_the_order_from_the_tab(self):
+        self._approve_return([(self.beer, 2), (self.soda, 1)])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'RETURNED')
+        self.assertEqual(self.tab.total_bill, Decimal('10.00'))
+        self.assertEqual(self.tab.order_count, 1)
+        self.assertEqual(self.invoice.total_ft, Decimal('10.00'))
+
+
+class OrderTimingsTests(TestCase):
+    def _order_reaching(self, **seconds):
+        order = Order.objects.create(room='T1', location_type='TABLE', status='SERVED')
+        for to_status, elapsed in seconds.items():
+            OrderStatusChange.objects.create(
+                order=order, from_status='PENDING', to_status=to_status.upper(), stations='KITCHEN',
+                seconds_in_previous=elapsed, seconds_since_created=elapsed,
+            )
+
+    def test_timings_route_is_reachable(self):
+        response = self.client.get(reverse('inventory-reports-timings'), {'start': '2026-02-02', 'end': '2026-02-01'})
+        self.assertEqual(response.status_code, 400)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "percentile_cont is PostgreSQL only")
+    def test_percentiles_per_stage_and_station(self):
+        for ready, served in [(300, 600), (600, 900), (900, 1200)]:
+            self._order_reaching(ready=ready, served=served)
+
+        response = self.client.get(reverse('inventory-reports-timings'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ready']['orders'], 3)
+        self.assertEqual(response.data['ready']['p50'], 600)
+        self.assertEqual(response.data['served']['p50'], 900)
+        self.assertEqual(response.data['by_station']['KITCHEN']['ready']['p50'], 600)
+        self.assertEqual(response.data['by_station']['BAR']['ready']['orders'], 0)
+
+
+class ReturnRestockTests(TestCase):
+    def setUp(self):
+        self.beer_stock = InventoryItem.objects.create(name='Club Beer', sku='BEER-1', unit='bottle', cost_price=Decimal('3.00'))
+        InventoryStock.objects.create(item=self.beer_stock, department='BAR', quantity=Decimal('10'))
+        category = MenuCategory.objects.create(name='Drinks', slug='drinks')
+        self.beer = MenuItem.objects.create(
+            category=category, name='Club Beer', price=Decimal('10.00'),
+            preparation_station='BAR', inventory_item=self.beer_stock,
+        )
+        self.order = Order.objects.create(room='T2', location_type='TABLE', total_amount=Decimal('30.00'))
+        OrderItem.objects.create(order=self.order, menu_item=self.beer, quantity=3, price_at_time=self.beer.price)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='manager', password='x', role='ADMIN'))
+
+    def quantity(self):
+        return InventoryStock.objects.get(item=self.beer_stock, department='BAR').quantity
+
+    def test_approved_return_of_served_order_is_restocked_and_journaled(self):
+        self.client.post(reverse('order-update-status', args=[self.order.pk]), {'status': 'SERVED'}, format='json')
+        self.assertEqual(self.quantity(), Decimal('7'))
+
+        ret = OrderReturn.objects.create(order=self.order, reason='Warm', status='APPROVED_STATION')
+        OrderReturnItem.objects.create(order_return=ret, order_item=self.order.items.get(), quantity=2)
+        response = self.client.post(reverse('order-return-approve-admin', args=[ret.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantity(), Decimal('9'))
+        movement = StockMovement.objects.get(movement_type='RETURN')
+        self.assertEqual((movement.department, movement.quantity), ('BAR', Decimal('2')))
+        self.assertEqual(movement.reference, f"Return #{ret.id} (Order #{self.order.id})")
+
+    def test_return_before_serving_leaves_stock_alone(self):
+        ret = OrderReturn.objects.create(order=self.order, reason='Changed mind', status='APPROVED_STATION')
+        OrderReturnItem.objects.create(order_return=ret, order_item=self.order.items.get(), quantity=1)
+        self.client.post(reverse('order-return-approve-admin', args=[ret.pk]))
+
+        self.assertEqual(self.quantity(), Decimal('10'))
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class OrderFeedAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='chef', password='x', role='KITCHEN')
+        self.token = AccessToken.for_user(self.user)
+        self.feed = reverse('order-feed')
+
+    async def test_requires_credentials(self):
+        response = await AsyncClient().get(self.feed)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_access_token_in_query_string_is_not_accepted(self):
+        response = await AsyncClient().get(self.feed, {'token': str(self.token)})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_streams_with_bearer_header(self):
+        response = await AsyncClient().get(self.feed, headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    async def test_ticket_opens_the_feed(self):
+        response = await sync_to_async(APIClient().post)(
+            reverse('order-feed-ticket'), headers={'Authorization': f'Bearer {self.token}'},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        feed = await AsyncClient().get(self.feed, {'ticket': response.data['ticket'], 'station': 'KITCHEN'})
+        self.assertEqual(feed.status_code, 200)
+
+    def test_ticket_endpoint_requires_authentication(self):
+        response = APIClient().post(reverse('order-feed-ticket'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_rejects_forged_and_expired_tickets(self):
+        client = AsyncClient()
+        forged = issue_feed_ticket(self.user, time.time() + 60)[:-2] + 'xx'
+        self.assertEqual((await client.get(self.feed, {'ticket': forged})).status_code, 401)
+        expired = issue_feed_ticket(self.user, time.time() - 1)
+        self.assertEqual((await client.get(self.feed, {'ticket': expired})).status_code, 401)
+
+    async def test_open_streams_are_rechecked(self):
+        self.assertTrue(await _still_authorized(self.user, time.time() + 60))
+        self.assertFalse(await _still_authorized(self.user, time.time() - 1))
+        await User.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        self.assertFalse(await _still_authorized(self.user, time.time() + 60))
+
+    async def test_rejects_unknown_station(self):
+        response = await AsyncClient().get(self.feed, {'station': 'SPA'}, headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        # Keep the estimator from refreshing in a background thread
+        prep_estimator.loaded_at = time.monotonic()
+        category = MenuCategory.objects.create(name='Mains', slug='mains')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('12.50'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('4.00'), preparation_station='BAR')
+
+    def place(self, **fields):
+        return APIClient().post(reverse('order-list'), {
+            'room': 't5', 'location_type': 'TABLE',
+            'items': [{'menu_item': self.rice.id, 'quantity': 2}, {'menu_item': self.beer.id, 'quantity': 3}],
+            **fields,
+        }, format='json')
+
+    def test_order_items_and_invoice_lines_are_written_together(self):
+        response = self.place()
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.room, 'T5')
+        self.assertEqual(order.total_amount, Decimal('37.00'))
+        self.assertEqual(sorted(order.items.values_list('quantity', 'price_at_time')), [(2, Decimal('12.50')), (3, Decimal('4.00'))])
+        invoice = Invoice.objects.get()
+        self.assertEqual(invoice.total_ft, Decimal('37.00'))
+        self.assertEqual(invoice.items.filter(related_order=order).count(), 2)
+
+    def test_unknown_menu_item_places_nothing(self):
+        response = self.place(items=[{'menu_item': self.rice.id, 'quantity': 1}, {'menu_item': 999999, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_billing_failure_still_places_the_order(self):
+        with mock.patch('inventory.serializers.add_to_open_tab', side_effect=RuntimeError('billing down')):
+            with self.assertLogs('inventory.serializers', 'ERROR'):
+                response = self.place()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().items.count(), 2)
+        self.assertFalse(InvoiceItem.objects.exists())
+
+
+class ActiveOrdersDeltaTests(TestCase):
+    def setUp(self):
+        prep_estimator.loaded_at = time.monotonic()
+        category = MenuCategory.objects.create(name='Mains', slug='mains')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('12.50'))
+        self.client = APIClient()
+
+    def place(self, room):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('order-list'), {
+                'room': room, 'location_type': 'TABLE', 'items': [{'menu_item': self.rice.id, 'quantity': 1}],
+            }, format='json')
+        return response.data['id']
+
+    def test_since_returns_only_changes_after_the_cursor(self):
+        first = self.place('T1')
+        board = self.client.get(reverse('order-active'))
+        self.assertEqual([order['id'] for order in board.data], [first])
+        cursor = int(board['X-Order-Cursor'])
+
+        second = self.place('T2')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('order-update-status', args=[first]), {'status': 'SERVED'}, format='json')
+
+        delta = self.client.get(reverse('order-active'), {'since': cursor})
+        self.assertEqual([order['id'] for order in delta.data['orders']], [second])
+        self.assertEqual(delta.data['removed'], [first])
+        self.assertGreater(delta.data['cursor'], cursor)
+
+        # Nothing new: same cursor back, empty delta
+        again = self.client.get(reverse('order-active'), {'since': delta.data['cursor']})
+        self.assertEqual(again.data, {'cursor': delta.data['cursor'], 'orders': [], 'removed': []})
+
+    def test_since_must_be_a_cursor(self):
+        response = self.client.get(reverse('order-active'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderSerializerQueryCountTests(TestCase):
+    def setUp(self):
+        category = MenuCategory.objects.create(name='Mains', slug='mains')
+        self.menu = [
+            MenuItem.objects.create(category=category, name=f'Dish {n}', price=Decimal('5.00'))
+            for n in range(3)
+        ]
+
+    def add_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(room='T1', location_type='TABLE')
+            items = [OrderItem.objects.create(order=order, menu_item=dish, quantity=2) for dish in self.menu]
+            ret = OrderReturn.objects.create(order=order, reason='Cold')
+            OrderReturnItem.objects.create(order_return=ret, order_item=items[0], quantity=1)
+            # A return without items falls back to the order's items
+            OrderReturn.objects.create(order=order, reason='Late')
+
+    def queries(self, render):
+        with CaptureQueriesContext(connection) as captured:
+            render()
+        return len(captured)
+
+    def test_order_query_count_does_not_grow_with_rows(self):
+        self.add_orders(1)
+        one = self.queries(lambda: OrderSerializer(order_queryset(), many=True).data)
+        self.add_orders(4)
+        self.assertEqual(self.queries(lambda: OrderSerializer(order_queryset(), many=True).data), one)
+        self.assertLessEqual(one, 4)
+
+    def test_return_query_count_does_not_grow_with_rows(self):
+        self.add_orders(1)
+        one = self.queries(lambda: OrderReturnSerializer(order_return_queryset(), many=True).data)
+        self.add_orders(4)
+        data = []
+        self.assertEqual(self.queries(lambda: data.extend(OrderReturnSerializer(order_return_queryset(), many=True).data)), one)
+        self.assertEqual(sorted(ret['items_summary'] for ret in data[:2]), ['1x Dish 0', '2x Dish 0, 2x Dish 1, 2x Dish 2'])
+
+
+class StationTicketsTests(TestCase):
+    def setUp(self):
+        category = MenuCategory.objects.create(name='Menu', slug='menu')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('12.50'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('4.00'), preparation_station='BAR')
+        self.mixed = Order.objects.create(room='T1', location_type='TABLE')
+        OrderItem.objects.create(order=self.mixed, menu_item=self.rice, quantity=1)
+        OrderItem.objects.create(order=self.mixed, menu_item=self.beer, quantity=2)
+        self.drinks = Order.objects.create(room='T2', location_type='TABLE', status='PREPARING')
+        OrderItem.objects.create(order=self.drinks, menu_item=self.beer, quantity=1)
+        served = Order.objects.create(room='T3', location_type='TABLE', status='SERVED')
+        OrderItem.objects.create(order=served, menu_item=self.rice, quantity=1)
+
+    def tickets(self, **params):
+        return self.client.get(reverse('order-tickets'), params)
+
+    def test_tickets_hold_only_the_station_items_of_open_orders(self):
+        kitchen = self.tickets(station='kitchen').data
+        self.assertEqual([ticket['id'] for ticket in kitchen], [self.mixed.id])
+        self.assertEqual([item['menu_item'] for item in kitchen[0]['items']], [self.rice.id])
+
+        bar = self.tickets(station='BAR').data
+        self.assertEqual([ticket['id'] for ticket in bar], [self.mixed.id, self.drinks.id])
+        self.assertEqual([item['quantity'] for item in bar[0]['items']], [2])
+
+    def test_room_filter(self):
+        self.assertEqual([ticket['id'] for ticket in self.tickets(station='BAR', room='T2').data], [self.drinks.id])
+
+    def test_station_is_required(self):
+        self.assertEqual(self.tickets().status_code, 400)
+        self.assertEqual(self.tickets(station='SPA').status_code, 400)
+
+
+class RecipeDeductionTests(TestCase):
+    def setUp(self):
+        self.gin = InventoryItem.objects.create(name='Gin', sku='GIN-1', unit='bottle', cost_price=Decimal('20.00'))
+        self.tonic = InventoryItem.objects.create(name='Tonic', sku='TON-1', unit='can', cost_price=Decimal('1.00'))
+        self.lime = InventoryItem.objects.create(name='Lime', sku='LIM-1', unit='kg', cost_price=Decimal('2.00'), category='KITCHEN')
+        category = MenuCategory.objects.create(name='Drinks', slug='drinks')
+        self.gin_tonic = MenuItem.objects.create(category=category, name='Gin & Tonic', price=Decimal('8.00'), preparation_station='BAR')
+        RecipeIngredient.objects.create(menu_item=self.gin_tonic, inventory_item=self.gin, quantity=Decimal('0.050'))
+        RecipeIngredient.objects.create(menu_item=self.gin_tonic, inventory_item=self.tonic, quantity=Decimal('1'))
+        # Garnish always comes out of the kitchen store
+        RecipeIngredient.objects.create(menu_item=self.gin_tonic, inventory_item=self.lime, quantity=Decimal('0.010'), department='KITCHEN')
+        self.tonic_water = MenuItem.objects.create(
+            category=category, name='Tonic Water', price=Decimal('2.00'), preparation_station='BAR', inventory_item=self.tonic,
+        )
+
+    def serve(self, location_type, lines):
+        order = Order.objects.create(room='P1', location_type=location_type)
+        for menu_item, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=menu_item, quantity=quantity)
+        response = self.client.post(reverse('order-update-status', args=[order.pk]), {'status': 'SERVED'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return order
+
+    def levels(self):
+        return {(stock.item_id, stock.department): stock.quantity for stock in InventoryStock.objects.all()}
+
+    def test_served_order_deducts_recipes_and_single_item_fallbacks(self):
+        order = self.serve('POOL', [(self.gin_tonic, 4), (self.tonic_water, 2)])
+
+        self.assertEqual(self.levels(), {
+            (self.gin.id, 'POOL'): Decimal('-0.200'),
+            # Four from the recipe plus two sold on their own, in one row
+            (self.tonic.id, 'POOL'): Decimal('-6'),
+            (self.lime.id, 'KITCHEN'): Decimal('-0.040'),
+        })
+        movements = StockMovement.objects.filter(movement_type='SALE', reference=f"Order #{order.id}")
+        self.assertEqual(movements.count(), 3)
+        self.assertEqual(movements.get(item=self.gin).unit_cost, Decimal('20.00'))
+
+    def test_bar_department_follows_the_order_location(self):
+        self.serve('BEACH', [(self.tonic_water, 1)])
+        self.serve('TABLE', [(self.tonic_water, 1)])
+        self.assertEqual(self.levels(), {(self.tonic.id, 'BEACH_BAR'): Decimal('-1'), (self.tonic.id, 'BAR'): Decimal('-1')})
+
+    def test_dishes_without_stock_link_deduct_nothing(self):
+        plain = MenuItem.objects.create(category=self.gin_tonic.category, name='Water', price=Decimal('1.00'))
+        self.serve('TABLE', [(plain, 3)])
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class MenuAvailabilityTests(TestCase):
+    def setUp(self):
+        # Per-process map; versions restart at 0 in every test
+        availability._maps.clear()
+        self.beer_stock = InventoryItem.objects.create(name='Club Beer', sku='BEER-1', unit='bottle', cost_price=Decimal('3.00'))
+        category = MenuCategory.objects.create(name='Drinks', slug='drinks')
+        self.beer = MenuItem.objects.create(
+            category=category, name='Club Beer', price=Decimal('4.00'), preparation_station='BAR', inventory_item=self.beer_stock,
+        )
+        self.water = MenuItem.objects.create(category=category, name='Water', price=Decimal('1.00'), preparation_station='BAR')
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_stock_changes({(self.beer_stock.id, 'BAR'): 1}, 'RECEIPT')
+
+    def available(self, location_type='TABLE'):
+        response = self.client.get(reverse('menu-item-list'), {'location_type': location_type})
+        return {item['name']: item['available_now'] for item in response.data}
+
+    def test_dish_drops_off_when_its_stock_runs_out(self):
+        self.assertEqual(self.available(), {'Club Beer': True, 'Water': True})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_stock_changes({(self.beer_stock.id, 'BAR'): -1}, 'SALE')
+
+        self.assertEqual(self.available(), {'Club Beer': False, 'Water': True})
+
+    def test_stock_is_checked_in_the_serving_department(self):
+        # The pool bar has no beer even though the main bar does
+        self.assertEqual(self.available('POOL'), {'Club Beer': False, 'Water': True})
+
+    def test_manual_flag_still_wins(self):
+        MenuItem.objects.filter(pk=self.water.pk).update(is_available=False)
+        self.assertEqual(self.available(), {'Club Beer': True, 'Water': False})
+
+
+class StatsCacheTests(TestCase):
+    @mock.patch('core.cache.COLD_WAIT', 0.2)
+    def test_cold_report_being_built_elsewhere_returns_503(self):
+        cache.add('inventory:reports:stats:lock', 1)
+        response = self.client.get(reverse('inventory-reports'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+
+
+class RevenueReportTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        category = MenuCategory.objects.create(name='Menu', slug='menu')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('10.00'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('5.00'), preparation_station='BAR')
+        self.pool = PassType.objects.create(name='Pool Day', price=Decimal('15.00'), location='POOL')
+        self.room = Room.objects.create(room_number='101', room_type='Hornbill', price_per_night=Decimal('100.00'))
+
+    def days_ago(self, days):
+        return self.today - timedelta(days=days)
+
+    def test_every_timeframe_and_breakdown_from_one_query_per_table(self):
+        for days, menu_item, location, revenue in [
+            (0, self.rice, 'TABLE', '30.00'),
+            (3, self.beer, 'POOL', '20.00'),
+            (20, self.rice, 'ROOM', '50.00'),
+            (200, self.beer, 'BEACH', '40.00'),
+            (400, self.rice, 'TABLE', '999.00'),
+        ]:
+            DailyFnbRevenue.objects.create(
+                date=self.days_ago(days), station=menu_item.preparation_station, location_type=location,
+                menu_item=menu_item, quantity=2, revenue=Decimal(revenue),
+            )
+        DailyPaymentTotal.objects.create(date=self.today, mode='CASH', payments=1, amount=Decimal('30.00'))
+        DailyPaymentTotal.objects.create(date=self.days_ago(3), mode='VISA', payments=2, amount=Decimal('70.00'))
+        DailyPassRevenue.objects.create(date=self.days_ago(3), pass_type=self.pool, passes=4, revenue=Decimal('60.00'))
+        DailyRoomRevenue.objects.create(date=self.today, room=self.room, nights=1, revenue=Decimal('100.00'))
+        # Booked ahead: not revenue yet
+        DailyRoomRevenue.objects.create(date=self.today + timedelta(days=1), room=self.room, nights=1, revenue=Decimal('100.00'))
+
+        with self.assertNumQueries(4):
+            report = revenue_report(self.today)
+
+        self.assertEqual(report['today']['total'], Decimal('30.00'))
+        self.assertEqual(report['week']['total'], Decimal('50.00'))
+        self.assertEqual(report['month']['total'], Decimal('100.00'))
+        self.assertEqual(report['year']['total'], Decimal('140.00'))
+        self.assertEqual(report['year']['items_sold'], 8)
+        self.assertEqual(report['week']['by_station'], {'KITCHEN': Decimal('30.00'), 'BAR': Decimal('20.00')})
+        self.assertEqual(report['month']['by_location']['ROOM'], Decimal('50.00'))
+        self.assertEqual(report['today']['by_location']['POOL'], 0)
+        self.assertEqual(report['week']['payments']['total'], Decimal('100.00'))
+        self.assertEqual(report['today']['payments']['by_mode']['VISA'], 0)
+        self.assertEqual(report['week']['passes']['pool'], {'revenue': Decimal('60.00'), 'passes': 4})
+        self.assertEqual(report['today']['passes']['total_passes'], 0)
+        self.assertEqual(report['year']['rooms'], {'revenue': Decimal('100.00'), 'nights': 1})
+
+
+class RevenueSeriesTests(TestCase):
+    def setUp(self):
+        category = MenuCategory.objects.create(name='Menu', slug='menu')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('10.00'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('5.00'), preparation_station='BAR')
+        self.url = reverse('inventory-reports-series')
+
+    def order(self, day, lines, status='SERVED', location='TABLE'):
+        total = sum(menu_item.price * quantity for menu_item, quantity in lines)
+        order = Order.objects.create(room='T1', location_type=location, status=status, total_amount=total)
+        for menu_item, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=menu_item, quantity=quantity, price_at_time=menu_item.price)
+        created_at = timezone.make_aware(datetime(2026, 3, day, 12))
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+    def test_daily_totals_are_zero_filled_and_aligned(self):
+        self.order(1, [(self.rice, 2)])
+        self.order(1, [(self.beer, 1)], location='POOL')
+        self.order(3, [(self.rice, 1), (self.beer, 2)])
+        # Not served: not revenue
+        self.order(2, [(self.rice, 5)], status='PENDING')
+
+        response = self.client.get(self.url, {'bucket': 'day', 'start': '2026-03-01', 'end': '2026-03-03'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([moment[:10] for moment in response.data['t']], ['2026-03-01', '2026-03-02', '2026-03-03'])
+        self.assertEqual(response.data['series'], {'TOTAL': {'revenue': [25.0, 0.0, 20.0], 'count': [2, 0, 1]}})
+
+    def test_station_series_counts_distinct_orders(self):
+        self.order(1, [(self.rice, 2), (self.beer, 1)])
+        self.order(1, [(self.beer, 3)])
+
+        response = self.client.get(self.url, {'bucket': 'day', 'dimension': 'station', 'start': '2026-03-01', 'end': '2026-03-01'})
+
+        self.assertEqual(response.data['series'], {
+            'KITCHEN': {'revenue': [20.0], 'count': [1]},
+            'BAR': {'revenue': [20.0], 'count': [2]},
+        })
+
+    def test_monthly_buckets_cover_the_range(self):
+        response = self.client.get(self.url, {'bucket': 'month', 'start': '2026-01-15', 'end': '2026-12-31'})
+        self.assertEqual(len(response.data['t']), 12)
+        self.assertEqual(response.data['series'], {})
+
+    def test_rejects_bad_parameters(self):
+        for params in [
+            {'bucket': 'minute'},
+            {'dimension': 'waiter'},
+            {'start': '2026-03-05', 'end': '2026-03-01'},
+            {'bucket': 'hour', 'start': '2026-01-01', 'end': '2026-03-01'},
+        ]:
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class SalesCubeTests(TestCase):
+    def setUp(self):
+        # Forces a full rebuild from this test's data
+        sales_cube.last_event_id = None
+        category = MenuCategory.objects.create(name='Menu', slug='menu')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('10.00'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('5.00'), preparation_station='BAR')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='manager', password='x', role='ADMIN'))
+        self.url = reverse('sales-cube-slice')
+
+    def order(self, lines, when, location='TABLE', status='SERVED'):
+        order = Order.objects.create(room='T1', location_type=location, status=status)
+        for menu_item, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=menu_item, quantity=quantity, price_at_time=menu_item.price)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(when))
+        return order
+
+    def test_slices_by_requested_dimensions(self):
+        # Friday 20:00 and Saturday 13:00
+        self.order([(self.rice, 2), (self.beer, 4)], datetime(2026, 3, 6, 20), location='BEACH')
+        self.order([(self.beer, 1)], datetime(2026, 3, 7, 13))
+        self.order([(self.rice, 9)], datetime(2026, 3, 7, 13), status='PENDING')
+
+        response = self.client.get(self.url, {'group_by': 'station,day', 'day': 'FRI,SAT'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['keys'], {'station': ['KITCHEN', 'BAR'], 'day': ['FRI', 'SAT']})
+        self.assertEqual(response.data['values'], [[20.0, 0.0], [20.0, 5.0]])
+
+        quantity = self.client.get(self.url, {'measure': 'quantity', 'location': 'beach', 'hour': '18-23'})
+        self.assertEqual(quantity.data['values'], 6.0)
+
+    def test_unknown_locations_count_as_other(self):
+        self.order([(self.beer, 2)], datetime(2026, 3, 6, 20), location='VIP')
+        response = self.client.get(self.url, {'group_by': 'location', 'location': 'OTHER,TABLE'})
+        self.assertEqual(response.data['keys']['location'], ['TABLE', 'OTHER'])
+        self.assertEqual(response.data['values'], [0.0, 10.0])
+
+    def test_refresh_replays_changed_orders(self):
+        order = self.order([(self.rice, 1)], datetime(2026, 3, 6, 20), status='PENDING')
+        self.assertEqual(self.client.get(self.url).data['values'], 0.0)
+
+        Order.objects.filter(pk=order.pk).update(status='SERVED')
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_order_event(order.pk, 'STATUS')
+        sales_cube.built_at = 0
+        self.assertEqual(self.client.get(self.url).data['values'], 10.0)
+
+    def test_top_items(self):
+        self.order([(self.rice, 1), (self.beer, 4)], datetime(2026, 3, 6, 20))
+        response = self.client.get(reverse('sales-cube-top'), {'limit': 1})
+        self.assertEqual((response.data['item'], response.data['values']), ([self.beer.id], [20.0]))
+
+    def test_rejects_bad_group_by(self):
+        for group_by in ['day,day', 'day,hour,item', 'waiter']:
+            response = self.client.get(self.url, {'group_by': group_by})
+            self.assertEqual(response.status_code, 400, group_by)
+        self.assertEqual(self.client.get(self.url, {'measure': 'margin'}).status_code, 400)
+
+
+class PrepTimeEstimatorTests(TestCase):
+    def setUp(self):
+        self.estimator = PrepTimeEstimator()
+        # Fresh: never starts the background reload
+        self.estimator.loaded_at = time.monotonic()
+
+    def queued_history(self, base, per_order, count=30):
+        """Creation offsets and seconds to ready where each order took base + per_order * queue it met."""
+        gaps = np.random.default_rng(0).uniform(30, 600, count)
+        created = np.cumsum(gaps)
+        seconds = np.zeros(count)
+        for i in range(count):
+            queue = np.sum(created[:i] + seconds[:i] > created[i])
+            seconds[i] = base + per_order * queue
+        return created, seconds
+
+    def test_fit_recovers_base_and_per_order_time(self):
+        created, seconds = self.queued_history(300, 120)
+        base, per_order = self.estimator._fit_station(created, seconds)
+        self.assertAlmostEqual(base, 300)
+        self.assertAlmostEqual(per_order, 120)
+
+    def test_negative_slope_falls_back_to_the_median(self):
+        created = np.array([0.0, 10.0, 20.0, 30.0])
+        seconds = np.array([900.0, 600.0, 300.0, 200.0])
+        self.assertEqual(self.estimator._fit_station(created, seconds), (450.0, 0.0))
+
+    def test_refit_from_the_status_log_and_publish(self):
+        cache.delete(CACHE_KEY)
+        created, seconds = self.queued_history(300, 120, count=12)
+        start = timezone.now() - timedelta(days=1)
+        for offset, elapsed in zip(created, seconds):
+            order = Order.objects.create(room='T1', location_type='TABLE', status='READY')
+            Order.objects.filter(pk=order.pk).update(created_at=start + timedelta(seconds=float(offset)))
+            OrderStatusChange.objects.create(
+                order=order, from_status='PREPARING', to_status='READY', stations='KITCHEN',
+                seconds_in_previous=elapsed, seconds_since_created=elapsed,
+            )
+
+        self.estimator.refit()
+
+        base, per_order = self.estimator.models['KITCHEN']
+        self.assertAlmostEqual(base, 300, places=3)
+        self.assertAlmostEqual(per_order, 120, places=3)
+        # Too few samples: keeps the default
+        self.assertEqual(self.estimator.models['BAR'], (float(DEFAULT_SECONDS['BAR']), 0.0))
+        self.assertEqual(cache.get(CACHE_KEY)['models'], self.estimator.models)
+
+        other = PrepTimeEstimator()
+        other.load()
+        self.assertEqual(other.models, self.estimator.models)
+
+    def test_estimate_is_the_slowest_station(self):
+        self.estimator.models = {'KITCHEN': (300.0, 120.0), 'BAR': (120.0, 30.0)}
+        self.assertEqual(self.estimator.estimate_seconds({'KITCHEN', 'BAR'}, {'KITCHEN': 2, 'BAR': 10}), 540.0)
+        self.assertEqual(self.estimator.estimate_seconds({'BAR'}, {'BAR': 10}), 420.0)
+        self.assertIsNone(self.estimator.estimate_seconds(set(), {}))
+
+    def test_refit_command(self):
+        out = io.StringIO()
+        with mock.patch('inventory.management.commands.refit_prep_estimates.prep_estimator', self.estimator):
+            call_command('refit_prep_estimates', stdout=out)
+        self.assertIn('KITCHEN: 15.0 min + 0.0 min per queued order', out.getvalue())
+        self.assertIn('refitted', out.getvalue())
+
+
+class StationBatchesTests(TestCase):
+    def setUp(self):
+        category = MenuCategory.objects.create(name='Menu', slug='menu')
+        self.rice = MenuItem.objects.create(category=category, name='Jollof Rice', price=Decimal('10.00'))
+        self.fish = MenuItem.objects.create(category=category, name='Grilled Fish', price=Decimal('18.00'))
+        self.beer = MenuItem.objects.create(category=category, name='Club Beer', price=Decimal('5.00'), preparation_station='BAR')
+        self.url = reverse('order-batches')
+
+    def order(self, lines, status='PENDING', minutes_ago=0):
+        order = Order.objects.create(room='T1', location_type='TABLE', status=status)
+        for menu_item, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=menu_item, quantity=quantity, price_at_time=menu_item.price)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return order
+
+    def test_requires_a_known_station(self):
+        for params in [{}, {'station': 'POOL'}]:
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "ArrayAgg is PostgreSQL only")
+    def test_open_items_are_summed_per_menu_item_oldest_first(self):
+        first = self.order([(self.fish, 1), (self.beer, 2)], minutes_ago=20)
+        second = self.order([(self.rice, 2), (self.fish, 2)], status='PREPARING', minutes_ago=10)
+        third = self.order([(self.rice, 1)], minutes_ago=5)
+        self.order([(self.rice, 4)], status='READY', minutes_ago=30)
+
+        response = self.client.get(self.url, {'station': 'kitchen'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['menu_item'], row['quantity'], row['order_ids'], row['oldest_minutes']) for row in response.data],
+            [(self.fish.id, 3, [first.id, second.id], 20), (self.rice.id, 3, [second.id, third.id], 10)],
+        )
@@ -2,22 +2,33 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     MenuCategoryViewSet, MenuItemViewSet, 
-    InventoryItemViewSet, InventoryStockViewSet, StockTransferViewSet,
-    OrderViewSet, OrderReturnViewSet, RestaurantTableViewSet
+    InventoryItemViewSet, InventoryStockViewSet, StockTransferViewSet, StockMovementViewSet,
+    OrderViewSet, OrderReturnViewSet, RecipeIngredientViewSet, RestaurantTableViewSet
 )
 from .reporting_views import ReportingViewSet
+from .analytics_views import SalesCubeViewSet
+from .feed_views import order_feed
 
 router = DefaultRouter()
 router.register(r'items', InventoryItemViewSet, basename='inventory-item')
 router.register(r'stocks', InventoryStockViewSet, basename='inventory-stock')
 router.register(r'transfers', StockTransferViewSet, basename='stock-transfer')
+router.register(r'movements', StockMovementViewSet, basename='stock-movement')
 router.register(r'orders', OrderViewSet, basename='order')
 router.register(r'returns', OrderReturnViewSet, basename='order-return')
 router.register(r'menu/categories', MenuCategoryViewSet, basename='menu-category')
 router.register(r'menu/items', MenuItemViewSet, basename='menu-item')
+router.register(r'menu/recipes', RecipeIngredientViewSet, basename='menu-recipe')
 router.register(r'tables', RestaurantTableViewSet, basename='restaurant-table')
+router.register(r'analytics/cube', SalesCubeViewSet, basename='sales-cube')
 
 urlpatterns = [
+    # Must come before the router so 'feed' isn't taken as an order pk
+    path('orders/feed/', order_feed, name='order-feed'),
     path('', include(router.urls)),
     path('reports/', ReportingViewSet.as_view({'get': 'stats'}), name='inventory-reports'),
+    path('reports/v2/', ReportingViewSet.as_view({'get': 'stats_v2'}), name='inventory-reports-v2'),
+    path('reports/daily/', ReportingViewSet.as_view({'get': 'daily'}), name='inventory-reports-daily'),
+    path('reports/series/', ReportingViewSet.as_view({'get': 'series'}), name='inventory-reports-series'),
+    path('reports/timings/', ReportingViewSet.as_view({'get': 'timings'}), name='inventory-reports-timings'),
 ]
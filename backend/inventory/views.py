@@ -1,16 +1,33 @@
-from rest_framework import generics, status, viewsets, permissions, filters
+from rest_framework import generics, status, viewsets, permissions, filters, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
-from .models import MenuCategory, MenuItem, Order, InventoryItem, InventoryStock, StockTransfer, Department, OrderReturn, RestaurantTable, OrderReturnItem
+from .models import MenuCategory, MenuItem, Order, OrderItem, InventoryItem, InventoryStock, StockTransfer, StockMovement, RecipeIngredient, Department, OrderReturn, RestaurantTable, OrderReturnItem, OrderEvent, OrderStatusChange
+from .events import latest_event_id, order_stations
+from .feed_views import issue_feed_ticket, FEED_TICKET_MAX_AGE
+from .querysets import order_queryset, order_return_queryset
+from .stock import apply_stock_changes, InsufficientStock
+from .recipes import deduct_order_ingredients, restock_returned_items
+from .availability import availability_map
+from .stock_reports import movement_summary, stock_valuation, shrinkage_report
+from core.versioning import versioned_etag
+from finance.models import OpenTab, InvoiceItem
+from finance.tabs import adjust_open_tab
 from .serializers import (
-    MenuCategorySerializer, MenuItemSerializer, OrderSerializer,
-    InventoryItemSerializer, InventoryStockSerializer, StockTransferSerializer, OrderReturnSerializer,
+    MenuCategorySerializer, MenuItemSerializer, OrderSerializer, OrderItemSerializer,
+    InventoryItemSerializer, InventoryStockSerializer, StockTransferSerializer, StockMovementSerializer, RecipeIngredientSerializer, OrderReturnSerializer,
     RestaurantTableSerializer
 )
 from django.db import transaction
+from django.db.models import Sum, Count, Max, Min
+from django.contrib.postgres.aggregates import ArrayAgg
 from decimal import Decimal
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+
+# Orders in these states are off the kitchen/bar/waiter boards
+CLOSED_ORDER_STATUSES = ['SERVED', 'RETURNED', 'CANCELLED']
 
 class InventoryItemViewSet(viewsets.ModelViewSet):
     queryset = InventoryItem.objects.all().order_by('name')
@@ -34,20 +51,14 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         department = request.data.get('department', 'MAIN')
         quantity = Decimal(str(request.data.get('quantity', 0)))
         
-        # Get or create stock record for this department
-        stock, created = InventoryStock.objects.get_or_create(
-            item=item, 
-            department=department,
-            defaults={'quantity': 0}
-        )
-        
-        # Add the new quantity to existing
-        stock.quantity = Decimal(str(stock.quantity)) + quantity
-        stock.save()
+        new_quantity = apply_stock_changes(
+            {(item.id, department): quantity}, 'RECEIPT',
+            performed_by=request.user.username if request.user.is_authenticated else ''
+        )[(item.id, department)]
         
         return Response({
             'status': 'success', 
-            'new_quantity': float(stock.quantity),
+            'new_quantity': float(new_quantity),
             'department': department,
             'item_name': item.name
         })
@@ -67,32 +78,61 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         if not reason:
             return Response({'error': 'Reason is required for stock-out (e.g. Expired, Damaged).'}, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            stock = InventoryStock.objects.get(item=item, department=department)
-            if stock.quantity < quantity:
-                return Response({'error': f'Insufficient stock in {department}. Available: {stock.quantity}'}, status=status.HTTP_400_BAD_REQUEST)
-                
-            stock.quantity = Decimal(str(stock.quantity)) - quantity
-            stock.save()
-            
-            # Log this somewhere if needed, but for now just update stock
-            print(f"ADMIN STOCK-OUT: {quantity} {item.name} from {department}. Reason: {reason}")
-            
-            return Response({
-                'status': 'success',
-                'item': item.name,
-                'department': department,
-                'removed': float(quantity),
-                'new_quantity': float(stock.quantity)
-            })
-        except InventoryStock.DoesNotExist:
+        if not InventoryStock.objects.filter(item=item, department=department).exists():
             return Response({'error': f'No stock record found for {item.name} in {department}.'}, status=status.HTTP_404_NOT_FOUND)
 
+        key = (item.id, department)
+        try:
+            new_quantity = apply_stock_changes(
+                {key: -quantity}, 'STOCK_OUT', enforce_available=[key],
+                reason=reason, performed_by=request.user.username
+            )[key]
+        except InsufficientStock as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'item': item.name,
+            'department': department,
+            'removed': float(quantity),
+            'new_quantity': float(new_quantity)
+        })
+
 class InventoryStockViewSet(viewsets.ModelViewSet):
     queryset = InventoryStock.objects.all()
     serializer_class = InventoryStockSerializer
     filterset_fields = ['item', 'department']
 
+    # Manual edits are journaled as adjustments of the difference
+    def _username(self):
+        user = self.request.user
+        return user.username if user.is_authenticated else ''
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        quantity = serializer.validated_data.pop('quantity', 0)
+        stock = serializer.save(quantity=0)
+        apply_stock_changes({(stock.item_id, stock.department): quantity}, 'ADJUSTMENT', performed_by=self._username())
+        stock.refresh_from_db()
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        stock = InventoryStock.objects.select_for_update().get(pk=serializer.instance.pk)
+        item = serializer.validated_data.get('item', stock.item)
+        department = serializer.validated_data.get('department', stock.department)
+        if (item.pk, department) != (stock.item_id, stock.department):
+            raise serializers.ValidationError({'error': 'Use a transfer to move stock between items or departments.'})
+
+        quantity = serializer.validated_data.get('quantity', stock.quantity)
+        apply_stock_changes({(stock.item_id, stock.department): quantity - stock.quantity}, 'ADJUSTMENT', performed_by=self._username())
+        serializer.instance.refresh_from_db()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        apply_stock_changes({(instance.item_id, instance.department): -instance.quantity}, 'ADJUSTMENT',
+                            reason='Stock record deleted', performed_by=self._username())
+        instance.delete()
+
 class StockTransferViewSet(viewsets.ModelViewSet):
     queryset = StockTransfer.objects.all().order_by('-timestamp')
     serializer_class = StockTransferSerializer
@@ -107,24 +147,7 @@ class StockTransferViewSet(viewsets.ModelViewSet):
         if from_dept == to_dept:
             return Response({'error': 'Source and destination departments must be different.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get or create stock records
         item = InventoryItem.objects.get(id=item_id)
-        source_stock, _ = InventoryStock.objects.get_or_create(item=item, department=from_dept)
-        dest_stock, _ = InventoryStock.objects.get_or_create(item=item, department=to_dept)
-
-        # Ensure we have Decimal types for calculation
-        source_qty = Decimal(str(source_stock.quantity))
-        dest_qty = Decimal(str(dest_stock.quantity))
-
-        # Check if enough stock in source
-        if source_qty < quantity:
-            return Response({'error': f'Insufficient stock in {from_dept}. Available: {source_qty}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Update stock levels
-        source_stock.quantity = source_qty - quantity
-        dest_stock.quantity = dest_qty + quantity
-        source_stock.save()
-        dest_stock.save()
 
         # Create transfer record
         transfer = StockTransfer.objects.create(
@@ -135,10 +158,74 @@ class StockTransferViewSet(viewsets.ModelViewSet):
             performed_by=request.data.get('performed_by', 'Staff')
         )
 
+        # Both legs in one locked update; the source may not go negative
+        source = (item.id, from_dept)
+        try:
+            apply_stock_changes(
+                {source: -quantity, (item.id, to_dept): quantity}, 'TRANSFER', enforce_available=[source],
+                reference=f"Transfer #{transfer.id}", performed_by=transfer.performed_by
+            )
+        except InsufficientStock as e:
+            transaction.set_rollback(True)
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response(StockTransferSerializer(transfer).data, status=status.HTTP_201_CREATED)
 
+def _report_moment(value, end_of_day=False):
+    """Parses a query-string date or datetime; a bare date means its start (or end)."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise serializers.ValidationError({'error': f"Invalid date: {value}"})
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    """The stock journal and the reports built from it (see stock_reports)."""
+    queryset = StockMovement.objects.select_related('item').order_by('-id')
+    serializer_class = StockMovementSerializer
+    filterset_fields = ['item', 'department', 'movement_type']
+
+    def _period(self, request):
+        now = timezone.now()
+        start = _report_moment(request.query_params.get('start')) or now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = _report_moment(request.query_params.get('end'), end_of_day=True) or now
+        return start, end
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        start, end = self._period(request)
+        return Response({
+            'start': start,
+            'end': end,
+            'movements': movement_summary(start, end, request.query_params.get('department')),
+        })
+
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        # ?as_of=2026-09-30 values stock at the end of that day (month-end close)
+        as_of = _report_moment(request.query_params.get('as_of'), end_of_day=True)
+        return Response({
+            'as_of': as_of or timezone.now(),
+            **stock_valuation(as_of, request.query_params.get('department')),
+        })
+
+    @action(detail=False, methods=['get'])
+    def shrinkage(self, request):
+        start, end = self._period(request)
+        return Response({
+            'start': start,
+            'end': end,
+            **shrinkage_report(start, end, request.query_params.get('department')),
+        })
+
 class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all().order_by('-created_at')
+    queryset = order_queryset().order_by('-created_at')
     serializer_class = OrderSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -149,18 +236,150 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Only Admins can delete orders.'}, status=status.HTTP_403_FORBIDDEN)
         
         # If served, maybe we shouldn't delete but Admin has full power here as requested
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            # Take the order off its open bill; returned orders already were
+            if instance.status != 'RETURNED':
+                invoice_ids = set(InvoiceItem.objects.filter(related_order=instance).values_list('invoice_id', flat=True))
+                for invoice_id in invoice_ids:
+                    adjust_open_tab(invoice_id, -instance.total_amount, order_delta=-1)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'], url_path='feed-ticket', permission_classes=[permissions.IsAuthenticated])
+    def feed_ticket(self, request):
+        """Short-lived ticket for opening orders/feed/ from EventSource, which cannot send headers."""
+        return Response({
+            'ticket': issue_feed_ticket(request.user, request.auth['exp']),
+            'expires_in': FEED_TICKET_MAX_AGE,
+        })
+
     @action(detail=False, methods=['get'])
+    @versioned_etag('order')
     def active(self, request):
-        queryset = self.get_queryset().exclude(status__in=['SERVED', 'RETURNED', 'CANCELLED'])
+        """
+        Full board of open orders. The X-Order-Cursor header carries the
+        latest change sequence; pass it back as ?since= to get only changes.
+        """
+        since = request.query_params.get('since')
+        if since is not None:
+            return self.active_changes(request, since)
+
+        # Read the cursor first so a change made while we serialize is re-sent, not lost
+        cursor = latest_event_id()
+        queryset = self.get_queryset().exclude(status__in=CLOSED_ORDER_STATUSES)
         room = request.query_params.get('room')
         if room:
             queryset = queryset.filter(room=room)
         serializer = self.get_serializer(queryset, many=True)
-        print(f"DEBUG: Active Orders JSON: {serializer.data}")
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        response['X-Order-Cursor'] = cursor
+        return response
+
+    def active_changes(self, request, since):
+        """
+        Delta mode of `active`: orders created, re-statused or returned after
+        the cursor, in change-sequence order, plus ids that left the board.
+        Event ids commit in order (see events._insert_event), so nothing can
+        appear below a cursor once it has been handed out.
+        """
+        if not since.isdigit():
+            return Response({'error': 'since must be a cursor returned by this endpoint'}, status=status.HTTP_400_BAD_REQUEST)
+
+        events = OrderEvent.objects.filter(id__gt=int(since))
+        room = request.query_params.get('room')
+        if room:
+            events = events.filter(room=room.upper())
+
+        # Latest sequence per changed order, oldest change first
+        changes = list(events.values('order_id').annotate(seq=Max('id')).order_by('seq'))
+        if not changes:
+            return Response({'cursor': int(since), 'orders': [], 'removed': []})
+
+        order_ids = [c['order_id'] for c in changes]
+        open_orders = {
+            order.id: order
+            for order in self.get_queryset().filter(pk__in=order_ids).exclude(status__in=CLOSED_ORDER_STATUSES)
+        }
+
+        changed = [open_orders[oid] for oid in order_ids if oid in open_orders]
+        removed = [oid for oid in order_ids if oid not in open_orders]
+
+        return Response({
+            'cursor': changes[-1]['seq'],
+            'orders': self.get_serializer(changed, many=True).data,
+            'removed': removed,
+        })
+
+    @action(detail=False, methods=['get'])
+    @versioned_etag('order')
+    def tickets(self, request):
+        """
+        Open orders as tickets for one preparation station (?station=KITCHEN|BAR),
+        each holding only that station's items, oldest first.
+        """
+        station = (request.query_params.get('station') or '').upper()
+        if station not in dict(MenuItem.STATION_CHOICES):
+            return Response({'error': 'station must be KITCHEN or BAR'}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = OrderItem.objects.filter(
+            order__status__in=Order.OPEN_STATUSES,
+            menu_item__preparation_station=station
+        ).select_related('order', 'menu_item').order_by('order__created_at', 'id')
+
+        room = request.query_params.get('room')
+        if room:
+            items = items.filter(order__room=room)
+
+        items = list(items)
+        tickets = {}
+        for item, item_data in zip(items, OrderItemSerializer(items, many=True).data):
+            order = item.order
+            if order.id not in tickets:
+                tickets[order.id] = {
+                    'id': order.id,
+                    'room': order.room,
+                    'location_type': order.location_type,
+                    'status': order.status,
+                    'created_at': order.created_at,
+                    'items': [],
+                }
+            tickets[order.id]['items'].append(item_data)
+
+        return Response(list(tickets.values()))
+
+    @action(detail=False, methods=['get'])
+    @versioned_etag('order')
+    def batches(self, request):
+        """
+        "What to cook now" for one preparation station (?station=KITCHEN|BAR):
+        PENDING/PREPARING items summed per menu item with the contributing
+        order ids, oldest order first. One grouped query.
+        """
+        station = (request.query_params.get('station') or '').upper()
+        if station not in dict(MenuItem.STATION_CHOICES):
+            return Response({'error': 'station must be KITCHEN or BAR'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = OrderItem.objects.filter(
+            order__status__in=['PENDING', 'PREPARING'],
+            menu_item__preparation_station=station
+        ).values('menu_item_id', 'menu_item__name').annotate(
+            quantity=Sum('quantity'),
+            oldest=Min('order__created_at'),
+            order_ids=ArrayAgg('order_id', distinct=True, ordering='order_id'),
+        ).order_by('oldest', 'menu_item__name')
+
+        now = timezone.now()
+        return Response([
+            {
+                'menu_item': row['menu_item_id'],
+                'menu_item_name': row['menu_item__name'],
+                'quantity': row['quantity'],
+                'oldest_created_at': row['oldest'],
+                'oldest_minutes': int((now - row['oldest']).total_seconds() // 60),
+                'order_ids': row['order_ids'],
+            }
+            for row in rows
+        ])
 
     @action(detail=True, methods=['post'], url_path='update-status')
     @transaction.atomic
@@ -172,34 +391,16 @@ class OrderViewSet(viewsets.ModelViewSet):
         if new_status in ['PENDING', 'PREPARING', 'READY', 'SERVED']:
             order.status = new_status
             order.save()
+
+            if old_status != new_status:
+                OrderStatusChange.record(
+                    order, old_status, stations=order_stations(order),
+                    changed_by=request.user.username if request.user.is_authenticated else '',
+                )
             
-            # Automatically deduct stock when served
+            # Automatically deduct recipe ingredients when served, in one batched update
             if old_status != 'SERVED' and new_status == 'SERVED':
-                for item in order.items.all():
-                    menu_item = item.menu_item
-                    if menu_item.inventory_item:
-                        # Map order location & station to inventory department
-                        if menu_item.preparation_station == 'KITCHEN':
-                            dept = 'KITCHEN'
-                        elif menu_item.preparation_station == 'BAR':
-                            if order.location_type == 'POOL':
-                                dept = 'POOL'
-                            elif order.location_type == 'BEACH':
-                                dept = 'BEACH_BAR'
-                            else:
-                                dept = 'BAR'
-                        else:
-                            dept = 'MAIN'
-                            
-                        # Deduct from relevant stock
-                        stock, _ = InventoryStock.objects.get_or_create(
-                            item=menu_item.inventory_item,
-                            department=dept
-                        )
-                        current_qty = Decimal(str(stock.quantity))
-                        stock.quantity = current_qty - Decimal(str(item.quantity))
-                        stock.save()
-                        print(f"DEBUG: Deducting {item.quantity} {menu_item.inventory_item.name} from {dept}")
+                deduct_order_ingredients(order)
 
             return Response({'status': 'success', 'new_status': order.status})
         return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
@@ -230,39 +431,29 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response({'status': 'Return requested', 'return_id': ret.id})
 
     @action(detail=False, methods=['get'], url_path='bill-summary')
+    @versioned_etag('order', 'invoice')
     def bill_summary(self, request):
         """
-        Returns a summary of active bills grouped by table/room.
-        Includes count of active orders and total unpaid amount.
+        Returns a summary of open bills by table/room: count of orders and
+        total unpaid amount. Read from the running summary kept on each open
+        tab, so the cost depends on open tabs rather than order history.
         """
-        from django.db.models.functions import Upper
-        from django.db.models import F
-        
-        # We consider 'PENDING', 'PREPARING', 'READY', 'SERVED' as active
-        # 'RETURNED' is excluded.
-        active_orders = Order.objects.exclude(status='RETURNED')
-        
-        summary = active_orders.annotate(
-            room_normalized=Upper('room')
-        ).values('room_normalized', 'location_type').annotate(
-            total_bill=Sum('total_amount'),
-            order_count=Count('id')
-        ).order_by('room_normalized')
-
-        # Map to 'room' key for frontend compatibility
+        tabs = OpenTab.objects.filter(order_count__gt=0).order_by('room')
+
+        # Keys kept for frontend compatibility
         formatted_summary = [
             {
-                'room': item['room_normalized'],
-                'location_type': item['location_type'],
-                'total_bill': item['total_bill'],
-                'order_count': item['order_count']
-            } for item in summary
+                'room': tab.room,
+                'location_type': tab.location_type,
+                'total_bill': tab.total_bill,
+                'order_count': tab.order_count
+            } for tab in tabs
         ]
         
         return Response(formatted_summary)
 
 class OrderReturnViewSet(viewsets.ModelViewSet):
-    queryset = OrderReturn.objects.all().order_by('-requested_at')
+    queryset = order_return_queryset().order_by('-requested_at')
     serializer_class = OrderReturnSerializer
 
     @action(detail=True, methods=['post'])
@@ -283,8 +474,15 @@ class OrderReturnViewSet(viewsets.ModelViewSet):
         ret.approver_department = request.data.get('approver_department', '')
         ret.save()
         
-        order = ret.order
+        # Reload without the prefetched items, which are about to change
+        order = Order.objects.get(pk=ret.order_id)
+        old_total = order.total_amount
         from finance.models import Invoice, InvoiceItem
+
+        # Served orders had their ingredients taken out of stock; the returned
+        # portions go back in (read before the lines below are deleted)
+        if order.status == 'SERVED':
+            restock_returned_items(ret, order)
         
         # Find associated invoice
         invoice = Invoice.objects.filter(items__related_order=order).distinct().first()
@@ -330,6 +528,13 @@ class OrderReturnViewSet(viewsets.ModelViewSet):
         if remaining_items_count == 0 or remaining_qty == 0:
             order.status = 'RETURNED'
             order.save()
+
+        if invoice:
+            # Returned orders drop off the open-bill summary entirely
+            if order.status == 'RETURNED':
+                adjust_open_tab(invoice, -old_total, order_delta=-1)
+            else:
+                adjust_open_tab(invoice, order.total_amount - old_total)
         
         return Response({'status': 'Final approved'})
 
@@ -366,12 +571,24 @@ class MenuItemViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category']
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('category', 'inventory_item')
         category_slug = self.request.query_params.get('category_slug')
         if category_slug:
             queryset = queryset.filter(category__slug=category_slug)
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # ?location_type= picks the bar that would serve drinks (pool, beach...)
+        context['availability'] = availability_map(self.request.query_params.get('location_type', ''))
+        return context
+
+class RecipeIngredientViewSet(viewsets.ModelViewSet):
+    queryset = RecipeIngredient.objects.select_related('menu_item', 'inventory_item').order_by('menu_item_id', 'id')
+    serializer_class = RecipeIngredientSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filterset_fields = ['menu_item', 'inventory_item']
+
 class RestaurantTableViewSet(viewsets.ModelViewSet):
     queryset = RestaurantTable.objects.all()
     serializer_class = RestaurantTableSerializer
@@ -1,9 +1,10 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from .models import Room, Booking
-from inventory.models import Order
 from .serializers import RoomSerializer, BookingSerializer
+from core.versioning import versioned_etag
 from inventory.serializers import OrderSerializer
+from inventory.querysets import order_queryset
 from rest_framework.views import APIView
 from django.db.models import Q
 from datetime import date
@@ -48,6 +49,10 @@ class RoomViewSet(viewsets.ModelViewSet):
                 f.write(traceback.format_exc())
             return Response({'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @versioned_etag('room')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
         queryset = super().get_queryset()
         category = self.request.query_params.get('category')
@@ -158,12 +163,12 @@ class GlobalSearchView(APIView):
         )[:5]
         
         # Search Bookings
-        bookings = Booking.objects.filter(
+        bookings = Booking.objects.select_related('room').filter(
             Q(guest_name__icontains=query)
         ).order_by('-created_at')[:5]
         
         # Search Orders
-        orders = Order.objects.filter(
+        orders = order_queryset().filter(
             Q(room__icontains=query) | Q(id__icontains=query.replace('#', ''))
         ).order_by('-created_at')[:5]
 
@@ -0,0 +1,23 @@
+"""
+Access-pass revenue per dashboard timeframe, read from the daily pass
+rollup (finance.rollups) in one conditional-aggregate query.
+"""
+from django.db.models import Sum, Q
+from core.reporting import aggregate_cells, rollup_window
+from finance.models import DailyPassRevenue
+
+PASS_LOCATIONS = ['POOL', 'BEACH']
+
+
+def pass_revenue(starts):
+    """Access-pass revenue and pass counts per timeframe, in total and by location."""
+    cells = {}
+    for label, start in starts.items():
+        window = Q(date__gte=start)
+        cells[(label, 'total_revenue')] = Sum('revenue', filter=window)
+        cells[(label, 'total_passes')] = Sum('passes', filter=window)
+        for location in PASS_LOCATIONS:
+            in_location = window & Q(pass_type__location=location)
+            cells[(label, location.lower(), 'revenue')] = Sum('revenue', filter=in_location)
+            cells[(label, location.lower(), 'passes')] = Sum('passes', filter=in_location)
+    return aggregate_cells(rollup_window(DailyPassRevenue.objects.all(), starts), cells)
@@ -6,6 +6,8 @@ from django.db.models import Sum, Count
 from pms.models import Room, Booking
 from finance.models import Invoice, InvoiceItem
 import uuid
+from core.reporting import timeframe_starts
+from .reporting import pass_revenue
 from .models import AccessPass, PassType, PassReturn, Activity, Package, CSRProject, Event
 from .serializers import (
     AccessPassSerializer, PassTypeSerializer, PassReturnSerializer,
@@ -278,42 +280,9 @@ class AccessPassViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='stats')
     def stats(self, request):
-        now = date.today()
-        # Timeframes
-        ranges = {
-            'today': now,
-            'week': now - timedelta(days=7),
-            'month': now - timedelta(days=30),
-            'year': now - timedelta(days=365)
-        }
-
-        data = {}
-        for label, start_date in ranges.items():
-            # Filter by date range
-            qs = AccessPass.objects.filter(created_at__date__gte=start_date)
-            
-            # Aggregate total revenue & count
-            total_revenue = qs.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0.00
-            total_passes = qs.count()
-
-            # Split by Location (Pool vs Beach)
-            # Note: Residents (price=0) count towards passes but 0 revenue
-            pool_qs = qs.filter(pass_type__location='POOL')
-            pool_revenue = pool_qs.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0.00
-            pool_count = pool_qs.count()
-
-            beach_qs = qs.filter(pass_type__location='BEACH')
-            beach_revenue = beach_qs.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0.00
-            beach_count = beach_qs.count()
-
-            data[label] = {
-                'total_revenue': total_revenue,
-                'total_passes': total_passes,
-                'pool': {'revenue': pool_revenue, 'passes': pool_count},
-                'beach': {'revenue': beach_revenue, 'passes': beach_count}
-            }
-        
-        return Response(data)
+        # All ranges and the pool/beach split from the daily pass rollup.
+        # Note: Residents (price=0) count towards passes but 0 revenue
+        return Response(pass_revenue(timeframe_starts(date.today())))
 
     @action(detail=True, methods=['post'], url_path='mark-printed')
     def mark_printed(self, request, pk=None):
@@ -1,12 +1,21 @@
 from rest_framework import viewsets, permissions
 from .models import SiteConfig
 from .serializers import SiteConfigSerializer
+from core.versioning import versioned_etag
 
 class SiteConfigViewSet(viewsets.ModelViewSet):
     queryset = SiteConfig.objects.all()
     serializer_class = SiteConfigSerializer
     lookup_field = 'key'
 
+    @versioned_etag('siteconfig')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @versioned_etag('siteconfig')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [permissions.AllowAny()]
@@ -140,6 +140,14 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Shared by every gunicorn/uvicorn worker (table made by `manage.py createcachetable`)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'kwalee_cache',
+    }
+}
+
 # Media files (Uploaded images, etc.)
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -148,6 +156,9 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
 
+# Let cross-origin dev clients read the delta-sync cursor and ETags
+CORS_EXPOSE_HEADERS = ['X-Order-Cursor', 'ETag']
+
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
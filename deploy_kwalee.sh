@@ -8,6 +8,7 @@ DB_PASS="KwaleeBeach2026!"
 REPO_URL="https://github.com/HILTONJACKSO/Kwaleebeach.git"
 WEB_DIR="/var/www/kwaleebeach"
 DJANGO_PORT=8001
+DJANGO_ASGI_PORT=8002
 NEXTJS_PORT=3001
 
 echo "Starting deployment for Kwalee Beach Resort..."
@@ -85,6 +86,8 @@ echo "listen_addresses = 'localhost, 127.0.0.1'" | sudo tee -a /etc/postgresql/1
 systemctl restart postgresql
 python manage.py makemigrations
 python manage.py migrate
+python manage.py createcachetable
+python manage.py rebuild_rollups
 python manage.py collectstatic --noinput
 
 # 4. Configure Backend Systemd Service
@@ -104,9 +107,79 @@ ExecStart=$WEB_DIR/backend/venv/bin/gunicorn --access-logfile - --workers 3 --bi
 WantedBy=multi-user.target
 EOF
 
+# The live order feed (Server-Sent Events) holds connections open, so it is
+# served by the ASGI app instead of tying up the sync gunicorn workers.
+cat <<EOF > /etc/systemd/system/uvicorn-kwalee.service
+[Unit]
+Description=Uvicorn (ASGI) daemon for the Kwalee live order feed
+After=network.target
+
+[Service]
+User=root
+Group=www-data
+WorkingDirectory=$WEB_DIR/backend
+ExecStart=$WEB_DIR/backend/venv/bin/uvicorn --no-access-log --host 127.0.0.1 --port $DJANGO_ASGI_PORT yarvo_backend.asgi:application
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
 systemctl daemon-reload
 systemctl enable gunicorn-kwalee
 systemctl restart gunicorn-kwalee
+systemctl enable uvicorn-kwalee
+systemctl restart uvicorn-kwalee
+
+# Invoice/payment ledger postings are queued in the ledger outbox and posted
+# by this worker, off the checkout path.
+cat <<EOF > /etc/systemd/system/ledger-outbox-kwalee.service
+[Unit]
+Description=Kwalee ledger outbox worker
+After=network.target
+
+[Service]
+User=root
+Group=www-data
+WorkingDirectory=$WEB_DIR/backend
+ExecStart=$WEB_DIR/backend/venv/bin/python manage.py drain_ledger_outbox --loop
+Restart=always
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+systemctl daemon-reload
+systemctl enable ledger-outbox-kwalee
+systemctl restart ledger-outbox-kwalee
+
+# Nightly stock snapshot; stock history and shrinkage reports start from the
+# newest snapshot and replay only the movements journaled after it.
+cat <<EOF > /etc/systemd/system/stock-snapshot-kwalee.service
+[Unit]
+Description=Kwalee stock snapshot
+
+[Service]
+Type=oneshot
+User=root
+Group=www-data
+WorkingDirectory=$WEB_DIR/backend
+ExecStart=$WEB_DIR/backend/venv/bin/python manage.py snapshot_stock
+EOF
+
+cat <<EOF > /etc/systemd/system/stock-snapshot-kwalee.timer
+[Unit]
+Description=Nightly Kwalee stock snapshot
+
+[Timer]
+OnCalendar=*-*-* 03:30:00
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+EOF
+
+systemctl daemon-reload
+systemctl enable --now stock-snapshot-kwalee.timer
 
 # 5. Frontend Setup
 echo "Setting up Next.js Frontend..."
@@ -141,6 +214,9 @@ systemctl restart nextjs-kwalee
 # 7. Configure Nginx
 echo "Configuring Nginx with SSL..."
 cat <<EOF > /etc/nginx/sites-available/kwalee
+# Access log line without the query string, which carries the feed ticket
+log_format kwalee_noquery '\$remote_addr - \$remote_user [\$time_local] "\$request_method \$uri \$server_protocol" \$status \$body_bytes_sent';
+
 server {
     listen 80;
     server_name ${DOMAIN} www.${DOMAIN};
@@ -165,6 +241,16 @@ server {
         proxy_cache_bypass \$http_upgrade;
     }
 
+    location /api/inventory/orders/feed/ {
+        access_log /var/log/nginx/access.log kwalee_noquery;
+        proxy_pass http://127.0.0.1:$DJANGO_ASGI_PORT;
+        proxy_http_version 1.1;
+        proxy_set_header Connection '';
+        proxy_set_header Host \$host;
+        proxy_buffering off;
+        proxy_read_timeout 600s;
+    }
+
     location /api/ {
         proxy_pass http://127.0.0.1:$DJANGO_PORT;
         proxy_set_header Host \$host;
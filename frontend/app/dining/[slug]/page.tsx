@@ -10,6 +10,7 @@ interface MenuItem {
     name: string;
     description: string;
     price: string;
+    available_now: boolean;
 }
 
 export default function CategoryPage({ params }: { params: Promise<{ slug: string }> }) {
@@ -55,12 +56,16 @@ export default function CategoryPage({ params }: { params: Promise<{ slug: strin
                                 <p className="text-gray-600 text-sm">{item.description}</p>
                                 <p className="text-[var(--color-primary)] font-bold mt-2">${item.price}</p>
                             </div>
-                            <button
-                                onClick={() => addToCart(item)}
-                                className="bg-[var(--color-primary)] text-white px-4 py-2 rounded-full hover:bg-[var(--color-secondary)]"
-                            >
-                                Find
-                            </button>
+                            {item.available_now ? (
+                                <button
+                                    onClick={() => addToCart(item)}
+                                    className="bg-[var(--color-primary)] text-white px-4 py-2 rounded-full hover:bg-[var(--color-secondary)]"
+                                >
+                                    Find
+                                </button>
+                            ) : (
+                                <span className="text-gray-400 text-sm font-bold">Sold out</span>
+                            )}
                         </div>
                     ))}
                 </div>
@@ -20,6 +20,7 @@ interface MenuItem {
     image: string;
     category: number;
     is_available: boolean;
+    available_now: boolean;
 }
 
 interface Order {
@@ -47,13 +48,13 @@ export default function MenuPage() {
     const [isPlacingOrder, setIsPlacingOrder] = useState(false);
     const [isCartOpen, setIsCartOpen] = useState(false);
 
-    // Initial Data Fetch
+    // Initial Data Fetch (availability depends on which bar serves the location)
     useEffect(() => {
         const fetchData = async () => {
             try {
                 const [catRes, itemRes] = await Promise.all([
                     fetch('/api/inventory/menu/categories/'),
-                    fetch('/api/inventory/menu/items/')
+                    fetch(`/api/inventory/menu/items/?location_type=${locationType}`)
                 ]);
 
                 const cats = catRes.ok ? await catRes.json() : [];
@@ -68,7 +69,7 @@ export default function MenuPage() {
             }
         };
         fetchData();
-    }, []);
+    }, [locationType]);
 
     // Poll for Active Orders (if room/table number is set)
     useEffect(() => {
@@ -275,15 +276,19 @@ export default function MenuPage() {
                                 </div>
                                 <div className="flex justify-between items-center mt-2">
                                     <span className="text-xl font-bold text-gray-900">${item.price}</span>
-                                    <button
-                                        onClick={() => {
-                                            addToCart(item);
-                                            showNotification(`Added ${item.name} to cart`, 'success');
-                                        }}
-                                        className="w-10 h-10 rounded-full bg-gray-100 text-[var(--color-primary)] flex items-center justify-center hover:bg-[var(--color-primary)] hover:text-white transition-all shadow-sm"
-                                    >
-                                        <Plus size={20} />
-                                    </button>
+                                    {item.available_now ? (
+                                        <button
+                                            onClick={() => {
+                                                addToCart(item);
+                                                showNotification(`Added ${item.name} to cart`, 'success');
+                                            }}
+                                            className="w-10 h-10 rounded-full bg-gray-100 text-[var(--color-primary)] flex items-center justify-center hover:bg-[var(--color-primary)] hover:text-white transition-all shadow-sm"
+                                        >
+                                            <Plus size={20} />
+                                        </button>
+                                    ) : (
+                                        <span className="text-xs font-bold text-gray-400 uppercase tracking-wider">Sold out</span>
+                                    )}
                                 </div>
                             </div>
                         </div>
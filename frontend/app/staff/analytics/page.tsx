@@ -1,4 +1,5 @@
 'use client';
+import { useEffect, useState } from 'react';
 import { TrendingUp, Users, DollarSign, Activity, PieChart, BarChart3, ArrowUpRight, ArrowDownRight } from 'lucide-react';
 import ProtectedRoute from '@/components/ProtectedRoute';
 
@@ -10,7 +11,38 @@ export default function AnalyticsPage() {
     );
 }
 
+interface TopItems {
+    item: number[];
+    item_name: string[];
+    values: number[];
+}
+
+// Drill-down filters for the sales cube (answered in memory on the server)
+const CUBE_FILTERS = {
+    station: [['', 'All Stations'], ['KITCHEN', 'Kitchen'], ['BAR', 'Bar']],
+    location: [['', 'All Locations'], ['ROOM', 'Room'], ['TABLE', 'Table'], ['BEACH', 'Beach'], ['POOL', 'Pool'], ['WALK_IN', 'Walk-in']],
+    day: [['', 'Any Day'], ['MON,TUE,WED,THU,FRI', 'Weekdays'], ['SAT,SUN', 'Weekend'], ['FRI', 'Friday'], ['SAT', 'Saturday'], ['SUN', 'Sunday']],
+    hour: [['', 'Any Time'], ['6-11', 'Morning'], ['12-16', 'Afternoon'], ['17-21', 'Evening'], ['22-23,0-5', 'Late Night']],
+} as const;
+type CubeFilter = keyof typeof CUBE_FILTERS;
+
 function AnalyticsContent() {
+    const [filters, setFilters] = useState<Record<CubeFilter, string>>({ station: '', location: '', day: '', hour: '' });
+    const [topItems, setTopItems] = useState<TopItems>({ item: [], item_name: [], values: [] });
+
+    useEffect(() => {
+        const params = new URLSearchParams({ measure: 'revenue', limit: '5' });
+        Object.entries(filters).forEach(([key, value]) => value && params.set(key, value));
+        fetch(`/api/inventory/analytics/cube/top/?${params}`, {
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('yarvo_token')}`
+            }
+        })
+            .then(res => res.json())
+            .then(data => setTopItems({ item: data.item || [], item_name: data.item_name || [], values: data.values || [] }))
+            .catch(err => console.error('Fetch sales cube error:', err));
+    }, [filters]);
+
     const keyMetrics = [
         { name: 'Total Revenue', value: '--', trend: '', isPositive: true, icon: <DollarSign size={24} /> },
         { name: 'Occupancy Rate', value: '--', trend: '', isPositive: true, icon: <Users size={24} /> },
@@ -67,13 +99,34 @@ function AnalyticsContent() {
                     </div>
                 </div>
 
-                {/* Popular Departments Placeholder */}
+                {/* Top Sellers (sales cube drill-down) */}
                 <div className="bg-white p-8 rounded-[2.5rem] border border-gray-100 shadow-sm">
-                    <h2 className="text-xl font-black text-gray-900 tracking-tight mb-8">Top Departments</h2>
-                    <div className="space-y-6">
-                        <div className="text-center text-gray-400 py-8">
-                            <p className="text-sm font-bold uppercase tracking-widest">Pending API data</p>
-                        </div>
+                    <h2 className="text-xl font-black text-gray-900 tracking-tight mb-6">Top Sellers</h2>
+                    <div className="grid grid-cols-2 gap-2 mb-6">
+                        {(Object.keys(CUBE_FILTERS) as CubeFilter[]).map(key => (
+                            <select
+                                key={key}
+                                value={filters[key]}
+                                onChange={(e) => setFilters({ ...filters, [key]: e.target.value })}
+                                className="bg-gray-50 border-none text-xs font-bold text-gray-600 rounded-xl focus:ring-2 focus:ring-blue-500 outline-none p-3"
+                            >
+                                {CUBE_FILTERS[key].map(([value, label]) => (
+                                    <option key={value} value={value}>{label}</option>
+                                ))}
+                            </select>
+                        ))}
+                    </div>
+                    <div className="space-y-4">
+                        {topItems.item.length === 0 ? (
+                            <div className="text-center text-gray-400 py-8">
+                                <p className="text-sm font-bold uppercase tracking-widest">No sales for this slice</p>
+                            </div>
+                        ) : topItems.item.map((id, i) => (
+                            <div key={id} className="flex items-center justify-between">
+                                <span className="text-sm font-bold text-gray-900">{topItems.item_name[i]}</span>
+                                <span className="text-sm font-black text-gray-500">${topItems.values[i].toLocaleString()}</span>
+                            </div>
+                        ))}
                     </div>
                 </div>
             </div>
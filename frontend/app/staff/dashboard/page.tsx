@@ -47,8 +47,10 @@ export default function StaffDashboard() {
                 'Authorization': `Bearer ${localStorage.getItem('yarvo_token')}`
             }
         })
-            .then(res => res.json())
+            // 503 while the report is first being built; keep the current figures
+            .then(res => res.ok ? res.json() : null)
             .then(data => {
+                if (!data) return;
                 setStats({
                     activeGuests: data.active_guests || 0,
                     pendingOrders: data.recent_log ? data.recent_log.filter((o: any) => o.status === 'PENDING').length : 0,
@@ -92,6 +92,33 @@ function FinanceDashboardContent() {
         }
     };
 
+    const handleApproveAllVouchers = async () => {
+        const ids = vouchers.filter(v => !v.is_approved).map(v => v.id);
+        if (ids.length === 0) return;
+        try {
+            const res = await fetch('/api/finance/vouchers/bulk-approve/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Authorization': `Bearer ${localStorage.getItem('yarvo_token')}`
+                },
+                body: JSON.stringify({ ids }),
+            });
+            if (res.ok) {
+                const result = await res.json();
+                if (result.skipped.length > 0) {
+                    alert(`Approved ${result.approved.length} vouchers. Skipped:\n` +
+                        result.skipped.map((s: any) => `${s.voucher_number || s.id}: ${s.reason}`).join('\n'));
+                }
+                fetchData();
+            } else {
+                alert("Failed to approve vouchers.");
+            }
+        } catch (error) {
+            console.error("Bulk approval error:", error);
+        }
+    };
+
     const handleAddEntry = async (e: React.FormEvent) => {
         e.preventDefault();
         if (!entryForm.increase_account || !entryForm.decrease_account || !entryForm.amount) {
@@ -440,6 +467,14 @@ function FinanceDashboardContent() {
             <div className="bg-white rounded-[2.5rem] border border-gray-100 shadow-sm overflow-hidden">
                 <div className="p-8 border-b border-gray-50 flex flex-col sm:flex-row items-start sm:items-center justify-between gap-4">
                     <h2 className="text-xl font-black text-gray-900 tracking-tight">Expense Vouchers</h2>
+                    {vouchers.some(v => !v.is_approved) && (
+                        <button
+                            onClick={handleApproveAllVouchers}
+                            className="px-4 py-2 bg-gray-900 text-white rounded-xl text-[10px] font-black uppercase tracking-widest hover:bg-[var(--color-primary)] transition-colors"
+                        >
+                            Approve All Pending ({vouchers.filter(v => !v.is_approved).length})
+                        </button>
+                    )}
                     <div className="relative w-full sm:w-64">
                         <Search className="absolute left-4 top-1/2 -translate-y-1/2 text-gray-400" size={16} />
                         <input
@@ -11,6 +11,14 @@ interface OrderItem {
     quantity: number;
 }
 
+interface Batch {
+    menu_item: number;
+    menu_item_name: string;
+    quantity: number;
+    oldest_minutes: number;
+    order_ids: number[];
+}
+
 interface Order {
     id: number;
     room: string;
@@ -25,6 +33,7 @@ export default function KitchenPage() {
     const [orders, setOrders] = useState<Order[]>([]);
     const [stats, setStats] = useState<any>(null);
     const [pendingReturns, setPendingReturns] = useState<any[]>([]);
+    const [batches, setBatches] = useState<Batch[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
 
@@ -76,10 +85,23 @@ export default function KitchenPage() {
         }
     };
 
+    const fetchBatches = async () => {
+        try {
+            const res = await fetch('/api/inventory/orders/batches/?station=KITCHEN', {
+                headers: getAuthHeaders()
+            });
+            if (res.status === 401) return handle401();
+            if (res.ok) setBatches(await res.json());
+        } catch (e: any) {
+            console.error(e);
+        }
+    };
+
     const fetchOrders = async () => {
         try {
             fetchReturns();
             fetchStats();
+            fetchBatches();
             const res = await fetch('/api/inventory/orders/active/', {
                 headers: getAuthHeaders()
             });
@@ -199,6 +221,28 @@ export default function KitchenPage() {
                 </div>
             </div>
 
+            {/* Cook Now: identical dishes across open tickets */}
+            {batches.length > 0 && (
+                <div className="bg-white p-6 rounded-[2rem] border border-gray-100 shadow-sm">
+                    <h2 className="text-[10px] font-black uppercase tracking-widest text-gray-400 mb-4 flex items-center gap-2">
+                        <Utensils size={14} /> Cook Now
+                    </h2>
+                    <div className="flex gap-3 overflow-x-auto pb-2 scrollbar-hide">
+                        {batches.map(batch => (
+                            <div key={batch.menu_item} className="min-w-[200px] bg-orange-50 border border-orange-100 p-4 rounded-2xl">
+                                <div className="text-lg font-black text-gray-900">{batch.quantity}× {batch.menu_item_name}</div>
+                                <div className="text-[10px] font-black uppercase tracking-widest text-orange-600 flex items-center gap-1 mt-1">
+                                    <Clock size={12} /> Oldest {batch.oldest_minutes} min
+                                </div>
+                                <div className="text-[10px] font-bold text-gray-500 mt-2 truncate">
+                                    {batch.order_ids.map(id => `#${id}`).join(', ')}
+                                </div>
+                            </div>
+                        ))}
+                    </div>
+                </div>
+            )}
+
             {/* Pending Returns (Urgent) */}
             {pendingReturns.length > 0 && (
                 <div className="bg-orange-600 p-6 md:p-8 rounded-[2rem] md:rounded-[2.5rem] text-white shadow-xl shadow-orange-100 flex flex-col lg:flex-row justify-between items-stretch lg:items-center gap-6 animate-pulse">
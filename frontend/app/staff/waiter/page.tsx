@@ -19,6 +19,7 @@ interface Order {
     location_type: string;
     status: string;
     total_amount: string;
+    estimated_ready_at: string | null;
     created_at: string;
     items: OrderItem[];
     returns: any[]; // Added to track return status
@@ -457,6 +458,11 @@ function WaiterPageContent() {
                                 <div className="text-[11px] font-medium text-gray-500 mb-3 truncate">
                                     {getLocationLabel(order.location_type)}: {order.room}
                                 </div>
+                                {order.estimated_ready_at && (
+                                    <div className="text-[10px] font-black uppercase tracking-widest text-orange-500 mb-3">
+                                        Ready ~{new Date(order.estimated_ready_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}
+                                    </div>
+                                )}
                                 <div className="flex gap-2">
                                     <Link
                                         href={`/staff/waiter/return/${order.id}`}
@@ -1,28 +1,84 @@
 'use client';
 
+import { useEffect, useState } from 'react';
 import {
     PieChart, Pie, Cell, ResponsiveContainer,
     BarChart, Bar, XAxis, YAxis, Tooltip, CartesianGrid
 } from 'recharts';
 
-const dataPie = [
-    { name: 'Kitchen', value: 4250, color: '#f97316' },  // Orange-500
-    { name: 'Bar', value: 2180, color: '#3b82f6' },      // Blue-500
-    { name: 'Pool', value: 1200, color: '#06b6d4' },     // Cyan-500
-    { name: 'Beach', value: 850, color: '#f59e0b' },     // Amber-500
-];
+const MIX_COLORS: Record<string, string> = {
+    Kitchen: '#f97316',  // Orange-500
+    Bar: '#3b82f6',      // Blue-500
+    Pool: '#06b6d4',     // Cyan-500
+    Beach: '#f59e0b',    // Amber-500
+};
 
-const dataBar = [
-    { name: 'Mon', revenue: 1200 },
-    { name: 'Tue', revenue: 1800 },
-    { name: 'Wed', revenue: 1500 },
-    { name: 'Thu', revenue: 2100 },
-    { name: 'Fri', revenue: 3200 },
-    { name: 'Sat', revenue: 4500 },
-    { name: 'Sun', revenue: 3800 },
-];
+// Trend ranges: how far back and how the server buckets them
+const TREND_RANGES = {
+    week: { label: 'Week', bucket: 'day', days: 6 },
+    month: { label: 'Month', bucket: 'day', days: 29 },
+    year: { label: 'Year', bucket: 'month', days: 364 },
+} as const;
+type TrendRange = keyof typeof TREND_RANGES;
+
+interface RevenueSeries {
+    bucket: string;
+    t: string[];
+    series: Record<string, { revenue: number[]; count: number[] }>;
+}
+
+interface DailyReport {
+    week: { name: string; revenue: number }[];
+    mix: { name: string; value: number }[];
+}
 
 export default function RevenueCharts() {
+    const [report, setReport] = useState<DailyReport>({ week: [], mix: [] });
+
+    useEffect(() => {
+        // Served from the daily revenue rollups
+        fetch('/api/inventory/reports/daily/', {
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('yarvo_token')}`
+            }
+        })
+            .then(res => res.json())
+            .then(data => setReport({ week: data.week || [], mix: data.mix || [] }))
+            .catch(err => console.error('Fetch revenue charts error:', err));
+    }, []);
+
+    const [trendRange, setTrendRange] = useState<TrendRange>('week');
+    const [trend, setTrend] = useState<{ name: string; revenue: number }[]>([]);
+
+    useEffect(() => {
+        const { bucket, days } = TREND_RANGES[trendRange];
+        const start = new Date(Date.now() - days * 86400000).toISOString().slice(0, 10);
+        fetch(`/api/inventory/reports/series/?bucket=${bucket}&start=${start}`, {
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('yarvo_token')}`
+            }
+        })
+            .then(res => res.json())
+            .then((data: RevenueSeries) => {
+                // Columnar response: one timestamp array, values aligned by index
+                const revenue = data.series?.TOTAL?.revenue || [];
+                setTrend((data.t || []).map((t, i) => {
+                    const date = new Date(t);
+                    const name = bucket === 'month'
+                        ? date.toLocaleDateString(undefined, { month: 'short' })
+                        : days > 6
+                            ? date.toLocaleDateString(undefined, { day: 'numeric', month: 'short' })
+                            : date.toLocaleDateString(undefined, { weekday: 'short' });
+                    return { name, revenue: revenue[i] || 0 };
+                }));
+            })
+            .catch(err => console.error('Fetch revenue trend error:', err));
+    }, [trendRange]);
+
+    const dataPie = report.mix.map(entry => ({ ...entry, color: MIX_COLORS[entry.name] }));
+    const dataBar = trend;
+    const trendTotal = dataBar.reduce((acc, point) => acc + point.revenue, 0);
+
     return (
         <div className="grid grid-cols-1 lg:grid-cols-2 gap-8 mt-8">
             {/* Pie Chart: Revenue Mix */}
@@ -63,7 +119,20 @@ export default function RevenueCharts() {
 
             {/* Bar Chart: Weekly Trend */}
             <div className="bg-white rounded-[2.5rem] border border-gray-100 shadow-sm p-8">
-                <h3 className="text-lg font-black text-gray-900 mb-6">Weekly Performance</h3>
+                <div className="flex justify-between items-center mb-6">
+                    <h3 className="text-lg font-black text-gray-900">Revenue Trend</h3>
+                    <div className="flex gap-1">
+                        {(Object.keys(TREND_RANGES) as TrendRange[]).map(range => (
+                            <button
+                                key={range}
+                                onClick={() => setTrendRange(range)}
+                                className={`px-3 py-1 rounded-full text-xs font-bold transition-all ${trendRange === range ? 'bg-gray-900 text-white' : 'bg-gray-100 text-gray-500'}`}
+                            >
+                                {TREND_RANGES[range].label}
+                            </button>
+                        ))}
+                    </div>
+                </div>
                 <div className="h-[300px]">
                     <ResponsiveContainer width="100%" height="100%">
                         <BarChart data={dataBar} margin={{ top: 10, right: 10, left: -20, bottom: 0 }}>
@@ -89,7 +158,7 @@ export default function RevenueCharts() {
                     </ResponsiveContainer>
                 </div>
                 <div className="text-center mt-4">
-                    <span className="text-xs font-bold text-gray-400">Total Weekly Revenue: $18,100</span>
+                    <span className="text-xs font-bold text-gray-400">Total F&B Revenue: ${trendTotal.toLocaleString()}</span>
                 </div>
             </div>
         </div>